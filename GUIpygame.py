@@ -57,15 +57,19 @@ any works which incorporate substantial portions of this work:
 from __future__ import print_function, division  # We require Python 2.6 or later
 
 
-__all__ = ['MOUSEBUTTONLEFT', 'MOUSEBUTTONRIGHT', 'WIDGETEVENT', 'vera',
+__all__ = ['MOUSEBUTTONLEFT', 'MOUSEBUTTONRIGHT', 'WIDGETEVENT', 'WAKEUPEVENT', 'vera',
            'partial_redraw_mode', 'screen_is_cleared', 'done_drawing',
            'wrap_in_border', 'button_up_color', 'button_dn_color',
            'Widget', 'WidgetGroup', 'Image', 'Label', 'SimpleButton', 'Button',
            'SimpleCheckbox', 'Checkbox', 'Menu', 'TextEditBox', 'InputBox',
-           'Form', 'ScrollBar']
+           'Form', 'ScrollBar', 'set_handler', 'deliver_event',
+           'registry', 'find', 'find_all', 'find_prefix',
+           'GlyphAtlas', 'get_glyph_atlas', 'get_font', 'get_sysfont',
+           'text_size', 'Box', 'Grid', 'HitIndex']
 
         # -- These classes are mainly for internal use: --
-        # 'WrapperForm', 'BasicForm', 'CloseButton', 'SliderButton', 'Titlebar',
+        # 'WrapperForm', 'BasicForm', 'CloseButton', 'SliderButton', 'RepeatButton',
+        # 'Titlebar',
 
 
 version_num = "1.0 "
@@ -74,8 +78,16 @@ version_num = "1.0 "
 
 import sys  #@UnusedImport
 import os
+import bisect
+import collections
+import itertools
+import weakref
 import pygame
 from pygame.locals import *  #@UnusedWildImport
+try:
+    import numpy  # optional; only used by hit indexes (see HitIndex)
+except ImportError:
+    numpy = None
 # two constants that should be in pygame.locals, but aren't:
 MOUSEBUTTONLEFT = 1
 MOUSEBUTTONRIGHT = 3
@@ -135,6 +147,31 @@ saved_mouse_cursor = None
 widget_which_set_mouse_cursor = None
 widget_being_dragged = None
 
+# While a top-level widget is being dragged it is "frozen": it isn't updated,
+# so its image is just drawn wherever it has been dragged to, and the rects
+# of its descendants are only brought up to date when they're needed (see
+# Widget._freeze).  Set freeze_dragged_widgets=False to keep updating
+# widgets while they're being dragged.
+freeze_dragged_widgets = True
+frozen_widget = None
+
+# Clicking on a draggable top-level widget (or one with a draggable titlebar,
+# see wrap_in_titlebar) brings it to the front, like a window.  Set
+# raise_clicked_widgets=False to leave the drawing order alone.  (See also
+# Widget.raise_to_top, WidgetGroup.set_z, and, for applications which don't
+# redraw everything every frame, partial_redraw_mode.)
+raise_clicked_widgets = True
+
+# While a byMouse-resizeable widget is being resized, it isn't redrawn for
+# every MOUSEMOTION, but at most once per frame (when it's next updated).
+# For a top-level widget even that can be avoided, by setting resize_preview
+# to 'scaled' (show the widget's last image, stretched to the new size) or to
+# 'outline' (show its last image, unstretched, inside an outline of the new
+# size), so that the widget is only redrawn properly when the mouse button is
+# released.  The default, 'live', redraws it properly once per frame.  A
+# widget's own .resize_preview attribute, if it has one, overrides this.
+resize_preview = 'live'
+
 # To "deglitch" the mouse cursor (and improve performance a bit), we don't
 # usually set it until WidgetGroup.notify() is ready to return to the
 # application after processing events.  Here's where we keep the new mouse
@@ -155,7 +192,10 @@ def deglitched_set_cursor_pt2():
     if ( (0 == WidgetGroup_notify_recursion_counter) and
          (new_mouse_cursor is not None) ):
         if pygame.mouse.get_cursor() != new_mouse_cursor:
-            pygame.mouse.set_cursor(*new_mouse_cursor)
+            try:
+                pygame.mouse.set_cursor(*new_mouse_cursor)
+            except pygame.error:
+                pass  # e.g., SDL's headless "dummy" video driver has no cursors
         new_mouse_cursor = None
 
 def deglitched_set_cursor(*mouse_cursor):
@@ -175,12 +215,149 @@ menu_hover_color = (224,237,243)  # light bluish-grey
 button_up_color = (215,222,240)  # greyer bluish-grey
 button_dn_color = (202,207,223)  # bluish-grey
 
+
+
+def _hashable(value):
+    '''Return value (e.g., a color, or a pair of colors) with any lists or
+    pygame Colors converted to tuples, so that it can be used as a dict key.
+    '''
+    if isinstance(value, (list, tuple, pygame.Color)):
+        value = tuple([_hashable(x) for x in value])
+    return value
+
+
+#------------------[ Begin code for cached box chrome ]------------------
+
+# Two-color ("3D") boxes around widgets (see Widget._box_around) are drawn by
+# blitting four solid strips: the top & left edges in the first color and the
+# bottom & right edges in the second.  The strips are shared by every box
+# with the same color and edge length, and the list of strips for each
+# (colors, size) is kept, so drawing a bevel is one blits() call.  (Single-
+# color boxes are still drawn with pygame.draw.rect(), which is one call and
+# turned out to be faster than blitting strips.)
+
+CHROME_CACHE_MAX = 1000  # how many strips, and strip lists, are kept
+chrome_strips = {}  # maps (color, width, height) -> solid-color Surface
+chrome_layouts = {}  # maps (colors, size) -> [(strip, position), ...]
+
+def _opaque(color):
+    '''True if color has no alpha, or full alpha.'''
+    return (len(color) < 4) or (color[3] == 255)
+
+def _chrome_strip(color, w, h):
+    key = (color, w, h)
+    strip = chrome_strips.get(key)
+    if strip is None:
+        if len(chrome_strips) >= CHROME_CACHE_MAX:
+            chrome_strips.clear()
+        strip = chrome_strips[key] = pygame.Surface((w, h))
+        strip.fill(color)
+    return strip
+
+def bevel_chrome(colors, size):
+    '''Return a list of (surface, position) pairs which, blitted in order,
+    draw a two-color box (colors[0] for the top & left, colors[1] for the
+    bottom & right) around the edges of a surface of the given size, which
+    must be at least 2x2.  Suitable for surface.blits().
+    '''
+    key = (_hashable(colors), tuple(size))
+    layout = chrome_layouts.get(key)
+    if layout is None:
+        (c0, c1) = key[0]
+        (w, h) = key[1]
+        layout = [ (_chrome_strip(c1, 1, h-1), (w-1, 1)),  # right
+                   (_chrome_strip(c1, w-2, 1), (1, h-1)),  # bottom
+                   (_chrome_strip(c0, 1, h-1), (0, 1)),    # left
+                   (_chrome_strip(c0, w, 1), (0, 0)) ]     # top
+        if len(chrome_layouts) >= CHROME_CACHE_MAX:
+            chrome_layouts.clear()
+        chrome_layouts[key] = layout
+    return layout
+
+#-------------------[ End code for cached box chrome ]-------------------
+
+
+#--------------------[ Begin code for sharing fonts ]--------------------
+
+# Loading a font (and, worse, looking up a system font) is slow, and each
+# pygame Font object holds its own copy of the font, so fonts are loaded
+# once by get_font() or get_sysfont() and then shared by all the widgets
+# (and applications) which ask for the same one.  Don't change the style
+# (bold, italic, underline) of a shared Font; ask for another one instead.
+#
+# Measuring text (with font.size) happens a lot, often for the same strings,
+# so text_size(font, text) remembers the results (up to TEXT_SIZE_CACHE_MAX
+# strings per font).
+
+fallback_fonts = 'arial,microsoftsansserif,courier'  # for get_sysfont, if a font file is missing
+fonts = {}  # maps (path, size, bold, italic) -> Font
+sysfonts = {}  # maps (names, size, bold, italic) -> Font
+missing_font_files = set()  # the font files which couldn't be loaded (and have been warned about)
+
+def get_font(path=None, size=12, bold=False, italic=False, fallback_size=None):
+    '''Return the Font loaded from the font file path (by default, Vera.ttf,
+    in the same folder as this module), in the given size and style.  If the
+    file can't be loaded, a warning is printed (just once per file), and a
+    system font named in fallback_fonts is used instead, in fallback_size (by
+    default, the same size).
+    '''
+    if path is None:
+        path = rel2me('Vera.ttf')
+    key = (os.path.abspath(path), size, bool(bold), bool(italic))
+    font = fonts.get(key)
+    if font is None:
+        if key[0] not in missing_font_files:
+            try:
+                font = pygame.font.Font(key[0], size)
+                font.set_bold(bold)
+                font.set_italic(italic)
+            except (IOError, OSError, RuntimeError, pygame.error):
+                print('Warning: could not load "' + path + '" -- text will be ugly!')
+                missing_font_files.add(key[0])
+        if font is None:
+            font = get_sysfont(fallback_fonts, fallback_size or size, bold, italic)
+        fonts[key] = font
+    return font
+
+def get_sysfont(names, size=12, bold=False, italic=False):
+    '''Return the system font (as from pygame.font.SysFont) for names, which
+    is a comma-separated string (or list) of font names, in order of
+    preference.  The system fonts are only searched once for each request.
+    '''
+    if not isinstance(names, str):
+        names = ','.join(names)
+    key = (names, size, bool(bold), bool(italic))
+    font = sysfonts.get(key)
+    if font is None:
+        font = sysfonts[key] = pygame.font.SysFont(names, size, bold, italic)
+    return font
+
+TEXT_SIZE_CACHE_MAX = 2000  # how many strings' sizes text_size() remembers, per font
+text_sizes = weakref.WeakKeyDictionary()  # maps Font -> {text: (width,height)}
+_batch_text_sizes = None  # (font, text) -> size, while constructing widgets in bulk (see Widget.many)
+
+def text_size(font, text):
+    '''Return font.size(text), remembering it for next time.'''
+    if _batch_text_sizes is not None:
+        size = _batch_text_sizes.get((font, text))
+        if size is not None:
+            return size
+    try:
+        sizes = text_sizes[font]
+    except KeyError:
+        sizes = text_sizes[font] = {}
+    size = sizes.get(text)
+    if size is None:
+        if len(sizes) >= TEXT_SIZE_CACHE_MAX:
+            sizes.clear()
+        size = sizes[text] = font.size(text)
+    return size
+
 # 11 point Vera is a good font for menus and button labels
-try:
-    vera = pygame.font.Font(rel2me('Vera.ttf'), 12)
-except:
-    print('Warning: could not load "Vera.ttf" -- text will be ugly!')
-    vera = pygame.font.SysFont('arial,microsoftsansserif,courier', 13)
+# (if Vera.ttf is missing, 13 point Arial, since the fallback fonts look smaller)
+vera = get_font(rel2me('Vera.ttf'), 12, fallback_size=13)
+
+#---------------------[ End code for sharing fonts ]---------------------
 
 
 # Global WIDGETEVENT is the pygame event number we'll use for all events
@@ -192,6 +369,212 @@ except:
 WIDGETEVENT = pygame.USEREVENT
 
 
+#-------------[ Begin code for glyph-atlas text rendering ]-------------
+
+# Normally, text is rendered with font.render(), which goes through FreeType
+# (SDL_ttf) for every character of every string, every time a widget is
+# updated.  For screens full of labels, that can dominate the frame time.
+#
+# So Labels (and the widgets derived from them, such as TextEditBoxes and
+# the captions of Titlebars) can instead opt into drawing their text from a
+# GlyphAtlas, by setting use_glyph_atlas=True.  A GlyphAtlas renders each
+# character of a (font, color) pair just once, into one big surface.  A
+# string is drawn by blitting its characters' rectangles from that surface
+# onto a string surface, which is then kept (up to ATLAS_MAX_STRINGS of them
+# per atlas), so redrawing an unchanged label is a single blit, and drawing
+# a changed one (e.g., as the user types) doesn't need FreeType at all.
+#
+# pygame's font.metrics() only gives the advance of each glyph, not the
+# kerning between pairs of glyphs, so the distance from one character to the
+# next is measured once per pair of characters, with font.size().  FreeType
+# positions glyphs at fractional pixels, so text drawn from an atlas is
+# occasionally a pixel narrower or wider than the same text from
+# font.render(); that's why using an atlas is optional.
+
+ATLAS_WIDTH = 512  # width of glyph-atlas surfaces, in pixels
+ATLAS_MAX_STRINGS = 500  # how many rendered strings each GlyphAtlas keeps
+
+class GlyphAtlas(object):
+    '''A cache of the rendered glyphs (and strings) of one font in one color,
+    for drawing text quickly.  Use get_glyph_atlas(font, color) to get one.
+    '''
+    def __init__(self, font, color):
+        self.font = font
+        self.color = color
+        self.glyphs = {}  # maps character -> its Rect within self.surface
+        self.steps = {}  # maps (char1,char2) -> distance from char1 to char2
+        self.strings = {}  # maps text -> its rendered surface
+        self.surface = pygame.Surface((ATLAS_WIDTH, 4*(font.get_linesize()+2)), SRCALPHA, 32)
+        self.surface.fill((0,0,0,0))
+        self.next_pos = (0, 0)  # where the next glyph will go in self.surface
+        self.row_bottom = 0  # bottom of the tallest glyph in the current row
+
+    def _add_glyph(self, ch):
+        '''Render the character ch, add it to the atlas, and return its Rect.'''
+        img = self.font.render(ch, True, self.color)
+        w, h = img.get_size()
+        x, y = self.next_pos
+        if (x + w) > ATLAS_WIDTH:
+            x, y = 0, self.row_bottom  # start a new row
+        if (y + h) > self.surface.get_height():
+            # out of room; make a taller atlas surface
+            bigger = pygame.Surface((max(ATLAS_WIDTH, w), 2*(y+h)), SRCALPHA, 32)
+            bigger.fill((0,0,0,0))
+            bigger.blit(self.surface, (0,0), special_flags=BLEND_RGBA_MAX)  # (copy, don't blend)
+            self.surface = bigger
+        self.surface.blit(img, (x,y), special_flags=BLEND_RGBA_MAX)
+        self.next_pos = (x+w, y)
+        self.row_bottom = max(self.row_bottom, y+h)
+        rect = self.glyphs[ch] = Rect(x, y, w, h)
+        return rect
+
+    def _layout(self, text):
+        '''Return a list of (x, glyph_rect) for the characters of text, and
+        the (width, height) of the whole string.
+        '''
+        glyphs = self.glyphs
+        steps = self.steps
+        font = self.font
+        layout = []
+        x = 0
+        h = 0
+        prev = None
+        for ch in text:
+            rect = glyphs.get(ch)
+            if rect is None:
+                rect = self._add_glyph(ch)
+            if prev is not None:
+                step = steps.get((prev,ch))
+                if step is None:
+                    step = steps[(prev,ch)] = font.size(prev+ch)[0] - font.size(ch)[0]
+                x += step
+            layout.append( (x, rect) )
+            if rect.height > h:
+                h = rect.height
+            prev = ch
+        return layout, (x + rect.width, h)
+
+    def render(self, text):
+        '''Return a surface (with a transparent background) showing text,
+        like font.render(text, True, color).  Don't modify it; it's shared.
+        '''
+        surf = self.strings.get(text)
+        if surf is None:
+            if not text:
+                return self.font.render(text, True, self.color)
+            layout, size = self._layout(text)
+            surf = pygame.Surface(size, SRCALPHA, 32)
+            surf.fill((0,0,0,0))
+            # (BLEND_RGBA_MAX, so that overlapping antialiased edges of
+            # neighboring glyphs don't wipe each other out)
+            atlas = self.surface
+            if hasattr(surf, 'blits'):
+                surf.blits([(atlas, (x,0), rect, BLEND_RGBA_MAX) for (x, rect) in layout], False)
+            else:
+                for (x, rect) in layout:  # older pygame versions lack blits()
+                    surf.blit(atlas, (x,0), rect, BLEND_RGBA_MAX)
+            if len(self.strings) >= ATLAS_MAX_STRINGS:
+                self.strings.clear()
+            self.strings[text] = surf
+        return surf
+
+    def size(self, text):
+        '''Return the (width, height) of text, like font.size(text).'''
+        surf = self.strings.get(text)
+        if surf is not None:
+            return surf.get_size()
+        if not text:
+            return self.font.size(text)
+        return self._layout(text)[1]
+
+    def draw(self, surface, text, pos):
+        '''Draw text onto surface, with its topleft corner at pos.'''
+        if text:
+            surface.blit(self.render(text), pos)
+
+glyph_atlases = {}  # maps (font, color) -> GlyphAtlas
+
+def get_glyph_atlas(font, color):
+    '''Return the GlyphAtlas for font & color, creating it if necessary.'''
+    key = (font, tuple(color))
+    try:
+        return glyph_atlases[key]
+    except KeyError:
+        atlas = glyph_atlases[key] = GlyphAtlas(font, tuple(color))
+        return atlas
+
+#--------------[ End code for glyph-atlas text rendering ]--------------
+
+
+#-------------[ Begin code for delivering widget result events ]-------------
+
+# Result events (button clicks, checkbox changes, entered text, scrollbar
+# value changes) can reach the application in any or all of three ways:
+#
+#   1. As WIDGETEVENT events posted to the pygame event queue, which the
+#      application's event loop picks up.  This is the original way, and it
+#      is still the default: set widget.post_events = False to turn it off
+#      for a widget.  (But don't turn it off for a widget which you pass to
+#      modal_popup, because modal_popup waits for a posted result event!)
+#
+#   2. By calling a callback function given to the widget itself, via the
+#      on_click= (buttons), on_change= (checkboxes, scroll bars), or
+#      on_enter= (text-edit boxes) parameters or attributes.
+#
+#   3. By calling a handler function registered by Id in the handlers
+#      routing table, via set_handler(Id, function).  That replaces a long
+#      if/elif chain on event.Id in the application's event loop with one
+#      dictionary lookup.
+#
+# Callbacks and handlers are called synchronously, from within the widget's
+# notify method (i.e., from within WidgetGroup.notify), with the event as
+# their only parameter.  (Except that a ScrollBar value change which its
+# event policy deferred is reported from WidgetGroup.update() or .draw(), or
+# when timers are serviced: see ScrollBar.)  Internal events are never passed
+# to them.
+
+handlers = {}  # the routing table: maps widget Id -> handler function
+
+# While an event recording is being made or replayed (see GUIpygame_replay.py),
+# this is the recorder.  WidgetGroup.notify() passes it each event the
+# application gives to a WidgetGroup, deliver_event() passes it each result
+# event, start_of_frame() tells it when each frame starts, and
+# service_timers() tells it when timers are due.
+event_recorder = None
+
+def set_handler(Id, handler):
+    '''Register handler (a function taking one parameter, an event) to be
+    called whenever a widget whose Id is Id generates a result event.  Pass
+    handler=None to remove the handler for that Id.
+    '''
+    if handler is None:
+        handlers.pop(Id, None)
+    else:
+        handlers[Id] = handler
+
+def deliver_event(sender, ev, callback=None):
+    '''Deliver a result event generated by the sender widget: call the
+    widget's callback (if any), then the handler for ev.Id (if any), then
+    post the event to the pygame event queue (unless sender.post_events is
+    False).
+    '''
+    if not ev.internal:
+        if event_recorder is not None:
+            event_recorder.result(ev)
+        if callback is not None:
+            callback(ev)
+        try:
+            handler = handlers.get(ev.Id)
+        except TypeError:
+            handler = None  # unhashable Id
+        if handler is not None:
+            handler(ev)
+    if getattr(sender, 'post_events', True) or ev.internal:
+        pygame.event.post(ev)
+
+#--------------[ End code for delivering widget result events ]--------------
+
+
 #--------------[ Begin code for finding & handling overlaps ]--------------
 
 # The usual case is that the display (or at least all the widgets on it) are
@@ -207,6 +590,12 @@ def partial_redraw_mode(partial=True):
     (If your app fully redraws the screen, or at least all the displayed
     widgets, each time through the event/draw loop, then you can ignore all
     this, because the GUI system will keep track of it all automatically.)
+
+    Restacking top-level widgets (e.g., when raise_clicked_widgets brings a
+    clicked window to the front) changes what the screen should show where
+    they overlap, without changing any widget's image.  So after changed
+    is set, redraw the group (or at least the areas returned by its next
+    .draw(); see WidgetGroup.set_z).
     '''
     global full_redraws
     full_redraws = not partial
@@ -216,9 +605,10 @@ def screen_is_cleared():
     call screen_is_cleared() whenever it clears the screen, before drawing any
     widgets onto it.
     '''
-    global drawn_sprites, sorted_draw_list, draw_counter
+    global drawn_sprites, sorted_draw_list, sorted_draw_index, draw_counter
     drawn_sprites = {}
     sorted_draw_list = []
+    sorted_draw_index = {}
     draw_counter = 0
 
 # To determine which overlapping widget is on top, we need to know the order
@@ -228,6 +618,7 @@ def screen_is_cleared():
 # functions.
 drawn_sprites = {}
 sorted_draw_list = []
+sorted_draw_index = {}
 draw_counter = 0
 is_drawing = False
 # is_drawing gets set True when WidgetGroup.draw is called, and we start
@@ -236,18 +627,21 @@ is_drawing = False
 # to empty and draw_counter is reset to zero.  Each sprite gets an entry in
 # drawn_sprites containing the index number with which it was last drawn.
 # (So the if widgetx is the 3rd widget drawn, then drawn_sprites[widgetx]=3.)
-# Last, sorted_draw_list gets the list of drawn widgets in sorted order.
+# Last, sorted_draw_list gets the list of drawn widgets in sorted order, and
+# sorted_draw_index maps each of them to its position in that list.
 
 def done_drawing():
     '''The application could call this explicitly when done drawing widgets
     (either just before or just after calling pygame.display.update), or it
     can just rely on this being called by WidgetGroup.notify().
     '''
-    global is_drawing, sorted_draw_list
+    global is_drawing, sorted_draw_list, sorted_draw_index, in_frame
     if is_drawing:
         sorted_draw_list = sort_draw_list()
+        sorted_draw_index = dict([(sprite, ndx) for (ndx, sprite) in enumerate(sorted_draw_list)])
         # print('dbg: top-level widgets are:' + ', '.join([repr(w) for w in sorted_draw_list]))
     is_drawing = False
+    in_frame = False  # the next update or draw will start a new frame
 
 def note_draws(sprites):
     '''Called by WidgetGroup.draw to note the order in which the top-level
@@ -286,18 +680,214 @@ def younger_siblings(sprite):
     if hasattr(sprite, 'parent') and (sprite.parent is not None):
         # get list of younger fellow children of the same parent widget
         result = sprite.parent.children.sprites_painted_after(sprite)
-    elif sprite in drawn_sprites:
+    elif sprite in sorted_draw_index:
         # this is a top-level sprite, so get list of top-level sprites drawn after this one
-        ndx = sorted_draw_list.index(sprite)
+        ndx = sorted_draw_index[sprite]
         result = sorted_draw_list[ndx+1:]
     else:
         result = []
     return result
 
+def _younger_siblings_at(sprite, pos):
+    '''Like younger_siblings(sprite), except that the result may leave out
+    sprites whose rects don't contain pos, when they can be found with a hit
+    index (see "vectorized hit testing").
+    '''
+    parent = getattr(sprite, 'parent', None)
+    if parent is not None:
+        index = parent.children.hit_index
+        if index is not None:
+            return index.younger_at(sprite, pos)
+    elif sprite in sorted_draw_index:
+        for group in sprite.groups():
+            index = getattr(group, 'hit_index', None)
+            if index is not None:
+                result = index.drawn_after_at(sprite, pos)
+                if result is not None:
+                    return result
+    return younger_siblings(sprite)
+
+# Top-level widgets which are entirely hidden under opaque widgets drawn
+# after them (in the same WidgetGroup) are neither updated nor drawn, and
+# those which are partly hidden have only their visible parts drawn.  Set
+# cull_occluded_widgets=False to always update and draw everything.
+cull_occluded_widgets = True
+MAX_VISIBLE_PARTS = 8  # if a widget shows in more pieces than this, draw all of it
+
+def _is_opaque(sprite):
+    '''True if sprite is a widget whose image completely hides whatever is
+    drawn under it.
+    '''
+    if not isinstance(sprite, Widget):
+        return False
+    bgcolor = getattr(sprite, 'bgcolor', None)
+    if (not bgcolor) or (not _opaque(bgcolor)):
+        return False
+    image = sprite.image
+    if (image.get_flags() & SRCALPHA) or (image.get_colorkey() is not None):
+        return False
+    alpha = image.get_alpha()
+    return (alpha is None) or (alpha == 255)
+
+def _visible_parts(rect, occluders):
+    '''Return a list of Rects making up the parts of rect which aren't
+    covered by any of the occluders (a list of Rects), or None if that would
+    be more than MAX_VISIBLE_PARTS pieces.
+    '''
+    parts = [rect]
+    for ndx in rect.collidelistall(occluders):
+        occluder = occluders[ndx]
+        remaining = []
+        for part in parts:
+            if not part.colliderect(occluder):
+                remaining.append(part)
+                continue
+            covered = part.clip(occluder)
+            if covered.top > part.top:
+                remaining.append(Rect(part.left, part.top, part.width, covered.top-part.top))
+            if covered.bottom < part.bottom:
+                remaining.append(Rect(part.left, covered.bottom, part.width, part.bottom-covered.bottom))
+            if covered.left > part.left:
+                remaining.append(Rect(part.left, covered.top, covered.left-part.left, covered.height))
+            if covered.right < part.right:
+                remaining.append(Rect(covered.right, covered.top, part.right-covered.right, covered.height))
+        parts = remaining
+        if not parts:
+            break
+        if len(parts) > MAX_VISIBLE_PARTS:
+            return None
+    return parts
+
+def visible_parts_of(sprites, before_update=False):
+    '''For each of a list of top-level sprites (in drawing order), return
+    the list of its visible parts (see _visible_parts): [] if it is hidden
+    under opaque widgets later in the list, or None if it should just be
+    drawn in its entirety.
+
+    If before_update is True, then the sprites' images might not be the
+    right size yet, so the sprites are taken to be at least as big as their
+    rects, and the opaque widgets to be no bigger than their rects.
+    '''
+    result = [None] * len(sprites)
+    occluders = []
+    for ndx in range(len(sprites)-1, -1, -1):
+        sprite = sprites[ndx]
+        (w, h) = sprite.image.get_size()
+        if before_update:
+            area = Rect(sprite.rect.topleft, (max(w, sprite.rect.width), max(h, sprite.rect.height)))
+        else:
+            area = Rect(sprite.rect.topleft, (w, h))
+        if occluders:
+            result[ndx] = _visible_parts(area, occluders)
+        if _is_opaque(sprite):
+            if before_update:
+                area = Rect(sprite.rect.topleft, (min(w, sprite.rect.width), min(h, sprite.rect.height)))
+            occluders.append(area)
+    return result
+
 #---------------[ End code for finding & handling overlaps ]---------------
 
 
 
+#-----------[ Begin code for timers & once-per-frame deferred work ]-----------
+
+# Some widgets need to do things at a later time, rather than in response to
+# an event: e.g., a held-down scrollbar arrow button keeps on scrolling.  Such
+# a widget calls start_timer(widget, delay), and when that many milliseconds
+# have passed, its .on_timer(now) method gets called.  Timers are one-shot;
+# to keep repeating, on_timer() just calls start_timer() again.
+#
+# Timers are serviced by service_timers(), which is called whenever a
+# WidgetGroup is notified of an event or updated.  So that applications which
+# block in pygame.event.wait() still get their timers serviced, we also ask
+# pygame to post a WAKEUPEVENT when the next timer is due.  WidgetGroup.notify()
+# reports it as handled, so the application can ignore it.
+#
+# WAKEUPEVENT is an event type of its own, rather than a WIDGETEVENT, because
+# pygame keeps just one timer per event type: arming ours with WIDGETEVENT
+# would cancel any pygame.time.set_timer(WIDGETEVENT, ...) (i.e., USEREVENT)
+# timer of the application's.  (With a pygame too old to allocate event
+# types, it's None, and there are no wake-ups.)
+#
+# All the timing is done with clock(), which is normally pygame's millisecond
+# clock; the event replayer (GUIpygame_replay.py) substitutes the recorded
+# times, so that replays are repeatable.
+clock = pygame.time.get_ticks
+timed_widgets = {}  # maps widget -> clock() value when it is due
+
+# Widgets can also ask to be called back (via their .on_new_frame() method)
+# at the start of the next frame, i.e., the next time the application calls
+# WidgetGroup.update() or WidgetGroup.draw() after processing events.  That's
+# how, e.g., ScrollBars coalesce value changes, so that the application sees
+# at most one value-change event per frame.
+frame_counter = 0  # incremented at the start of each frame
+in_frame = False  # True between the start of a frame and the next event
+deferred_widgets = []  # widgets waiting for their .on_new_frame() call
+
+if hasattr(pygame.event, 'custom_type'):
+    WAKEUPEVENT = pygame.event.custom_type()
+else:
+    WAKEUPEVENT = None
+
+def _arm_wakeup(delay):
+    '''Ask pygame to post a WAKEUPEVENT after delay milliseconds, to wake up
+    applications which wait for events.
+    '''
+    if WAKEUPEVENT is None:
+        return
+    try:
+        pygame.time.set_timer(pygame.event.Event(WAKEUPEVENT), max(1, int(delay)), 1)  # one-shot
+    except TypeError:
+        pass  # older pygame versions can't post event objects from timers
+
+def start_timer(widget, delay):
+    '''Call widget.on_timer(now) after delay milliseconds.  (If a timer was
+    already running for this widget, it is replaced.)
+    '''
+    timed_widgets[widget] = clock() + delay
+    _arm_wakeup(min(timed_widgets.values()) - clock())
+
+def stop_timer(widget):
+    '''Cancel the timer for widget, if there is one.'''
+    timed_widgets.pop(widget, None)
+
+def service_timers():
+    '''Call .on_timer(now) for each widget whose timer is due.'''
+    if timed_widgets:
+        now = clock()
+        due = [widg for widg in timed_widgets if timed_widgets[widg] <= now]
+        if due and (event_recorder is not None):
+            event_recorder.timers()
+        for widg in due:
+            del timed_widgets[widg]
+            widg.on_timer(now)  # this might restart the timer
+        if timed_widgets:
+            _arm_wakeup(min(timed_widgets.values()) - now)
+
+def run_at_next_frame(widget):
+    '''Call widget.on_new_frame() at the start of the next frame.'''
+    if widget not in deferred_widgets:
+        deferred_widgets.append(widget)
+    _arm_wakeup(1)  # make sure there will be a next frame
+
+def start_of_frame():
+    '''Called by WidgetGroup.update() and WidgetGroup.draw(); the first such
+    call after events have been processed starts a new frame.
+    '''
+    global frame_counter, in_frame, deferred_widgets
+    if not in_frame:
+        in_frame = True
+        frame_counter += 1
+        if event_recorder is not None:
+            event_recorder.frame()
+        widgets, deferred_widgets = deferred_widgets, []
+        for widg in widgets:
+            widg.on_new_frame()
+
+#------------[ End code for timers & once-per-frame deferred work ]------------
+
+
+
 #-------------[ Begin code with hard-coded GUI element sizes ]-------------
 
 # GUIpygame.png is a file containing the images we need to draw various little graphics
@@ -340,9 +930,17 @@ SB_WIDTH_17 = 17  # scrollbars are 17 pixels wide
 SB_ARROWSIZE_10 = 10  # the arrow buttons at each end of a scrollbar are 10 pixels long
 SB_ENDCAPSIZE_11 = SB_ARROWSIZE_10 + SB_BORDER_1  # 1 pixel border + 10 pixel arrow button at each end
 SB_CHANNEL_WIDTH_15 = SB_WIDTH_17 - (2 * SB_BORDER_1)  # buttons and slider are 15 pixels wide
+SB_MIN_LENGTH_42 = 42  # scrollbars are at least 42 pixels long
 # Note: the numbers are included in the names because the purpose of these
 # symbols is documentation, not to let you change scrollbar dimensions.
 
+# default auto-repeat timing (in milliseconds) for held-down scrollbar arrow
+# and trough buttons; see ScrollBar.set_autorepeat()
+SB_REPEAT_DELAY = 400  # delay before the first repeat
+SB_REPEAT_INTERVAL = 80  # initial interval between repeats...
+SB_REPEAT_ACCEL = 0.85  # ...which is multiplied by this after each repeat...
+SB_REPEAT_MIN_INTERVAL = 15  # ...until it gets down to this
+
 # a titlebar dimension
 TB_HEIGHT_21 = 21  # titlebars are 21 pixels high
 
@@ -375,6 +973,10 @@ def _distance_squared(pt1, pt2):
     return 1 + dx*dx + dy*dy;
 
 
+def _second(item):
+    return item[1]
+
+
 def list_of_focusable_widgets_at_mouse(spritelist, pos):
     '''This is debug code'''
     result = []
@@ -447,6 +1049,224 @@ def notify_all_widgets(ev):
     # pygame.event.post(ev)
 
 
+#-------------[ Begin code for finding widgets by Id or by class ]-------------
+
+class WidgetRegistry(object):
+    '''A WidgetRegistry keeps track of every widget which is in at least one
+    WidgetGroup (including the .children group of another widget), indexed
+    by Id and by class, so that widgets can be found without walking the
+    .children of every widget.
+
+    It is maintained automatically, by WidgetGroup (so add_widgets,
+    remove_widgets, remove_nested_widgets, WidgetGroup.add and
+    WidgetGroup.remove all keep it up to date), and by the Widget.Id
+    property (so it notices when a registered widget's Id is changed).  Use
+    the module-level registry instance, or the find, find_all and
+    find_prefix functions.
+
+    The registry holds only weak references, so it doesn't keep widgets
+    alive after the application discards them.
+    '''
+    def __init__(self):
+        self.counts = weakref.WeakKeyDictionary()  # widget -> number of WidgetGroups it's in
+        self.by_id = {}  # Id -> WeakKeyDictionary of widgets with that Id, in order registered
+        self.by_class = {}  # class -> WeakKeyDictionary of widgets of that class or a subclass
+        self.sorted_ids = []  # sorted list of all the string Ids, for prefix queries
+        self.class_indexes = {}  # class -> list of the by_class values its instances go in
+
+    def added(self, widget):
+        '''Called when widget is added to a WidgetGroup.'''
+        n = self.counts.get(widget, 0)
+        self.counts[widget] = n + 1
+        if 0 == n:
+            self._index(widget, widget.Id)
+            indexes = self.class_indexes.get(type(widget))
+            if indexes is None:
+                indexes = self.class_indexes[type(widget)] = [
+                    self.by_class.setdefault(cls, weakref.WeakKeyDictionary())
+                    for cls in type(widget).__mro__ if issubclass(cls, Widget) ]
+            for widgets in indexes:
+                widgets[widget] = True
+
+    def removed(self, widget):
+        '''Called when widget is removed from a WidgetGroup.'''
+        n = self.counts.get(widget, 0)
+        if n > 1:
+            self.counts[widget] = n - 1
+        elif 1 == n:
+            del self.counts[widget]
+            self._unindex(widget, widget.Id)
+            for cls in type(widget).__mro__:
+                if cls in self.by_class:
+                    self.by_class[cls].pop(widget, None)
+
+    def renamed(self, widget, old_Id):
+        '''Called when a widget's Id is changed.'''
+        if widget in self.counts:
+            self._unindex(widget, old_Id)
+            self._index(widget, widget.Id)
+
+    def _index(self, widget, Id):
+        try:
+            widgets = self.by_id.get(Id)
+        except TypeError:
+            return  # unhashable Id; such widgets can only be found by class
+        if widgets is None:
+            widgets = self.by_id[Id] = weakref.WeakKeyDictionary()
+            if isinstance(Id, str):
+                bisect.insort(self.sorted_ids, Id)
+        widgets[widget] = True
+
+    def _unindex(self, widget, Id):
+        try:
+            widgets = self.by_id.get(Id)
+        except TypeError:
+            return
+        if widgets is not None:
+            widgets.pop(widget, None)
+            if not widgets:
+                self._forget_id(Id)
+
+    def _forget_id(self, Id):
+        del self.by_id[Id]
+        if isinstance(Id, str):
+            ndx = bisect.bisect_left(self.sorted_ids, Id)
+            if (ndx < len(self.sorted_ids)) and (self.sorted_ids[ndx] == Id):
+                del self.sorted_ids[ndx]
+
+    def find(self, Id):
+        '''Return the widget whose Id is Id (the most recently registered one,
+        if more than one widget has that Id), or None.
+        '''
+        try:
+            widgets = self.by_id.get(Id)
+        except TypeError:
+            widgets = None
+        if widgets:
+            return list(widgets.keys())[-1]
+        return None
+
+    def find_all(self, cls=None, Id=None):
+        '''Return a list of all the registered widgets which are instances of
+        cls (or a subclass of it), and/or whose Id is Id.
+        '''
+        if Id is not None:
+            try:
+                result = list(self.by_id.get(Id, {}).keys())
+            except TypeError:
+                result = []
+            if cls is not None:
+                result = [widg for widg in result if isinstance(widg, cls)]
+        else:
+            result = list(self.by_class.get(cls or Widget, {}).keys())
+        return result
+
+    def find_prefix(self, prefix):
+        '''Return a list of all the registered widgets whose Ids are strings
+        starting with prefix, sorted by Id.
+        '''
+        result = []
+        ids = self.sorted_ids
+        ndx = bisect.bisect_left(ids, prefix)
+        stale = []
+        while (ndx < len(ids)) and ids[ndx].startswith(prefix):
+            widgets = self.by_id[ids[ndx]]
+            if widgets:
+                result.extend(widgets.keys())
+            else:
+                stale.append(ids[ndx])  # all its widgets have been garbage-collected
+            ndx += 1
+        for Id in stale:
+            self._forget_id(Id)
+        return result
+
+registry = WidgetRegistry()
+
+def find(Id):
+    '''Return the widget whose Id is Id, or None.  (See WidgetRegistry.)'''
+    return registry.find(Id)
+
+def find_all(cls=None, Id=None):
+    '''Return a list of the widgets of class cls, and/or with Id=Id.
+    (See WidgetRegistry.)'''
+    return registry.find_all(cls, Id)
+
+def find_prefix(prefix):
+    '''Return a list of the widgets whose Ids start with prefix.
+    (See WidgetRegistry.)'''
+    return registry.find_prefix(prefix)
+
+#--------------[ End code for finding widgets by Id or by class ]--------------
+
+
+#--------------[ Begin code for anchoring widgets to the display ]--------------
+
+# A top-level widget can be anchored to the edges or the center of the display
+# surface (see Widget.set_anchor), so that when the display is resized (after
+# a VIDEORESIZE event) the widget is moved (and/or stretched) to match,
+# instead of the application having to reposition it.  Anchors are resolved
+# when the widget (or its WidgetGroup) is updated, and only if the size of
+# the display has changed since they were last resolved.
+
+_anchor_edges = ('left', 'right', 'top', 'bottom', 'centerx', 'centery')
+
+def _anchor_coord(value, edge, extent, display_size):
+    '''Return the absolute coordinate for one of a widget's anchors (see
+    Widget.set_anchor), or None if value is None.  edge is the name of the
+    anchored edge, and extent is the display's width or height.
+    '''
+    if value is None:
+        return None
+    if isinstance(value, Widget):
+        return getattr(value.rect, edge)  # line up with the same edge of that widget
+    if isinstance(value, str) and value.endswith('%'):
+        offset = int(round(extent * float(value[:-1]) / 100.0))
+        if edge.startswith('center'):
+            return offset
+    else:
+        offset = value
+        if edge.startswith('center'):
+            return (extent // 2) + offset
+    if edge in ('right', 'bottom'):
+        return extent - offset
+    return offset
+
+#--------------[ End code for anchoring widgets to the display ]--------------
+
+
+#--------------[ Begin code for constructing widgets in bulk ]--------------
+
+# While Widget.many() is constructing widgets (if share_identical_images is
+# True), the widgets whose images are only drawn by their .update() (see
+# _keyed_updates) start out sharing one blank image per size, instead of
+# each allocating its own.  Each gets an
+# image of its own when it's first updated: either one shared with widgets
+# that look exactly the same (see share_identical_images), or a copy (see
+# Widget.unshare_image).  Meanwhile, text sizes come from _batch_text_sizes,
+# which Widget.many() fills in with each distinct text's size, just once.
+_batch_surfaces = None  # (size, transparent) -> blank Surface, during Widget.many()
+
+#--------------[ End code for constructing widgets in bulk ]--------------
+
+
+#--------------[ Begin code for alpha-mask hit testing ]--------------
+
+# A widget's collidepoint() normally goes by its rect, so a click on a
+# transparent part of an irregularly shaped image button (or in the gaps of a
+# transparent label) lands on that widget, instead of on the one that shows
+# through.  Setting widget.hit_mask = True makes collidepoint() (and so also
+# top_collidepoint(), get_widget_at(), etc.) go by the widget's rendered
+# image instead: after the usual check of its rect, the point has to be on
+# a pixel whose alpha is more than HIT_MASK_THRESHOLD (or, for a colorkeyed
+# image, not of the colorkey).  The pygame.mask.Mask of the image is made
+# when it's first needed, and kept until the image is redrawn (see
+# widget.image_version) or replaced.
+
+HIT_MASK_THRESHOLD = 127
+
+#--------------[ End code for alpha-mask hit testing ]--------------
+
+
 class Widget(pygame.sprite.Sprite):
     '''A widget is a sprite that can receive pygame events via its notify() method.
 
@@ -496,7 +1316,8 @@ class Widget(pygame.sprite.Sprite):
            WrapperForm, the widget should resize along with the wrapper.  Or
            it can be set to 'byMouse' if the widget can also be resized by
            dragging the borders with the mouse.  (You can also set minimum
-           resize width and height as widget.min_width and widget.min_height.)
+           resize width and height as widget.min_width and widget.min_height.
+           And see resize_preview, for how it's shown while being resized.)
 
         10. widget.min_width & widget.min_height  specify the minimum width
            and height, respectively, for a resizeable widget.  (These are
@@ -506,6 +1327,38 @@ class Widget(pygame.sprite.Sprite):
            True when the mouse cursor is over the button.  (Other widgets can
            just leave this set to False.)
 
+        12. widget.post_events  is True (the default) if result events that
+           the widget generates should be posted to the pygame event queue.
+           Set it to False if the application gets them via callbacks or the
+           handlers routing table instead.  (See deliver_event().)
+
+        13. widget.image_version  is incremented whenever widget.image is
+           redrawn, so that container widgets can tell which of their child
+           widgets need to be re-blitted.  (See BasicForm.update.)  If you
+           set compose_incrementally=True and draw on a widget's image (or
+           its .pic) yourself, call widget.unshare_image() beforehand (see
+           share_identical_images), and widget.invalidate() afterwards.
+
+        14. widget.layout  is None, or a layout (a Box or Grid) which positions
+           and sizes the widget's child widgets, instead of their
+           relative_rects being set by hand.  (See set_layout() and Layout.)
+
+        15. widget.anchor  is None, or a dict describing where a top-level
+           widget goes when the display surface is resized.  (See
+           set_anchor().)  widget.anchor_surface_size  is None, meaning
+           that the anchor is resolved against the display surface, or the
+           size of the surface the widget is drawn on instead.
+
+        16. A widget's z-order (whether it is drawn in front of or behind
+           the other widgets in its WidgetGroup, or the other child widgets
+           of its parent) is changed with widget.raise_to_top(),
+           widget.lower_to_bottom() or widget.set_z().  (See also
+           raise_clicked_widgets.)
+
+        17. widget.hit_mask  is False (the default) if the whole of the
+           widget's rect is clickable, or True if only its opaque pixels are.
+           (See "alpha-mask hit testing".)
+
     A widget's size is widget.rect.size, just like other pygame sprites.
     (The update method copies widget.rect.size to widget.relative_rect.size.)
     However, its position can be determined in either of two ways.
@@ -541,8 +1394,24 @@ class Widget(pygame.sprite.Sprite):
             self.min_width = 2
         if not hasattr(self, 'min_height'):
             self.min_height = 2
+        if not hasattr(self, 'post_events'):
+            self.post_events = True  # see deliver_event()
+        if not hasattr(self, 'hit_mask'):
+            self.hit_mask = False  # see "alpha-mask hit testing"
+        self._hit_mask_for = None  # (image, image_version, mask) for hit_mask
+        self.image_version = 0
+        self._rendered_key = None  # see _update_widget()
+        self._child_tokens = {}  # see _compose_children()
+        self._child_views = {}  # see _child_view()
+        self._composed_appearance = None  # see BasicForm.update()
+        self._image_shared = False  # see unshare_image()
+        self.layout = None  # see set_layout()
+        self.anchor = None  # see set_anchor()
+        self.anchor_surface_size = None  # see set_anchor()
+        self._anchored_for = None  # the display & widget sizes the anchor was last resolved for
         self.dragging = False
         self.resizing = False
+        self._resize_source = None  # see _draw_resize_preview()
         self.hasmousefocus = False
         pygame.sprite.Sprite.__init__(self, *groups)
         # Note: self.rect contains absolute coordinates (relative to the
@@ -581,11 +1450,18 @@ class Widget(pygame.sprite.Sprite):
         is_mouse_event = ( (ev.type == MOUSEBUTTONDOWN) or
                            (ev.type == MOUSEBUTTONUP) or
                            (ev.type == MOUSEMOTION) )
+        if (frozen_widget is not None) and (self.parent is not None):
+            self._position_from_parent()  # our parent's position is up to date
         is_left_button_press = ( (ev.type == MOUSEBUTTONDOWN) and
                                  (ev.button == MOUSEBUTTONLEFT) )
         is_left_button_release = ( (ev.type == MOUSEBUTTONUP) and
                                  (ev.button == MOUSEBUTTONLEFT) )
 
+        if ( is_left_button_press and raise_clicked_widgets and (self.parent is None) and
+             (self.draggable or getattr(getattr(self, 'titlebar', None), 'draggable', False)) and
+             self.top_collidepoint(ev.pos, include_children=True) ):
+            self.raise_to_top()  # bring the clicked window to the front
+
         # This is part of the code to implement resize
         over_resize_area = False  # true iff resizeable and mouse is over a border
         if is_mouse_event and (self.resizeable == 'byMouse') and (not self.dragging):
@@ -593,10 +1469,12 @@ class Widget(pygame.sprite.Sprite):
                 if is_left_button_release:
                     # done resizing
                     self.resizing = False
+                    self._end_resize_preview()
                 elif ev.type == MOUSEMOTION:
                     if not ev.buttons[0]:
                         # button isn't down, so button-release was missed
                         self.resizing = False
+                        self._end_resize_preview()
                     else:
                         # resize it!
                         previous_x = self.previous_mouse_pos[0]
@@ -643,7 +1521,10 @@ class Widget(pygame.sprite.Sprite):
                         # wrong size, so it knows to resize child forms if
                         # this is a WrapperForm.
                         # # self._make_image_surface(self.rect.size, transparent=not self.bgcolor)
-                        self.update()
+                        # Nor redraw it here: the next .update() will, once
+                        # for however many MOUSEMOTIONs there are per frame.
+                        # (See resize_preview.)
+                        self._rect_changed()
                         changed = True
                     over_resize_area = True
             if (not self.resizing) and self.resizer_collidepoint(ev.pos):
@@ -666,7 +1547,13 @@ class Widget(pygame.sprite.Sprite):
 
         rc = False
         if not over_resize_area:
-            rc = self.children.notify(ev)
+            if ( (self is frozen_widget) and (ev.type == MOUSEMOTION) and
+                 (getattr(widget_being_dragged, 'parent', None) is self) ):
+                # it's being dragged by (e.g.) its titlebar, which is the only
+                # child widget that needs to know that the mouse moved
+                rc = widget_being_dragged.notify(ev)
+            else:
+                rc = self.children.notify(ev)
             if is_mouse_event:
                 # First, check for dragging:
                 if (not rc) and self.draggable:
@@ -678,12 +1565,18 @@ class Widget(pygame.sprite.Sprite):
                         if self.dragging:
                             widget_being_dragged = None
                             self.dragging = False
+                            if frozen_widget is not None:
+                                frozen_widget._thaw()
                     elif (ev.type == MOUSEMOTION) and self.dragging:
                         if not ev.buttons[0]:
                             # button isn't down, so button-release was missed
                             widget_being_dragged = None
                             self.dragging = False
+                            if frozen_widget is not None:
+                                frozen_widget._thaw()
                         else:
+                            if freeze_dragged_widgets and (self.parent is None):
+                                self._freeze()
                             self.move((ev.pos[0]-self.previous_mouse_pos[0],
                                        ev.pos[1]-self.previous_mouse_pos[1]))
                             self.previous_mouse_pos = ev.pos
@@ -717,7 +1610,15 @@ class Widget(pygame.sprite.Sprite):
         '''
         global changed
         r = self.image.get_rect()
-        if len(color) == 2:
+        if (len(color) == 2) and (r.w >= 2) and (r.h >= 2) and _opaque(color[0]) and _opaque(color[1]):
+            # blit the (cached) strips for a two-color box; see bevel_chrome()
+            strips = bevel_chrome(color, r.size)
+            if hasattr(self.image, 'blits'):
+                self.image.blits(strips, False)
+            else:
+                for (strip, pos) in strips:  # older pygame versions lack blits()
+                    self.image.blit(strip, pos)
+        elif len(color) == 2:
             # draw top-right to bottom-right to bottom-left with 2nd color
             pygame.draw.lines(self.image, color[1], False,
                               [(r.w-1,1), (r.w-1,r.h-1), (1,r.h-1)])
@@ -769,14 +1670,33 @@ class Widget(pygame.sprite.Sprite):
             pos = pos[0]
         # They may pass either x and y separate parameters, or a length-2 tuple
         # containing x and y.  Either way, now it should be a length-2 tuple.
+        if (frozen_widget is not None) and (self.parent is not None):
+            self._refresh_position()
         result = self.rect.collidepoint(pos)
         if result:
             result = True
+            if self.hit_mask:
+                result = self._mask_collidepoint(pos)
         else:
             result = False
             # documentation claims it returns bool, but pygame 1.9.1 actually returns 0 or 1; this fixes it
         return result
 
+    def _mask_collidepoint(self, pos):
+        '''True if pos (which is within self.rect) is on an opaque pixel of
+        this widget's image.  (See "alpha-mask hit testing".)
+        '''
+        image = self.image
+        cached = self._hit_mask_for
+        if (cached is None) or (cached[0] is not image) or (cached[1] != self.image_version):
+            cached = self._hit_mask_for = (image, self.image_version,
+                                           pygame.mask.from_surface(image, HIT_MASK_THRESHOLD))
+        mask = cached[2]
+        x = pos[0] - self.rect.left
+        y = pos[1] - self.rect.top
+        (w, h) = mask.get_size()
+        return (x < w) and (y < h) and bool(mask.get_at((x, y)))
+
     def distance_collidepoint(self, pos):
         '''This method sends sprite.rect.collidepoint(pos) to the widget's rect.
         If the result is True then this method returns 1+ the squared distance
@@ -830,7 +1750,7 @@ class Widget(pygame.sprite.Sprite):
                 # siblings, etc., up through the top-level drawn widgets:
                 thiswidg = self
                 while result and (thiswidg is not None):
-                    for widg in younger_siblings(thiswidg):
+                    for widg in _younger_siblings_at(thiswidg, pos):
                         if widg.top_collidepoint(pos, include_children=True):
                             # sibling widget is covering this pixel of this widget
                             result = False
@@ -866,7 +1786,7 @@ class Widget(pygame.sprite.Sprite):
             # siblings, etc., up through the top-level drawn widgets:
             thiswidg = self
             while result and (thiswidg is not None):
-                for widg in younger_siblings(thiswidg):
+                for widg in _younger_siblings_at(thiswidg, pos):
                     if widg.mousecursor_collidepoint(pos):
                         # sibling widget is covering this pixel of this widget
                         result = False
@@ -904,7 +1824,7 @@ class Widget(pygame.sprite.Sprite):
                 # siblings, etc., up through the top-level drawn widgets:
                 thiswidg = self
                 while result and (thiswidg is not None):
-                    for widg in younger_siblings(thiswidg):
+                    for widg in _younger_siblings_at(thiswidg, pos):
                         if widg.collidepoint(pos):
                             # sibling widget is covering this pixel of this widget
                             result = False
@@ -915,13 +1835,20 @@ class Widget(pygame.sprite.Sprite):
 
     def _make_image_surface(self, size, transparent=False):
         '''Create the .image attribute for a widget.'''
+        self._image_shared = False
         w = max(0, size[0])
         h = max(0, size[1])
         size = (w, h)
-        if transparent:
+        if (_batch_surfaces is not None) and (type(self).update in _keyed_updates):
+            # constructing widgets in bulk (see Widget.many)
+            key = (size, bool(transparent))
+            if key not in _batch_surfaces:
+                _batch_surfaces[key] = pygame.Surface(size, SRCALPHA if transparent else 0)
+            self.image = _batch_surfaces[key]
+            self._image_shared = True
+        elif transparent:
             # transparent background
             self.image = pygame.Surface(size, SRCALPHA)
-            self.image.convert_alpha()
         else:
             # opaque background
             self.image = pygame.surface.Surface(size)
@@ -938,10 +1865,21 @@ class Widget(pygame.sprite.Sprite):
         '''
         self.boxcolors = color
 
-    def _fill_bg(self):
+    def _fill_bg(self, area=None):
         '''Fill the entire widget's .image attribute with the background color.
         Or, if there's no background color, fill it with "transparent."
+
+        If area (a Rect, relative to the widget) is specified, then just that
+        part of the image is filled.
         '''
+        if area is not None:
+            if self.bgcolor:
+                self.image.fill(self.bgcolor, area)
+            else:
+                self.image.fill((0,0,0,0), area)
+            return
+        self.image_version += 1
+        self._composed_appearance = None  # the children will have to be re-blitted
         if self.image.get_size() != self.rect.size:
             # widget size changed, so make a new surface of the correct size:
             self._make_image_surface(self.rect.size, transparent=(self.bgcolor is None))
@@ -953,6 +1891,72 @@ class Widget(pygame.sprite.Sprite):
             self.image.fill((0,0,0,0))
         self._last_rendered_bgcolor = self.bgcolor
 
+    def _freeze(self):
+        '''Stop updating this (top-level) widget while it is being dragged, so
+        that its image is just drawn wherever it's moved to.  Meanwhile, the
+        rects of its descendants aren't kept up to date: .notify() brings
+        each one up to date as the event reaches it, collidepoint() does so
+        for the widget being hit-tested (see _refresh_position), and _thaw()
+        does so for all of them at the end of the drag.
+        '''
+        global frozen_widget
+        if frozen_widget is not self:
+            if frozen_widget is not None:
+                frozen_widget._thaw()
+            frozen_widget = self
+
+    def _thaw(self):
+        '''Undo _freeze().'''
+        global frozen_widget
+        if frozen_widget is self:
+            frozen_widget = None
+            self._position_descendants()
+
+    def _draw_resize_preview(self):
+        '''Instead of updating this (top-level) widget while it's being
+        resized, make its image a cheap preview of it at its new size, from
+        the last image it drew (see resize_preview).  That image is put back
+        by _end_resize_preview(), so that the next .update() can tell how
+        much the widget was resized, and redraw it properly.
+        '''
+        global changed
+        if self.image.get_size() == tuple(self.rect.size):
+            return  # the preview (if any) is already the right size
+        if self._resize_source is None:
+            self._resize_source = self.image
+        source = self._resize_source
+        if getattr(self, 'resize_preview', resize_preview) == 'scaled':
+            self.image = pygame.transform.scale(source, self.rect.size)
+        else:  # 'outline'
+            bgcolor = getattr(self, 'bgcolor', None)
+            self._make_image_surface(self.rect.size, transparent=not bgcolor)
+            self.image.fill(bgcolor or (0,0,0,0))
+            self.image.blit(source, (0,0))
+            pygame.draw.rect(self.image, BLACK, self.image.get_rect(), 1)
+        changed = True
+
+    def _end_resize_preview(self):
+        '''Undo _draw_resize_preview(), when resizing is done.'''
+        if self._resize_source is not None:
+            self.image = self._resize_source
+            self._resize_source = None
+            self.invalidate()
+
+    def _position_descendants(self):
+        '''Set the absolute positions (rects) of all descendant widgets.'''
+        for child_widget in self.children:
+            child_widget.parent = self
+            child_widget._position_from_parent()
+            child_widget._position_descendants()
+
+    def _refresh_position(self):
+        '''Bring this widget's absolute position (rect) up to date, in case an
+        ancestor has been moved without being updated (see _freeze).
+        '''
+        if self.parent is not None:
+            self.parent._refresh_position()
+            self._position_from_parent()
+
     def move(self, amt):
         '''Move widget by specified amount.  amt[0]=delta_x, amt[1]=delta_y.'''
         global changed
@@ -962,11 +1966,117 @@ class Widget(pygame.sprite.Sprite):
             self.relative_rect.top += amt[1]
         self.rect.left += amt[0]
         self.rect.top += amt[1]
+        self._rect_changed()
         changed = True
 
+    def _rect_changed(self):
+        '''Called when this widget has been moved or resized between updates,
+        so that the hit indexes (see HitIndex) which include it are rebuilt
+        before they're used next.
+        '''
+        for group in self._z_groups():
+            if group.hit_index is not None:
+                group.hit_index.stale = True
+
     def moveto(self, position):
         self.move( (position[0]-self.rect.left, position[1]-self.rect.top) )
 
+    def set_anchor(self, left=None, right=None, top=None, bottom=None,
+                   centerx=None, centery=None, dock=None):
+        '''Anchor this (top-level) widget to the display surface, so that it
+        is repositioned automatically when the display is resized.
+
+        Each of left, right, top, bottom, centerx and centery may be:
+            a number of pixels: the distance of that edge of the widget from
+                the same edge of the display (for centerx and centery, the
+                offset of the widget's center from the display's center)
+            a percentage string, like '25%': the same, as a percentage of the
+                display's width or height (for centerx and centery, the
+                position of the widget's center across the display, so
+                centerx='50%' is the same as centerx=0)
+            another widget: line up with the same edge of that widget
+            None: not anchored
+        If both left and right (or both top and bottom) are anchored, then
+        the widget is stretched between them.  An edge which isn't anchored
+        stays where it is.
+
+        dock='top', 'bottom', 'left', 'right' or 'fill' is shorthand for
+        anchoring the widget flush against that edge of the display (or all
+        of them), stretched along it.  Explicitly specified edges override it.
+
+        E.g., to keep a status bar across the bottom of the display, and a
+        title centered at the top:
+            status.set_anchor(dock='bottom')
+            title.set_anchor(centerx=0, top=5)
+
+        If the widget is drawn on some other surface than the display (e.g.,
+        offscreen), set widget.anchor_surface_size to that surface's size
+        (or set the .surface_size of its WidgetGroup, which passes it on).
+
+        set_anchor() with no arguments removes the anchor.
+        '''
+        anchor = {}
+        if dock:
+            anchor = { 'top':    dict(left=0, right=0, top=0),
+                       'bottom': dict(left=0, right=0, bottom=0),
+                       'left':   dict(left=0, top=0, bottom=0),
+                       'right':  dict(right=0, top=0, bottom=0),
+                       'fill':   dict(left=0, right=0, top=0, bottom=0) }[dock]
+        for (edge, value) in zip(_anchor_edges, (left, right, top, bottom, centerx, centery)):
+            if value is not None:
+                anchor[edge] = value
+        self.anchor = anchor or None
+        self._anchored_for = None
+
+    def _apply_anchor(self, display_size=None):
+        '''If the display (or this widget, or a widget it's anchored to) has
+        changed since this widget's anchor was last resolved, then move
+        (and/or resize) the widget to match its anchor.  The widget is only
+        moved or resized if its rect actually changes.  The display's size
+        is display_size, if given, or else self.anchor_surface_size, or else
+        the size of the display surface.
+        '''
+        if display_size is None:
+            display_size = self.anchor_surface_size
+        if display_size is None:
+            surface = pygame.display.get_surface()
+            if surface is None:
+                return
+            display_size = surface.get_size()
+        if self.anchor is None:
+            return
+        anchor = self.anchor
+        others = [value for value in anchor.values() if isinstance(value, Widget)]
+        for other in others:
+            if other.anchor is not None:
+                other._apply_anchor(display_size)
+        key = (display_size, tuple(self.rect.size), [tuple(other.rect) for other in others])
+        if key == self._anchored_for:
+            return
+        rect = Rect(self.rect)
+        for (axis, lo, hi, mid) in ((0, 'left', 'right', 'centerx'), (1, 'top', 'bottom', 'centery')):
+            extent = display_size[axis]
+            (a, b, c) = [_anchor_coord(anchor.get(edge), edge, extent, display_size) for edge in (lo, hi, mid)]
+            if (a is not None) and (b is not None):
+                minimum = getattr(self, ('min_width', 'min_height')[axis], 0)
+                rect[axis] = a
+                rect[axis+2] = max(minimum, b - a)
+            elif a is not None:
+                rect[axis] = a
+            elif b is not None:
+                rect[axis] = b - rect[axis+2]
+            elif c is not None:
+                rect[axis] = c - (rect[axis+2] // 2)
+        if rect.size != self.rect.size:
+            if (rect.width != self.rect.width) and hasattr(self, 'set_width'):
+                self.set_width(rect.width)
+            self.rect.size = rect.size
+            self.relative_rect.size = rect.size
+            self.invalidate()
+        if rect.topleft != self.rect.topleft:
+            self.move( (rect.left-self.rect.left, rect.top-self.rect.top) )
+        self._anchored_for = (display_size, tuple(self.rect.size), key[2])
+
     def update(self):
         '''If this widget has children, then .update() each child and blit its
         image onto the main widget's image.
@@ -981,26 +2091,148 @@ class Widget(pygame.sprite.Sprite):
         set the background.
         '''
         global changed
-        if self.parent:
-            # this widget is a child of another widget
-            if self.relative_rect.size != self.rect.size:
-                if self.relative_rect == Rect(0,0,0,0):
-                    # relative_rect hasn't been set yet, so set it from rect
-                    self.relative_rect = self.rect.copy()
-                else:
-                    # self.rect always has the right width,height, so fix self.relative_rect
-                    self.relative_rect.size = self.rect.size
-            # absolute position self.rect.topleft is calculated from sum of
-            # relative position self.relative_rect.topleft + parent's absolute
-            # position self.parent.rect.topleft
-            self.rect.topleft = (self.relative_rect.x + self.parent.rect.x,
-                                 self.relative_rect.y + self.parent.rect.y)
+        self._position_from_parent()
+        if self.layout is not None:
+            self.layout.arrange(self)
         # if this widget is parent of other widgets...
+        if len(self.children):
+            self._compose_children()
+        self._draw_chrome()
+        pygame.sprite.Sprite.update(self)  # I don't think this actually does anything
+        self.image_version += 1
+        changed = True
+
+    def _compose_children(self, full=True):
+        '''Update each child widget (see _update_widget), and blit it onto
+        this widget's image.
+
+        If full is False, then only the parts of this widget's image where
+        child widgets have changed (their image or their position) since the
+        last time are redrawn: each such area is refilled with the background
+        (via self._fill_bg(area)), and then the child widgets that overlap it
+        are re-blitted, clipped to it.  Returns True if anything was redrawn.
+
+        If self.use_subsurfaces is True (see BasicForm), then child widgets
+        which can render directly into a subsurface of this widget's image
+        (see _child_view) are given such a subsurface as their image, and
+        aren't blitted at all.
+        '''
+        old_tokens = self._child_tokens
+        tokens = {}
+        dirty = []
+        views = {}
+        redrawn = full
+        if getattr(self, 'use_subsurfaces', False) and not (self.image.get_flags() & SRCALPHA):
+            areas = [Rect(child_widget.relative_rect.topleft, child_widget.rect.size)
+                     for child_widget in self.children]
+        else:
+            areas = None
         for child_widget in self.children:
             child_widget.parent = self
-            child_widget.update()
-            self.image.blit( child_widget.image, child_widget.relative_rect )
+            view = None
+            if areas is not None:
+                view = self._child_view(child_widget, areas)
+                if view is not None:
+                    if child_widget.image is not view:
+                        child_widget.image = view
+                        child_widget._image_shared = False
+                    elif full:
+                        child_widget.invalidate()  # our background was just refilled
+            if (view is None) and (child_widget in self._child_views):
+                # it rendered into our image, but can't any more (e.g., it
+                # moved partly outside us, or onto a sibling), so it gets an
+                # image of its own before it's updated, rather than drawing
+                # its new look over our pixels at its old position
+                if child_widget.image is self._child_views[child_widget][0]:
+                    child_widget.image = child_widget.image.copy()
+                    child_widget.invalidate()
+                del self._child_views[child_widget]
+            _update_widget(child_widget)
+            area = (child_widget.relative_rect.topleft, child_widget.image.get_size())
+            if (view is not None) and (child_widget.image is view) and (self._child_views[child_widget][2] != area):
+                # it moved or was resized while updating (e.g., dragged by its
+                # titlebar), so just this once it gets blitted
+                child_widget.image = view.copy()
+            if (view is not None) and (child_widget.image is view):
+                # it renders itself in place (maybe even between our updates),
+                # so only its old area (if it moved) has to be redrawn
+                views[child_widget] = view
+                token = (view, child_widget.image_version, area, 'view')
+                old_token = old_tokens.get(child_widget)
+                if (old_token is None) or (old_token[:2] != token[:2]):
+                    redrawn = True
+                if (not full) and (old_token is not None) and (old_token[2] != area):
+                    dirty.append(Rect(old_token[2]))
+            else:
+                version = getattr(child_widget, 'image_version', None)
+                token = (child_widget.image, version, area)
+                if not full:
+                    old_token = old_tokens.get(child_widget)
+                    if (old_token != token) or (version is None):
+                        dirty.append(Rect(area))
+                        if old_token is not None:
+                            dirty.append(Rect(old_token[2]))
+            tokens[child_widget] = token
+        self._child_tokens = tokens
+        for child_widget in list(self._child_views):
+            if child_widget not in views:
+                # it no longer renders into our image
+                if child_widget.image is self._child_views[child_widget][0]:
+                    child_widget.image = child_widget.image.copy()
+                del self._child_views[child_widget]
+        if full:
+            for child_widget in self.children:
+                if child_widget not in views:
+                    self.image.blit( child_widget.image, child_widget.relative_rect )
                             # ((child_widget.rect.left - self.rect.left), (child_widget.rect.top - self.rect.top)) )
+            return True
+        for (child_widget, old_token) in old_tokens.items():
+            if child_widget not in tokens:
+                dirty.append(Rect(old_token[2]))  # a removed child widget
+        if not dirty:
+            return redrawn
+        if len(dirty) > 8:
+            dirty = [dirty[0].unionall(dirty[1:])]
+        bounds = self.image.get_rect()
+        for area in dirty:
+            area = area.clip(bounds)
+            if area.width and area.height:
+                self._fill_bg(area)
+                self.image.set_clip(area)
+                for child_widget in self.children:
+                    if (child_widget not in views) and area.colliderect(Rect(tokens[child_widget][2])):
+                        self.image.blit( child_widget.image, child_widget.relative_rect )
+                self.image.set_clip(None)
+        for child_widget in views:
+            if Rect(tokens[child_widget][2]).collidelist(dirty) != -1:
+                # its pixels were just refilled with the background
+                child_widget.invalidate()
+                _update_widget(child_widget)
+        return True
+
+    def _child_view(self, child_widget, areas):
+        '''Return a subsurface of this widget's image for child_widget to
+        render into (instead of into its own image), or None if it can't:
+        the child widget has to have an opaque background color, lie within
+        this widget, and not overlap any of its siblings (whose areas are
+        listed in areas).  The subsurface is made again if this widget's
+        image, or the child widget's position or size, has changed.
+        '''
+        bgcolor = getattr(child_widget, 'bgcolor', None)
+        area = Rect(child_widget.relative_rect.topleft, child_widget.rect.size)
+        if ( (not bgcolor) or (not _opaque(bgcolor)) or hasattr(child_widget, 'state_images')
+             or (not (area.width and area.height)) or (not self.image.get_rect().contains(area))
+             or (len(area.collidelistall(areas)) != 1) ):
+            # (SimpleButtons swap their own cached images in and out)
+            return None
+        (view, image, view_area) = self._child_views.get(child_widget, (None, None, None))
+        if (image is not self.image) or (view_area != area):
+            view = self.image.subsurface(area)
+            self._child_views[child_widget] = (view, self.image, area)
+        return view
+
+    def _draw_chrome(self):
+        '''Draw the box and the resizing knurl (if any) on the widget's image.'''
         # if boxcolors have been set, then draw the box
         if hasattr(self, 'boxcolors') and self.boxcolors:
             if hasattr(self, 'thick'):
@@ -1012,8 +2244,132 @@ class Widget(pygame.sprite.Sprite):
         # if resizeable is 'byMouse', then draw the knurled lower-right corner
         if hasattr(self, 'resizeable') and (self.resizeable == 'byMouse'):
             self.image.blit(knurl, (self.rect.width-KNURLSIZE-2, self.rect.height-KNURLSIZE-2))
-        pygame.sprite.Sprite.update(self)  # I don't think this actually does anything
-        changed = True
+
+    def _render_key(self):
+        '''Return something which changes whenever anything that affects how
+        this widget looks changes, or None if there's no telling.  See
+        _update_widget().
+        '''
+        return None
+
+    def unshare_image(self):
+        '''If this widget's image is shared with other widgets which look
+        exactly the same (see share_identical_images), then give this widget
+        a copy of its own, so that it can be drawn on without affecting them.
+        '''
+        if self._image_shared:
+            self.image = self.image.copy()
+            self._image_shared = False
+
+    def invalidate(self):
+        '''Make sure that this widget will be redrawn by the next update,
+        e.g., after drawing on its image or picture from outside.
+        '''
+        self._rendered_key = None
+        self._composed_appearance = None
+        self.image_version += 1
+
+    def _position_from_parent(self):
+        '''If this widget is a child of another widget, then set its absolute
+        position (self.rect) from its position relative to its parent.  (If
+        it's a top-level widget with an anchor, then position it from that.)
+        '''
+        if (getattr(self, 'anchor', None) is not None) and not self.parent:
+            self._apply_anchor()
+        if self.parent:
+            # this widget is a child of another widget
+            if self.relative_rect.size != self.rect.size:
+                if self.relative_rect == Rect(0,0,0,0):
+                    # relative_rect hasn't been set yet, so set it from rect
+                    self.relative_rect = self.rect.copy()
+                else:
+                    # self.rect always has the right width,height, so fix self.relative_rect
+                    self.relative_rect.size = self.rect.size
+            # absolute position self.rect.topleft is calculated from sum of
+            # relative position self.relative_rect.topleft + parent's absolute
+            # position self.parent.rect.topleft
+            self.rect.topleft = (self.relative_rect.x + self.parent.rect.x,
+                                 self.relative_rect.y + self.parent.rect.y)
+
+    @classmethod
+    def many(cls, columns, parent=None, group=None, **kwargs):
+        '''Quick constructor of lots of widgets of this class at once, e.g.,
+        for a checklist or inventory form with thousands of rows:
+
+            boxes = Checkbox.many({'text': names, 'pos': positions, 'Id': ids},
+                                  parent=form, bgcolor=WHITE)
+
+        columns is a dict which maps parameter names to lists of values, one
+        per widget (so all the lists must be the same length).  Any other
+        keyword parameters are passed to every widget.  Returns a list of
+        the new widgets.  If parent is specified, they're added to it (as if
+        by parent.add_widgets()), and if group is specified, they're added
+        to that group.
+
+        This is faster than constructing the widgets one at a time: each
+        distinct text is measured just once, and (for the simpler widget
+        classes, if share_identical_images is True) identical blank images
+        are only allocated once (see _batch_surfaces).
+        '''
+        global _batch_text_sizes, _batch_surfaces
+        names = list(columns.keys())
+        values = [list(columns[name]) for name in names]
+        n = len(values[0]) if values else 0
+        for (name, column) in zip(names, values):
+            if len(column) != n:
+                raise ValueError('Widget.many: ' + repr(len(column)) + ' values for ' + repr(name) +
+                                 ', but ' + repr(n) + ' values for ' + repr(names[0]))
+        sizes = {}
+        if 'text' in columns:
+            fonts = columns.get('font') or ([kwargs.get('font', vera)] * n)
+            for key in zip(fonts, columns['text']):
+                if key not in sizes:
+                    sizes[key] = text_size(*key)
+        _batch_text_sizes = sizes
+        if share_identical_images:
+            _batch_surfaces = {}
+        try:
+            widgets = []
+            for row in zip(*values):
+                args = dict(kwargs)
+                args.update(zip(names, row))
+                widgets.append(cls(**args))
+        finally:
+            _batch_text_sizes = None
+            _batch_surfaces = None
+        if parent is not None:
+            parent.add_widgets(*widgets)
+        if group is not None:
+            group.add(*widgets)
+        return widgets
+
+    def _z_groups(self):
+        '''Return the WidgetGroups in which this widget's z-order matters:
+        its parent's .children, or (for a top-level widget) its groups.
+        '''
+        if self.parent is not None:
+            return [self.parent.children]
+        return [group for group in self.groups() if isinstance(group, WidgetGroup)]
+
+    def set_z(self, z):
+        '''Move this widget to position z in the drawing order of its siblings
+        (its parent's other child widgets, or the other widgets in its
+        WidgetGroups): 0 is the bottom (drawn first), and -1 is the top.
+        (See WidgetGroup.set_z.)
+        '''
+        moved = False
+        for group in self._z_groups():
+            moved = group.set_z(self, z) or moved
+        if moved and (self.parent is not None):
+            self.parent.invalidate()  # the overlapping children must be re-blitted
+
+    def raise_to_top(self):
+        '''Bring this widget to the front: draw it after its siblings.'''
+        self.set_z(-1)
+
+    def lower_to_bottom(self):
+        '''Send this widget to the back: draw it before its siblings.'''
+        self.set_z(0)
 
     def add_widgets(self, *child_widgets):
         '''Add a list of child_widgets to a menu or form, in the order specified.
@@ -1032,6 +2388,23 @@ class Widget(pygame.sprite.Sprite):
         '''
         self.children.remove(*child_widgets)
 
+    def set_layout(self, layout):
+        '''Use layout (a Box or Grid) to position and size this widget's
+        child widgets, from now on.  Any widgets already added to the layout
+        become child widgets of this one, as do any which are added to it
+        later.  Returns the layout, e.g.:
+
+            box = form.set_layout(Box(padding=10, spacing=4))
+            box.add(Label('Name:'))
+
+        The layout is re-run (if necessary) whenever this widget is updated.
+        Widgets which were added with add_widgets() but not to the layout
+        keep the positions they were given.
+        '''
+        self.layout = layout
+        layout.arrange(self)
+        return layout
+
     def remove_nested_widgets(self, *child_widgets):
         '''Remove one or more child_widgets from a menu or form, and/or from
         any of its children.
@@ -1040,6 +2413,18 @@ class Widget(pygame.sprite.Sprite):
         for widg in self.children:
             widg.remove_nested_widgets(*child_widgets)
 
+    def _get_Id(self):
+        return self._Id
+
+    def _set_Id(self, Id):
+        old_Id = getattr(self, '_Id', None)
+        self._Id = Id
+        if old_Id != Id:
+            registry.renamed(self, old_Id)
+
+    # .Id is a property, so that the registry can keep its index up to date
+    Id = property(_get_Id, _set_Id)
+
     def __repr__(self):
         '''Answer a string representation of a widget.'''
         rs = '<a ' + type(self).__name__ + ' widget, Id=' + repr(self.Id) + ', size=' + repr(self.rect.size)
@@ -1060,7 +2445,37 @@ class WidgetGroup(pygame.sprite.OrderedUpdates):
 
     Also, WidgetGroup has a notify() method to notify all its widgets of pygame
     events.
+
+    The sprites are drawn in the order they're in, which can be changed with
+    raise_to_top(), lower_to_bottom() and set_z().  Each sprite has a "z key"
+    which increases with its position in that order, and the group keeps the
+    sorted list of them, so a sprite's position is found with bisect rather
+    than by searching the list of sprites.
+
+    For groups of thousands of widgets, call set_hit_index() to find the
+    widgets at a point with NumPy instead of asking each widget in turn.
     '''
+    def __init__(self, *sprites):
+        self._z = {}  # maps sprite -> its z key
+        self._z_keys = []  # the z keys of the sprites, in drawing order (so, sorted)
+        self._z_version = 0  # incremented whenever the sprites or their order change
+        self.hit_index = None  # see set_hit_index()
+        self.surface_size = None  # the size of the surface the group is drawn on, if not the display
+        pygame.sprite.OrderedUpdates.__init__(self, *sprites)
+
+    def set_hit_index(self, enabled=True):
+        '''Keep (or, if enabled is False, stop keeping) a HitIndex of this
+        group's sprites, which get_widget_at() and the collidepoint methods
+        then use.  Returns the HitIndex, or None if NumPy isn't installed
+        (in which case everything still works, just without the index).
+        '''
+        if enabled and (numpy is not None):
+            if self.hit_index is None:
+                self.hit_index = HitIndex(self)
+        else:
+            self.hit_index = None
+        return self.hit_index
+
     def notify(self, ev):
         '''Notify all my widgets of the event ev; if any of them handle it, then
         return True, to tell the application that it can ignore this event,
@@ -1071,21 +2486,71 @@ class WidgetGroup(pygame.sprite.OrderedUpdates):
         '''
         global saved_mouse_cursor, widget_which_set_mouse_cursor
         global WidgetGroup_notify_recursion_counter
+        if (event_recorder is not None) and (0 == WidgetGroup_notify_recursion_counter):
+            event_recorder.input(ev)
         WidgetGroup_notify_recursion_counter += 1
         done_drawing()  # sprite-drawing is done for now; we're getting events
         event_handled_by_widget = False
-        for widget in self.sprites():
-            if hasattr(widget, 'notify'):
-                rc = widget.notify(ev)
-                event_handled_by_widget = (event_handled_by_widget or rc)
+        if ev.type == WAKEUPEVENT:
+            # a timer wake-up (see _arm_wakeup); the timers are serviced below,
+            # and the widgets have no use for it
+            event_handled_by_widget = True
+        else:
+            for widget in self.sprites():
+                if hasattr(widget, 'notify'):
+                    rc = widget.notify(ev)
+                    event_handled_by_widget = (event_handled_by_widget or rc)
         if (ev.type == WIDGETEVENT) and ev.internal:
             # an internal event, for communication between widgets; no need for
             # the application event loop to look at it
             event_handled_by_widget = True
+        if 1 == WidgetGroup_notify_recursion_counter:
+            service_timers()  # e.g., auto-repeat for held-down scrollbar buttons
         WidgetGroup_notify_recursion_counter -= 1
         deglitched_set_cursor_pt2()  # ugly mouse cursor deglitch kludge, part 2
         return event_handled_by_widget
 
+    def update(self, *args, **kwargs):
+        '''Same as the inherited .update() method, except that this also
+        marks the start of a new frame, and services timers.
+
+        Widgets which are entirely hidden under opaque widgets later in the
+        group (see cull_occluded_widgets) aren't updated: their .update()
+        methods aren't called at all, so a widget which changes its own look
+        (or does anything else) in .update() doesn't do so while it's
+        hidden.  If such a widget turns out to be visible when the group is
+        drawn (e.g., because the widget covering it moved or shrank), then
+        .draw() updates it before drawing it.  Set cull_occluded_widgets =
+        False if every widget's .update() must be called every frame.
+        '''
+        start_of_frame()
+        service_timers()
+        if args or kwargs:
+            pygame.sprite.OrderedUpdates.update(self, *args, **kwargs)
+            return
+        sprites = self.sprites()
+        for sprite in sprites:
+            if getattr(sprite, 'anchor', None) is not None:
+                if self.surface_size is not None:
+                    sprite.anchor_surface_size = tuple(self.surface_size)
+                sprite._apply_anchor()  # in case the display was resized
+        if cull_occluded_widgets:
+            visible = visible_parts_of(sprites, before_update=True)
+        else:
+            visible = [None] * len(sprites)
+        self._not_updated = []
+        for (sprite, parts) in zip(sprites, visible):
+            if not isinstance(sprite, Widget):
+                sprite.update()
+            elif sprite is frozen_widget:
+                pass  # it's being dragged (see Widget._freeze)
+            elif sprite.resizing and (getattr(sprite, 'resize_preview', resize_preview) != 'live'):
+                sprite._draw_resize_preview()
+            elif parts == []:
+                self._not_updated.append(sprite)
+            else:
+                _update_widget(sprite)
+
     def remove(self, *sprites):
         '''For most widgets, this just passes control to super().remove, so
         it will remove the sprite(s) from the widget group.  But some widgets
@@ -1106,15 +2571,80 @@ class WidgetGroup(pygame.sprite.OrderedUpdates):
         they will be blit'd to the screen after this_sprite, so if they
         overlap this one they will be on top.
         '''
-        widgetlist = self.sprites()
-        try:
-            ndx = widgetlist.index(this_sprite)
-        except ValueError:
+        ndx = self.get_z(this_sprite)
+        if ndx is None:
             result = []
         else:
-            result = widgetlist[ndx+1:]
+            result = self._spritelist[ndx+1:]
         return result
 
+    def get_z(self, sprite):
+        '''Return the position of sprite in the drawing order (0 is the
+        bottom), or None if it isn't in this group.
+        '''
+        key = self._z.get(sprite)
+        if key is None:
+            return None
+        return bisect.bisect_left(self._z_keys, key)
+
+    def set_z(self, sprite, z):
+        '''Move sprite to position z in the drawing order: 0 is the bottom
+        (drawn first), and negative positions count from the top, so -1 is
+        the top.  Returns True if the sprite moved.
+
+        Where a top-level sprite overlaps the sprites it moved past, the
+        display no longer shows what it should, so that area is included in
+        the rects returned by the next .draw() (and changed is set).  An
+        application in partial_redraw_mode() must redraw the group, or at
+        least those areas, before the restacking shows.
+        '''
+        global changed
+        ndx = self.get_z(sprite)
+        n = len(self._spritelist)
+        if z < 0:
+            z += n
+        z = max(0, min(z, n-1))
+        if (ndx is None) or (ndx == z):
+            return False
+        if getattr(sprite, 'parent', None) is None:
+            # (a child widget's parent is invalidated instead; see Widget.set_z)
+            overlap = None
+            for other in self._spritelist[min(ndx, z):max(ndx, z)+1]:
+                part = sprite.rect.clip(other.rect)
+                if (other is not sprite) and part.width and part.height:
+                    overlap = part if (overlap is None) else overlap.union(part)
+            if overlap is not None:
+                self.lostsprites.append(overlap)
+        del self._spritelist[ndx]
+        del self._z_keys[ndx]
+        keys = self._z_keys
+        if z == 0:
+            key = keys[0] - 1
+        elif z == len(keys):
+            key = keys[-1] + 1
+        else:
+            key = (keys[z-1] + keys[z]) / 2.0
+            if not (keys[z-1] < key < keys[z]):
+                # no room left between them, so renumber the z keys
+                keys[:] = range(len(keys))
+                for (other, other_key) in zip(self._spritelist, keys):
+                    self._z[other] = other_key
+                key = z - 0.5
+        self._spritelist.insert(z, sprite)
+        keys.insert(z, key)
+        self._z[sprite] = key
+        self._z_version += 1
+        changed = True
+        return True
+
+    def raise_to_top(self, sprite):
+        '''Move sprite to the top of the drawing order (see set_z).'''
+        return self.set_z(sprite, -1)
+
+    def lower_to_bottom(self, sprite):
+        '''Move sprite to the bottom of the drawing order (see set_z).'''
+        return self.set_z(sprite, 0)
+
     def get_widget_at(self, pos, allsprites=False):
         """Returns the sprite at the specified position, or None.
 
@@ -1126,9 +2656,15 @@ class WidgetGroup(pygame.sprite.OrderedUpdates):
         3. This returns just one sprite, and
         4. If two or more sprites overlap at the position, it returns the
            one that is most closely centered on the position, not the one
-           on top.
+           on top.  (If several are equally close, the one drawn first.)
+
+        If the group has a hit index (see set_hit_index), only the sprites
+        whose rects contain pos are asked.
         """
-        widgets = self.sprites()
+        if self.hit_index is not None:
+            widgets = self.hit_index.sprites_at(pos)
+        else:
+            widgets = self.sprites()
         colliding = []  # list of tuples, each w/ a widget and its center's distance-squared from pos
         for widget in widgets:
             collided = False
@@ -1147,21 +2683,227 @@ class WidgetGroup(pygame.sprite.OrderedUpdates):
                 colliding.append((widget, dsquared))
         if not colliding:
             return None  # empty list means there are no widgets at pos
-        else:
-            # more than one widget is very close; prune the list down to the closest one
-            while len(colliding) > 1:
-                if colliding[0][1] > colliding[1][1]:
-                    del colliding[0]
-                else:
-                    del colliding[1]
-        return colliding[0][0]
+        # if more than one widget is there, pick the closest (min() picks the first of equals)
+        return min(colliding, key=_second)[0]
 
     def draw(self, surface):
-        note_draws(self.sprites())
-        pygame.sprite.OrderedUpdates.draw(self, surface)
+        '''Same as the inherited .draw() method, except that this also notes
+        the drawing order (see note_draws), and (if cull_occluded_widgets is
+        True) only draws the parts of the sprites which aren't hidden under
+        opaque widgets drawn after them.
+
+        Like OrderedUpdates.draw(), it returns the list of the areas of
+        surface which changed: for each sprite, its new rect and its old one
+        (even if it is hidden).  (It used to return None.)
+        '''
+        start_of_frame()
+        sprites = self.sprites()
+        note_draws(sprites)
+        if not cull_occluded_widgets:
+            return pygame.sprite.OrderedUpdates.draw(self, surface)
+        visible = visible_parts_of(sprites)
+        late = [sprite for (sprite, parts) in zip(sprites, visible)
+                if (parts != []) and (sprite in getattr(self, '_not_updated', ()))]
+        self._not_updated = []
+        if late:
+            # uncovered since .update(), so they need updating after all
+            for sprite in late:
+                _update_widget(sprite)
+            visible = visible_parts_of(sprites)
+        clip = surface.get_clip()
+        dirty = self.lostsprites
+        self.lostsprites = []
+        for (sprite, parts) in zip(sprites, visible):
+            old_rect = self.spritedict[sprite]
+            if parts is None:
+                new_rect = surface.blit(sprite.image, sprite.rect)
+            else:
+                (x, y) = sprite.rect.topleft
+                for part in parts:
+                    surface.blit(sprite.image, part, part.move(-x, -y))
+                new_rect = Rect(sprite.rect.topleft, sprite.image.get_size()).clip(clip)
+            if old_rect:
+                if new_rect.colliderect(old_rect):
+                    dirty.append(new_rect.union(old_rect))
+                else:
+                    dirty.append(new_rect)
+                    dirty.append(old_rect)
+            else:
+                dirty.append(new_rect)
+            self.spritedict[sprite] = new_rect
+        return dirty
 
     # the .add() method is inherited from pygame.sprite.OrderedUpdates
 
+    def add_internal(self, sprite, *args):
+        '''Same as the inherited method, but also registers widgets in the
+        registry (see WidgetRegistry), and gives the sprite a z key (see
+        set_z) which puts it on top.
+        '''
+        if isinstance(sprite, Widget) and not self.has_internal(sprite):
+            registry.added(sprite)
+        pygame.sprite.OrderedUpdates.add_internal(self, sprite, *args)
+        key = (self._z_keys[-1] + 1) if self._z_keys else 0
+        self._z[sprite] = key
+        self._z_keys.append(key)
+        self._z_version += 1
+
+    def remove_internal(self, sprite):
+        '''Same as the inherited method, but also unregisters widgets from the
+        registry (see WidgetRegistry), and finds the sprite in the drawing
+        order by its z key, instead of by searching the list.  If the sprite
+        is frozen because it's being dragged (see Widget._freeze), then the
+        drag ends.  If this is the .children of a widget with a layout, then
+        the sprite is removed from the layout too, however it's removed
+        (remove_widgets, remove_nested_widgets, kill, etc.).
+        '''
+        global widget_being_dragged
+        if isinstance(sprite, Widget) and self.has_internal(sprite):
+            registry.removed(sprite)
+            parent = sprite.parent
+            if (parent is not None) and (parent.children is self) and (parent.layout is not None):
+                parent.layout.remove(sprite)
+        if sprite is frozen_widget:
+            if (widget_being_dragged is sprite) or (getattr(widget_being_dragged, 'parent', None) is sprite):
+                widget_being_dragged.dragging = False
+                widget_being_dragged = None
+            sprite._thaw()
+        ndx = self.get_z(sprite)
+        pygame.sprite.RenderUpdates.remove_internal(self, sprite)
+        del self._spritelist[ndx]
+        del self._z_keys[ndx]
+        del self._z[sprite]
+        self._z_version += 1
+
+
+#--------------[ Begin code for vectorized hit testing ]--------------
+
+# Finding the widgets at a point means asking every widget in a group, which
+# is slow for groups of thousands of small widgets (seat maps, grid-like
+# dashboards, etc.).  So a WidgetGroup can keep a HitIndex (see
+# WidgetGroup.set_hit_index), which has the sprites' rects in NumPy arrays,
+# in drawing order, so that the sprites whose rects contain a point (or
+# overlap a rect) are found with a few vectorized comparisons.  Only those
+# are then asked (with their own collidepoint methods, which can only be
+# pickier than their rects), so the results are the same as without the
+# index.  That goes for get_widget_at(), and for the younger siblings which
+# top_collidepoint() and friends check for covering a widget: the child
+# widgets of a widget whose .children has a hit index, and the top-level
+# widgets when everything drawn is in one group with a hit index.
+#
+# The arrays are rebuilt when they're next used after the group or its
+# order changes, after a widget in the group is moved or resized (see
+# Widget._rect_changed), and once per frame (in case the widgets were moved
+# some other way, e.g., by their parent's update or a layout).  While a
+# widget is being dragged (see Widget._freeze), child widgets' rects are
+# only brought up to date as they're needed, so then the hit indexes of
+# child widgets aren't used.
+#
+# Hit indexes need NumPy; without it, set_hit_index() does nothing.
+
+class HitIndex(object):
+    '''A NumPy index of the rects of the sprites in a WidgetGroup.'''
+    def __init__(self, group):
+        self.group = group
+        self.stale = True
+        self.built_for = None  # (group's _z_version, frame_counter, in_frame) when built
+        self.sprites = []
+        self.drawn_for = None  # (sorted_draw_list, group's _z_version) when covers_drawn was found
+        self.covers_drawn = False  # True if every top-level widget drawn is in the group
+
+    def _current(self):
+        '''Rebuild the arrays, if they're out of date, and return the
+        sprites, in drawing order.
+        '''
+        key = (self.group._z_version, frame_counter, in_frame)
+        if self.stale or (key != self.built_for):
+            sprites = self.group._spritelist[:]
+            rects = numpy.fromiter(itertools.chain.from_iterable([sprite.rect for sprite in sprites]),
+                                   dtype=numpy.int64, count=4*len(sprites)).reshape(-1, 4)
+            self.left = rects[:,0]
+            self.top = rects[:,1]
+            self.right = rects[:,0] + rects[:,2]
+            self.bottom = rects[:,1] + rects[:,3]
+            self.sprites = sprites
+            self.stale = False
+            self.built_for = key
+        return self.sprites
+
+    def usable(self):
+        '''False while the rects of the group's sprites might be out of date
+        (see "vectorized hit testing").
+        '''
+        sprites = self.group._spritelist
+        return (frozen_widget is None) or (not sprites) or (getattr(sprites[0], 'parent', None) is None)
+
+    def indexes_at(self, pos):
+        '''Return the positions (in drawing order) of the sprites whose rects
+        contain pos, as a NumPy array.
+        '''
+        self._current()
+        (x, y) = pos
+        return numpy.flatnonzero( (self.left <= x) & (x < self.right) &
+                                  (self.top <= y) & (y < self.bottom) )
+
+    def sprites_at(self, pos):
+        '''Return the sprites whose rects contain pos, in drawing order.'''
+        if not self.usable():
+            return self.group.sprites()
+        sprites = self._current()
+        return [sprites[ndx] for ndx in self.indexes_at(pos)]
+
+    def sprites_in(self, rect):
+        '''Return the sprites whose rects overlap rect (as for
+        Rect.colliderect), in drawing order.
+        '''
+        rect = Rect(rect)
+        if not self.usable():
+            return [sprite for sprite in self.group.sprites() if sprite.rect.colliderect(rect)]
+        sprites = self._current()
+        if not (rect.width and rect.height):
+            return []
+        hits = ( (self.left < rect.right) & (rect.left < self.right) &
+                 (self.top < rect.bottom) & (rect.top < self.bottom) &
+                 (self.left < self.right) & (self.top < self.bottom) )
+        return [sprites[ndx] for ndx in numpy.flatnonzero(hits)]
+
+    def younger_at(self, sprite, pos):
+        '''Return the sprites drawn after sprite (a child widget) whose rects
+        contain pos.
+        '''
+        if not self.usable():
+            return self.group.sprites_painted_after(sprite)
+        sprites = self._current()
+        ndx = self.group.get_z(sprite)
+        if ndx is None:
+            return []
+        return [sprites[i] for i in self.indexes_at(pos) if i > ndx]
+
+    def drawn_after_at(self, sprite, pos):
+        '''Return the top-level sprites drawn after sprite (see
+        sorted_draw_list) whose rects contain pos, or None if that can't be
+        told from this index (because not everything drawn is in the group).
+        '''
+        key = (sorted_draw_list, self.group._z_version)
+        if (self.drawn_for is None) or (self.drawn_for[0] is not key[0]) or (self.drawn_for[1] != key[1]):
+            self.drawn_for = key
+            self.covers_drawn = all([self.group.has_internal(drawn) for drawn in sorted_draw_list])
+        if not self.covers_drawn:
+            return None
+        ndx = sorted_draw_index[sprite]
+        return [other for other in self.sprites_at(pos) if sorted_draw_index.get(other, -1) > ndx]
+
+    def top_widget_at(self, pos):
+        '''Return the widget that's on top at pos (the last one drawn for
+        which top_collidepoint(pos) is True), or None.
+        '''
+        for widget in reversed(self.sprites_at(pos)):
+            if hasattr(widget, 'top_collidepoint') and widget.top_collidepoint(pos):
+                return widget
+        return None
+
+#--------------[ End code for vectorized hit testing ]--------------
+
 
 class Image(Widget):
     '''Image is just a widget that displays an image (picture).
@@ -1286,16 +3028,26 @@ class Image(Widget):
         changed = True
 
     def update(self):
+        self._position_from_parent()  # (or from its anchor, which might resize it)
         if ( (self.image.get_size() != self.rect.size) or
              ((self._last_rendered_bgcolor is None) != (self.bgcolor is None)) ):
             # dimensions or background transparency have changed, so make a
             # new image surface of the right size & transparency
             self._make_image_surface(self.rect.size, transparent=not self.bgcolor)
+        self.unshare_image()
         self._fill_bg()  # fill in the background color
         if hasattr(self,'pic') and self.pic:
             self.image.blit(self.pic, (self.padding+self.pic_pos[0], self.padding+self.pic_pos[1]))
         Widget.update(self)
 
+    def _render_key(self):
+        if len(self.children):
+            return None
+        return ( self.image, self.image.get_size(), tuple(self.rect.size),
+                 _hashable(self.bgcolor), _hashable(getattr(self, 'boxcolors', None)),
+                 getattr(self, 'thick', 1), self.resizeable == 'byMouse', self.padding,
+                 getattr(self, 'pic', None), tuple(self.pic_pos) )
+
 
 class Label(Image):
     '''Label is just a widget that displays a text string (label).
@@ -1323,6 +3075,11 @@ class Label(Image):
 
         offset_from_left  number of extra pixels to the left of the first character
 
+        use_glyph_atlas  if True, draw the text from a GlyphAtlas (a cache of
+                 pre-rendered characters) rather than with font.render(),
+                 which is much faster for widgets that get updated a lot.
+                 (You can also change the use_glyph_atlas attribute later.)
+
         ...plus optional image and pic_pos parameters as for Image widgets,
         (used for labels which also include images)
 
@@ -1350,14 +3107,15 @@ class Label(Image):
     '''
     def __init__(self, text='', pos=(0,0), color=BLACK, bgcolor=None, size=None,
                  width=None, font=vera, padding=0, image=None, offset_from_left=0,
-                 pic_pos=(0,0), Id=None ):
+                 pic_pos=(0,0), Id=None, use_glyph_atlas=False ):
         '''create a Label widget, with specified text, top-left position, color, etc.'''
         self.color = color
         self.font = font
         self.text = text
         self.offset_from_left = offset_from_left
+        self.use_glyph_atlas = use_glyph_atlas
         if not size:
-            size = self.font.size(text)
+            size = self._text_size(text)
             size = (size[0]+offset_from_left, size[1])
         if Id:
             self.Id = Id
@@ -1372,34 +3130,61 @@ class Label(Image):
         global changed
         self.text = text
         if adjustwidth:
-            w, h = self.font.size(self.text)  # get the width it requires to render.  #@UnusedVariable
+            w, h = self._text_size(self.text)  # get the width it requires to render.  #@UnusedVariable
             self.relative_rect.width = self.rect.width = w + (2 * self.padding) + self.offset_from_left
             self._overridden_width = None
         changed = True
 
+    def _text_size(self, text):
+        '''Return the (width, height) that text requires to render, in this
+        label's font.'''
+        if getattr(self, 'use_glyph_atlas', False):
+            return get_glyph_atlas(self.font, self.color).size(text)
+        return text_size(self.font, text)
+
+    def _render_text(self, text, pos, bgcolor=None):
+        '''Draw text onto self.image at pos, in this label's font & color, on
+        a transparent background, or on bgcolor if specified.  (Text drawn
+        from a glyph atlas always has a transparent background, so bgcolor
+        should already have been filled in.)
+        '''
+        if getattr(self, 'use_glyph_atlas', False):
+            get_glyph_atlas(self.font, self.color).draw(self.image, text, pos)
+        else:
+            if bgcolor is None:
+                # for transparent background, omit the background color parameter
+                txtimg = self.font.render(text, True, self.color)
+            else:
+                txtimg = self.font.render(text, True, self.color, bgcolor)
+            self.image.blit(txtimg, pos)
+
     def update(self):
         '''Update self.image from the text, rect, color, bgcolor, etc.'''
         global changed
         Image.update(self)
         if self.text != '':
             if (self.bgcolor is None) or (hasattr(self,'image') and self.image is not None):
-                # for transparent background, omit the background color parameter
-                txtimg = self.font.render(self.text, True, self.color)
+                self._render_text(self.text, (self.padding+self.offset_from_left,self.padding))
             else:
-                txtimg = self.font.render(self.text, True, self.color, self.bgcolor)
-            self.image.blit(txtimg, (self.padding+self.offset_from_left,self.padding))
+                self._render_text(self.text, (self.padding+self.offset_from_left,self.padding), self.bgcolor)
             Widget.update(self)  # repaint the box, in case txtimg overwrote it
         self._last_rendered_bgcolor = self.bgcolor
         changed = True
 
+    def _render_key(self):
+        key = Image._render_key(self)
+        return key and (key + ( getattr(self, 'text', ''), _hashable(getattr(self, 'color', None)),
+                                getattr(self, 'font', None), getattr(self, 'offset_from_left', 0),
+                                getattr(self, 'use_glyph_atlas', False) ))
+
     def collidepoint(self, pos):
         '''Like Widget.collidepoint(), except that for labels with transparent
         backgrounds only the part which actually contains text "collides" (is
-        clickable).
+        clickable).  (With hit_mask=True, only the text's pixels do.)
         '''
         result = Widget.collidepoint(self, pos)
-        if result and (self.bgcolor is None):
-            w,h = self.font.size(self.text)  # get the width it requires to render.  #@UnusedVariable
+        if result and (self.bgcolor is None) and not self.hit_mask:
+            w,h = self._text_size(self.text)  # get the width it requires to render.  #@UnusedVariable
             if pos[0] > (self.rect.left + w + (2 * self.padding) + self.offset_from_left):
                 # they clicked in the transparent tail of the string
                 result = None
@@ -1415,11 +3200,21 @@ class SimpleButton(Label):
 
     Pass the initializer an event.Id value (Id=), to be used when generating
     events.  If the id is omitted, the button caption (text= parameter) is used.
+
+    Optionally, pass on_click= a function to be called (with the click event
+    as its parameter) when the button is clicked.
+
+    A button keeps the images it has rendered for its up, down and hover
+    states (see update), so changing state is just a matter of swapping
+    images.
     '''
     def __init__(self, text='', padding=0, image=None, pos=(0,0), border=2,
                  color=BLACK, bgcolor=None, size=None, pic_pos=(0,0),
-                 Id=None, three_D=False, internal=False):
+                 Id=None, three_D=False, internal=False, on_click=None):
+        self.state_images = {}  # maps (bgcolor, boxcolors) -> rendered image
+        self.state_appearance = None  # everything else the state images depend on
         self.Id = Id
+        self.on_click = on_click
         self.isdown = False
         if internal:
             self.internal = True
@@ -1453,6 +3248,48 @@ class SimpleButton(Label):
         if size is not None:
             self.rect.size = size  # prevent border from increasing size
 
+    def _appearance(self):
+        '''Return everything (except the background and box colors, which
+        change with the button's state) that affects how the button looks.
+        '''
+        return ( self.text, tuple(self.rect.size), _hashable(getattr(self, 'color', None)),
+                 getattr(self, 'font', None), self.padding,
+                 getattr(self, 'offset_from_left', 0), getattr(self, 'use_glyph_atlas', False),
+                 getattr(self, 'pic', None), tuple(getattr(self, 'pic_pos', (0,0))),
+                 getattr(self, 'thick', 1), getattr(self, 'resizeable', None) == 'byMouse' )
+
+    def update(self):
+        '''Same as Label.update(), except that the rendered image is kept,
+        keyed by the background and box colors, which are what change when
+        the button is pressed, released, or hovered over.  So when the button
+        goes back to a state it has been in before, its image for that state
+        is reused rather than redrawn.  (When anything else about the button's
+        appearance changes, such as its text or size, the kept images are
+        discarded.)
+        '''
+        global changed
+        if len(self.children):
+            # (buttons don't normally have children, but if this one does, it
+            # has to be redrawn every time)
+            Label.update(self)
+            return
+        appearance = self._appearance()
+        if (appearance != self.state_appearance) or (len(self.state_images) >= 6):
+            self.state_images = {}
+            self.state_appearance = appearance
+        key = (_hashable(self.bgcolor), _hashable(getattr(self, 'boxcolors', None)))
+        image = self.state_images.get(key)
+        if image is None:
+            # draw on a new surface, since the current one may be a kept image
+            self._make_image_surface(self.rect.size, transparent=not self.bgcolor)
+            Label.update(self)
+            self.state_images[key] = self.image
+        else:
+            self._position_from_parent()
+            self.image = image
+            self._last_rendered_bgcolor = self.bgcolor
+            changed = True
+
     def _swapped_boxcolors(self):
         '''If boxcolors is set to a single color, this returns it; if set to a
         pair of colors, this returns them in swapped order.  If boxcolors is
@@ -1488,7 +3325,7 @@ class SimpleButton(Label):
         self.set_bgcolor(self.color_up)
 
     def click(self):
-        '''Post a button-click user event to the pygame event queue'''
+        '''Deliver a button-click user event (see deliver_event)'''
         if hasattr(self, 'internal'):
             # if self.internal=True then this is an internal button,
             # e.g., part of a scroll bar
@@ -1496,7 +3333,7 @@ class SimpleButton(Label):
         else:
             internal = False
         ev = pygame.event.Event( WIDGETEVENT, {'Id':self.Id, 'sender':self, 'internal':internal} )
-        pygame.event.post(ev)
+        deliver_event(self, ev, self.on_click)
 
     def _3D_up(self):
         '''undo 3D "down" effect'''
@@ -1560,9 +3397,11 @@ class Button(SimpleButton):
     '''A Button is like a SimpleButton, except that it changes the
     mouse cursor over the button.
     '''
-    def __init__(self, text='', image=None, pos=(0,0), border=2, color=BLACK, Id=None, three_D=False):
+    def __init__(self, text='', image=None, pos=(0,0), border=2, color=BLACK, Id=None, three_D=False,
+                 on_click=None):
         SimpleButton.__init__(self, text=text, image=image, pos=pos,
-                           border=border, color=color, Id=Id, three_D=three_D)
+                           border=border, color=color, Id=Id, three_D=three_D,
+                           on_click=on_click)
         self.use_this_mouse_cursor = default_mouse_cursor
 
 
@@ -1584,17 +3423,26 @@ class SimpleCheckbox(Image):
     Pass the initializer an event.Id value (Id=), to be used when generating
     events.  If the Id is omitted, then 'checkbox' is used (which, obviously,
     is only adequate if there's only one checkbox in your program).
+
+    Optionally, pass on_change= a function to be called (with the event as
+    its parameter) when the checkbox is checked or unchecked.
     '''
-    def __init__(self, pos=(0,0), Id='checkbox', checked=False, padding=0):
+    def __init__(self, pos=(0,0), Id='checkbox', checked=False, padding=0,
+                 on_change=None):
         self.Id = Id
+        self.on_change = on_change
         self.checked = checked
         self.never_has_focus = False  # checkboxes can have mouse focus
-        Image.__init__(self, image=unchecked.copy(), pos=pos, padding=padding )
+        if not share_identical_images:
+            unchecked_pic = unchecked.copy()  # so that drawing on .pic can't affect other checkboxes
+        else:
+            unchecked_pic = unchecked
+        Image.__init__(self, image=unchecked_pic, pos=pos, padding=padding )
 
     def click(self):
-        '''Post a checkbox-change event to the pygame event queue'''
-        ev = pygame.event.Event( WIDGETEVENT, {'Id':self.Id, 'internal':False, 'checked':self.checked} )
-        pygame.event.post(ev)
+        '''Deliver a checkbox-change event (see deliver_event)'''
+        ev = pygame.event.Event( WIDGETEVENT, {'Id':self.Id, 'sender':self, 'internal':False, 'checked':self.checked} )
+        deliver_event(self, ev, self.on_change)
 
     def notify(self, ev):
         '''Receive notification of a pygame event, and do something if it is
@@ -1615,10 +3463,16 @@ class SimpleCheckbox(Image):
         return rc
 
     def update(self):
+        self._position_from_parent()
+        self.unshare_image()
         if self.checked:
             self.image.blit(checked, (self.padding,self.padding))
         else:
             self.image.blit(unchecked, (self.padding,self.padding))
+        self.image_version += 1
+
+    def _render_key(self):
+        return Image._render_key(self) + (self.checked,)
 
 
 class Checkbox(SimpleCheckbox, Label):
@@ -1639,10 +3493,10 @@ class Checkbox(SimpleCheckbox, Label):
     '''
     def __init__(self, pos=(0,0), Id='checkbox', checked=False, padding=0,
                  text='', color=BLACK, bgcolor=None, width=None, font=vera,
-                 boxcolors=None):
+                 boxcolors=None, on_change=None):
         SimpleCheckbox.__init__(self, pos=pos, Id=Id, checked=checked,
-                                padding=padding)
-        size = font.size(text)
+                                padding=padding, on_change=on_change)
+        size = text_size(font, text)
         size = (size[0]+CHECKBOXSIZE+3+2*padding, size[1]+2*padding)
         if size[1] < (CHECKBOXSIZE + 2*padding):
             size = (size[0], (CHECKBOXSIZE + 2*padding))  # has to be tall enough for a simplecheckbox
@@ -1650,7 +3504,11 @@ class Checkbox(SimpleCheckbox, Label):
             size[0] = width
         else:
             width = size[0]
-        Label.__init__(self, image=unchecked.copy(), text=text, pos=pos,
+        if not share_identical_images:
+            unchecked_pic = unchecked.copy()  # so that drawing on .pic can't affect other checkboxes
+        else:
+            unchecked_pic = unchecked
+        Label.__init__(self, image=unchecked_pic, text=text, pos=pos,
                        color=color, font=font, size=size, bgcolor=bgcolor,
                        offset_from_left=CHECKBOXSIZE+3, width=width,
                        padding=padding)
@@ -1663,6 +3521,10 @@ class Checkbox(SimpleCheckbox, Label):
         Label.update(self)  # draw the background & label text
         SimpleCheckbox.update(self)  # then the checkbox
 
+    def _render_key(self):
+        key = Label._render_key(self)
+        return key and (key + (self.checked,))
+
     # top_collidepoint() is inherited from Label, and notify() is inherited
     # from SimpleCheckbox, so you can reverse the state of the checkbox
     # by clicking anywhere on the box or its label.  Neat, eh?
@@ -1673,9 +3535,63 @@ class Checkbox(SimpleCheckbox, Label):
 menu_border_inner_color = (245,245,245)
 menu_border_outer_color = (151,151,151)
 
+#------------------[ Begin code for reusing pop-up menus ]------------------
+
+# Building a menu with Menu.ActionMenu() means splitting the labels string,
+# and creating (and rendering) a button for each item.  For a pop-up menu
+# which is built each time it's shown (e.g., on a right-click), that's most
+# of the time it takes to pop up.  So Menu.ActionMenu(..., cached=True)
+# keeps the menu it builds, keyed by everything it was built from, and the
+# next time it's asked for the same menu it just returns that one, put back
+# the way it was built: its buttons in their up (not pressed or hovered-over)
+# state, nothing selected or typed, and scrolled back to the top.  Since
+# the buttons keep their rendered images (see SimpleButton.update), showing
+# the menu again is then just blitting them.
+#
+# A cached menu is shared by every caller that asks for it, so it should
+# only be shown in one place at a time (which is normal for pop-ups), and
+# it shouldn't be modified (e.g., by adding buttons to it).
+#
+# At most MENU_CACHE_MAX menus are kept; when there's no room for another,
+# the one which was asked for least recently is dropped.
+
+MENU_CACHE_MAX = 100  # how many menus Menu.ActionMenu(..., cached=True) keeps
+action_menus = collections.OrderedDict()  # maps (class, labels, selectors, Id, max_height) -> Menu,
+                                          # least recently used first
+
+#-------------------[ End code for reusing pop-up menus ]-------------------
+
+
+#-------------------[ Begin code for scrolling menus ]-------------------
+
+# A menu with thousands of items would run off the screen, and would need a
+# button for each item.  So a "scrolling menu" (see Menu.set_items, or
+# Menu.ActionMenu(..., max_height=...)) is no taller than max_height, and
+# has only as many buttons as fit: one per visible row.  Scrolling (with its
+# scroll bar, or the mouse wheel) just changes which items those buttons
+# show.  The items themselves are just (text, selector, disabled) tuples.
+#
+# A scrolling menu which is too short for a scroll bar (SB_MIN_LENGTH_42) has
+# none, but it can still be scrolled with the mouse wheel and by typing.
+#
+# Typing while the mouse pointer is over a scrolling menu jumps to the first
+# item that starts with what was typed (ignoring case), and [Enter] then
+# chooses that item.  The items are found in a sorted index of their texts,
+# with bisect.  Keys typed less than MENU_TYPE_AHEAD_TIMEOUT milliseconds
+# apart are taken together, so typing "ap" jumps past "a" to "ap".
+
+MENU_TYPE_AHEAD_TIMEOUT = 1000  # milliseconds
+MENU_WHEEL_ROWS = 3  # how many items one click of the mouse wheel scrolls
+
+#--------------------[ End code for scrolling menus ]--------------------
+
+
 class Menu(Widget):
     '''A vertical menu widget is a widget which contains a WidgetGroup of
     simplebutton widgets, one for each menu item.
+
+    A long menu can instead be a scrolling menu, with a scroll bar and just
+    one button per visible row (see set_items, and "scrolling menus").
     '''
     def __init__(self, pos=(0,0), Id='aMenu'):
         self.border_thickness = 3  # hard-coded for now, but could change
@@ -1687,6 +3603,15 @@ class Menu(Widget):
         self.image = pygame.Surface((self.border_thickness*2,self.border_thickness*2))
         self.set_boxcolors(menu_border_outer_color)  # menus need a box around them
         self.use_this_mouse_cursor = default_mouse_cursor
+        # the buttons are stacked inside the border, all as wide as the widest
+        self.set_layout(Box(padding=self.border_thickness, align='fill'))
+        self.items = None  # for scrolling menus (see set_items)
+        self.rows = []
+        self.scrollbar = None
+        self.first_item = 0  # the item shown by the top row
+        self.selected = None  # the item found by typing (see type_ahead)
+        self.typed = ''
+        self.typed_at = 0
 
     def add_widgets(self, *buttons):
         '''Add a list of buttons to a menu, in the order specified.  This is
@@ -1696,25 +3621,196 @@ class Menu(Widget):
         for button in buttons:
             button.set_colors(menu_bgcolor, button_dn_color, menu_hover_color)
         Widget.add_widgets(self, *buttons)
+        if self.layout is not None:
+            for button in buttons:
+                self.layout.add(button)
+
+    def set_items(self, labels, selectors=None, max_height=300, on_click=None):
+        '''Make this a scrolling menu (see "scrolling menus"), which is no
+        taller than max_height pixels, of the items in the list of labels.
+
+        The labels and selectors are as for ActionMenu (including the leading
+        "-" for disabled items), except that labels is a list rather than a
+        string.  on_click is passed to the buttons (see SimpleButton).
+
+        Any buttons already in the menu are removed.
+        '''
+        global changed
+        if selectors:
+            if len(labels) != len(selectors):
+                raise ValueError('Wrong number of selectors: ' + repr(len(selectors)) +
+                                 ' selectors for ' + repr(len(labels)) + ' labels.')
+        else:
+            selectors = labels
+        self.remove_widgets(*self.children.sprites())
+        self.layout = None
+        self.items = []
+        for (label, selector) in zip(labels, selectors):
+            if label[:1] == '-':  # leading '-' on label means disabled
+                self.items.append((label[1:], selector, True))
+            else:
+                self.items.append((label, selector, False))
+        # the prefix index for type-to-jump
+        self.item_index = sorted([(text.lower(), i) for (i, (text, selector, disabled)) in enumerate(self.items)])
+        self.item_keys = [key for (key, i) in self.item_index]
+        bt = self.border_thickness
+        self.rows = [SimpleButton(self.items[0][0] if self.items else ' ', border=4, on_click=on_click)]
+        row0 = self.rows[0]
+        row_height = row0.rect.height
+        extra = row0.rect.width - text_size(row0.font, row0.text)[0]
+        width = max([text_size(row0.font, text)[0] for (text, selector, disabled) in self.items] or [0]) + extra
+        n = min(len(self.items), max(1, (max_height - (2 * bt)) // row_height))
+        del self.rows[n:]
+        for i in range(1, n):
+            self.rows.append(SimpleButton(self.items[i][0], border=4, on_click=on_click))
+        for (i, row) in enumerate(self.rows):
+            row.set_width(width)
+            row.relative_rect.topleft = (bt, bt + (i * row_height))
+        self.add_widgets(*self.rows)
+        size = (width + (2 * bt), (n * row_height) + (2 * bt))
+        self.scrollbar = None
+        if (len(self.items) > n) and (n * row_height >= SB_MIN_LENGTH_42):
+            self.scrollbar = ScrollBar(min_val=0, max_val=len(self.items)-n, small_inc=1,
+                                       large_inc=max(1, n-1), size=n*row_height,
+                                       pos=(width+bt, bt), Id='scroll.'+self.Id, internal=True)
+            self.scrollbar.slider_size = n
+            Widget.add_widgets(self, self.scrollbar)
+            size = (size[0] + self.scrollbar.rect.width, size[1])
+        self.rect.size = self.relative_rect.size = size
+        self.first_item = 0
+        self.selected = None
+        self.typed = ''
+        self._show_items()
+        changed = True
+
+    def scroll_to(self, item):
+        '''Scroll a scrolling menu (see set_items) so that the item (an index
+        into self.items) is shown.
+        '''
+        first = self.first_item
+        if item < first:
+            first = item
+        elif item >= first + len(self.rows):
+            first = item - len(self.rows) + 1
+        self.first_item = first
+        if self.scrollbar is not None:
+            self.scrollbar.value = float(first)
+        self._show_items()
+
+    def type_ahead(self, char):
+        '''Add char to what has been typed (see "scrolling menus"), and jump
+        to the first item (in menu order, not alphabetical order) which
+        starts with that.  Returns True if there is such an item.
+        '''
+        now = clock()
+        if now - self.typed_at > MENU_TYPE_AHEAD_TIMEOUT:
+            self.typed = ''
+        self.typed_at = now
+        self.typed += char.lower()
+        # the items which start with that are together in the sorted index
+        lo = hi = bisect.bisect_left(self.item_keys, self.typed)
+        while (hi < len(self.item_keys)) and self.item_keys[hi].startswith(self.typed):
+            hi += 1
+        if hi > lo:
+            self.selected = min([i for (key, i) in self.item_index[lo:hi]])
+            self.scroll_to(self.selected)
+            return True
+        return False
+
+    def _show_items(self):
+        '''Show the items of a scrolling menu which are scrolled into view,
+        in its buttons.
+        '''
+        first = self.first_item
+        if self.scrollbar is not None:
+            first = int(round(self.scrollbar.value))
+        first = max(0, min(first, len(self.items) - len(self.rows)))
+        self.first_item = first
+        for (i, row) in enumerate(self.rows):
+            (text, selector, disabled) = self.items[first + i]
+            if row.text != text:
+                row.set_text(text)
+            if row.Id != selector:
+                row.Id = selector
+            row.color = (128,128,128) if disabled else BLACK  # grey indicates "disabled"
+            if not row.hasmousefocus:
+                if first + i == self.selected:
+                    row.set_bgcolor(row.color_hover)
+                elif row.bgcolor != row.color_up:
+                    row.set_bgcolor(row.color_up)
+
+    def notify(self, ev):
+        '''Same as Widget.notify(), plus the mouse wheel and type-to-jump for
+        scrolling menus.  (Keys are only taken while the mouse pointer is
+        over the menu, according to the latest mouse event.)
+        '''
+        if self.items and (ev.type in (MOUSEMOTION, MOUSEBUTTONDOWN, MOUSEBUTTONUP)):
+            self.hasmousefocus = self.top_collidepoint(ev.pos, include_children=True)
+        if self.items and self.hasmousefocus:
+            if (ev.type == MOUSEBUTTONDOWN) and (ev.button in (4, 5)) and (len(self.items) > len(self.rows)):
+                # the mouse wheel
+                delta = MENU_WHEEL_ROWS if (ev.button == 5) else -MENU_WHEEL_ROWS
+                self.first_item = max(0, min(len(self.items) - len(self.rows), self.first_item + delta))
+                if self.scrollbar is not None:
+                    self.scrollbar.value = float(self.first_item)
+                self._show_items()
+                return True
+            if ev.type == KEYDOWN:
+                if (ev.key in (K_RETURN, K_KP_ENTER)) and (self.selected is not None):
+                    self.scroll_to(self.selected)
+                    self.rows[self.selected - self.first_item].click()
+                    return True
+                if getattr(ev, 'unicode', '') >= ' ':  # a printable character
+                    return self.type_ahead(ev.unicode)
+        return Widget.notify(self, ev)
+
+    def reset_hover(self):
+        '''Put each of the menu's buttons back in its up (not pressed, not
+        hovered-over) state, e.g., before showing the menu again.
+        '''
+        self.hasmousefocus = False
+        self.selected = None
+        buttons = self.children.sprites()
+        if self.scrollbar is not None:
+            buttons += self.scrollbar.children.sprites()
+        for button in buttons:
+            if isinstance(button, SliderButton):
+                button.slider_dragging = False
+            if isinstance(button, SimpleButton) and (button.hasmousefocus or button.isdown):
+                button.isdown = False
+                button.hasmousefocus = False
+                button.set_bgcolor(button.color_up)
+                button._3D_up()
+
+    def reset(self):
+        '''Put the menu back the way it was built, e.g., before showing it
+        again: its buttons in their up state (see reset_hover), nothing
+        selected or typed (see type_ahead), and, for a scrolling menu,
+        scrolled back to its first item, with no scroll bar value left to
+        report.
+        '''
+        self.reset_hover()
+        self.typed = ''
+        self.typed_at = 0
+        if self.items is not None:
+            self.first_item = 0
+            sb = self.scrollbar
+            if sb is not None:
+                stop_timer(sb)
+                if sb in deferred_widgets:
+                    deferred_widgets.remove(sb)
+                sb.value = sb.prev_value = sb.final_value = sb.min_val
+            self._show_items()
 
     def _arrange_buttons(self):
-        w = 0
-        h = self.border_thickness
-        # left = self.border_thickness
-        for button in self.children:
-            button.relative_rect.topleft = (self.border_thickness, h)
-            button.rect.topleft = (self.border_thickness + self.rect.left, h + self.rect.top)
-            h += button.rect.height
-            w = max(w, button.rect.width)
-        h += self.border_thickness
-        w2 = w + (2 * self.border_thickness)
-        self.relative_rect.size = self.rect.size = (w2, h)
-        for button in self.children:
-            button.set_width(w)
+        if self.items is not None:
+            self._show_items()
+        else:
+            self.layout.arrange(self)
         if self.image.get_size() != self.rect.size:
             # menu size/shape has changed, so we must refresh the image:
             # the inner-border, outer-border, and buttons:
-            self.image = pygame.Surface((w2, self.rect.height))
+            self.image = pygame.Surface(self.rect.size)
             self.image.fill(menu_border_inner_color)  # fill with inner border color
             # outer border is taken care of by Widget.update()
             # self._box_around(menu_border_outer_color)  # draw outer border
@@ -1725,7 +3821,8 @@ class Menu(Widget):
         Widget.update(self)
 
     @classmethod
-    def ActionMenu(cls, labels, selectors=None, pos=(0,0), Id='aMenu'):
+    def ActionMenu(cls, labels, selectors=None, pos=(0,0), Id='aMenu', on_click=None, cached=False,
+                   max_height=None):
         '''Quick constructor of a Menu instance and its buttons.
         The labels are contained in a string and separated by '|' vertical bars.
 
@@ -1739,9 +3836,43 @@ class Menu(Widget):
         be the button labels, then the "-" will be included in the event.Id when such
         a menu item is clicked; when such an event is received, it's a good idea to
         pop-up an explanation of why the menu item is disabled.
+
+        If on_click is specified, it is passed to every button (see SimpleButton).
+
+        If cached=True, then the menu is kept, and later calls with the same
+        parameters (except pos and on_click) return the same menu, put back
+        the way it was built (see reset), with on_click passed to its buttons,
+        and removed from the widget it was added to last time (e.g., by
+        wrap_in_titlebar), instead of building a new one.  That's handy for
+        pop-up menus; see action_menus.
+
+        If max_height is specified, then the menu is a scrolling menu which
+        is no taller than that (see set_items), e.g., for a long list.
         '''
+        if cached:
+            key = (cls, labels, _hashable(selectors), Id, max_height)
+            menu = action_menus.pop(key, None)
+            if menu is None:
+                menu = cls.ActionMenu(labels, selectors, pos, Id, on_click, max_height=max_height)
+                while action_menus and (len(action_menus) >= MENU_CACHE_MAX):
+                    action_menus.popitem(last=False)  # the least recently used menu
+            else:
+                if menu.parent is not None:
+                    menu.parent.remove_widgets(menu)
+                    menu.parent = None
+                for button in menu.children:
+                    if isinstance(button, SimpleButton):
+                        button.on_click = on_click
+                menu.reset()
+                menu.rect.topleft = menu.relative_rect.topleft = pos
+            action_menus[key] = menu  # (re)inserted last, as the most recently used
+            return menu
         menu = cls(Id=Id)
         lbls = labels.split('|')  # that's a vertical bar '|' even though it looks like a slash in Eclipse
+        if max_height is not None:
+            menu.set_items(lbls, selectors, max_height, on_click)
+            menu.rect.topleft = menu.relative_rect.topleft = pos
+            return menu
         n = len(lbls)
         if selectors:
             if n != len(selectors):
@@ -1751,10 +3882,10 @@ class Menu(Widget):
         buttons = []
         for i in range(0, n):
             if lbls[i][0] =='-':  # leading '-' on label means disabled
-                button = SimpleButton(lbls[i][1:], Id=selectors[i], border=4)
+                button = SimpleButton(lbls[i][1:], Id=selectors[i], border=4, on_click=on_click)
                 button.set_colors(fg=(128,128,128))  # grey indicates "disabled"
             else:
-                button = SimpleButton(lbls[i], Id=selectors[i], border=4)
+                button = SimpleButton(lbls[i], Id=selectors[i], border=4, on_click=on_click)
             buttons.append(button)
         menu.add_widgets(*buttons)
         menu.rect.topleft = menu.relative_rect.topleft = pos
@@ -1781,10 +3912,16 @@ class TextEditBox(Label):
 
     A pygame event will be generated when the user presses the [Enter] key,
     and the text string that the user entered will be stored in event.text
-    (and also retained in the widget's .text attribute).
+    (and also retained in the widget's .text attribute).  Optionally, pass
+    on_enter= a function to be called (with that event as its parameter)
+    at the same time.
+
+    use_glyph_atlas=True draws the text from a glyph atlas (see Label).
     '''
-    def __init__(self, text='', maxlen=80, width=100, pos=(0,0), border=2, color=BLACK, bgcolor=None, Id='text'):
+    def __init__(self, text='', maxlen=80, width=100, pos=(0,0), border=2, color=BLACK, bgcolor=None, Id='text',
+                 on_enter=None, use_glyph_atlas=False):
         self.Id = Id
+        self.on_enter = on_enter
         self.never_has_focus = False  # TextEditBoxs can have mouse focus
         self.haskbdfocus = False
         self.cursorpos = 0
@@ -1795,15 +3932,16 @@ class TextEditBox(Label):
         self.saved_bgcolor = bgcolor
         self.boxcolors = None
         self.saved_boxcolors = None
-        Label.__init__(self, text, pos=pos, color=color, bgcolor=bgcolor, width=width)
+        Label.__init__(self, text, pos=pos, color=color, bgcolor=bgcolor, width=width,
+                       use_glyph_atlas=use_glyph_atlas)
         if border != 0:
             self.set_border(border)
         self.use_this_mouse_cursor = default_mouse_cursor
 
     def enter_key(self):
-        '''Post a user event to the pygame event queue in response to the Enter key.'''
-        ev = pygame.event.Event( WIDGETEVENT, {'Id':self.Id, 'text':self.text, 'internal':False} )
-        pygame.event.post(ev)
+        '''Deliver a user event (see deliver_event) in response to the Enter key.'''
+        ev = pygame.event.Event( WIDGETEVENT, {'Id':self.Id, 'text':self.text, 'sender':self, 'internal':False} )
+        deliver_event(self, ev, self.on_enter)
 
     def focus(self, has_focus=True):
         '''called when we get or lose kbd focus'''
@@ -1850,7 +3988,7 @@ class TextEditBox(Label):
                 thickness = 2
             # The hardest part is figuring out where to draw it.
             # First, get the rendered width of the text to the left of the cursor
-            x, h = self.font.size(self.text[:self.cursorpos])
+            x, h = self._text_size(self.text[:self.cursorpos])
             x += (self.padding - 1)
             y = self.padding
             h = self.rect.height - (2 * self.padding + 1)
@@ -1863,11 +4001,10 @@ class TextEditBox(Label):
                 self._fill_bg()  # fill in the background color
                 if self.bgcolor:
                     # normal background
-                    txtimg = self.font.render(self.text, True, self.color, self.bgcolor)
+                    self._render_text(self.text, (self.padding-(x-maxx),self.padding), self.bgcolor)
                 else:
                     # transparent background
-                    txtimg = self.font.render(self.text, True, self.color)  # omit the background color parameter
-                self.image.blit(txtimg, (self.padding-(x-maxx),self.padding) )
+                    self._render_text(self.text, (self.padding-(x-maxx),self.padding))
                 # draw the cursor (at the end):
                 pygame.draw.line(self.image, BLACK, (maxx,y), (maxx,y+h), thickness)
             else:
@@ -1875,6 +4012,10 @@ class TextEditBox(Label):
                 pygame.draw.line(self.image, BLACK, (x,y), (x,y+h), thickness)
             Widget.update(self)  # redraw the box around it
 
+    def _render_key(self):
+        key = Label._render_key(self)
+        return key and (key + (self.haskbdfocus, self.cursorpos, self.insert_mode))
+
     def notify(self, ev):
         '''Receive notification of a pygame event, and do something if it is
         for this widget.
@@ -1958,6 +4099,485 @@ class TextEditBox(Label):
         return rc
 
 
+#--------------[ Begin code for skipping updates of unchanged widgets ]--------------
+
+# Set this to True to have container widgets (see BasicForm.update) keep
+# their images as composites of their child widgets, and redraw only what
+# has changed, and to skip updating widgets whose ._render_key() hasn't
+# changed.  That's much faster for big forms, but it's only safe if the
+# application never draws on a widget's image (or its .pic) itself, or
+# changes something that affects how a widget looks that its ._render_key()
+# doesn't cover, without calling widget.invalidate() afterwards.  By
+# default (False), every widget is redrawn on every update.
+compose_incrementally = False
+
+# The .update() methods which draw nothing but what the widget's
+# ._render_key() describes.  A widget whose class overrides .update() with
+# some other method (which might, e.g., change the widget's text each frame)
+# is always updated.
+_keyed_updates = ( Image.update, Label.update, SimpleButton.update,
+                   SimpleCheckbox.update, Checkbox.update, TextEditBox.update )
+
+# Set this to True to have widgets of the same class which would render
+# identical images (because their ._render_key()s match, apart from the
+# image itself), such as rows of unchecked Checkboxes or of "Edit" buttons,
+# share one image rather than each rendering its own.  (That only happens
+# when compose_incrementally is True, too.)  A widget whose image is shared
+# gets a copy of its own (see Widget.unshare_image) before it draws on it,
+# e.g., when its state changes, but if the application draws on a widget's
+# image (or its .pic) itself, then it must call widget.unshare_image()
+# first.  By default (False), every widget has images of its own.
+share_identical_images = False
+
+# maps (class, render key without the image or its size) -> the widget which
+# most recently rendered an image for it (of the size of its rect)
+_image_owners = weakref.WeakValueDictionary()
+
+def _image_content(widget, key):
+    '''Return the key (see _image_owners) for the image which widget, whose
+    ._render_key() is key, would render.  (Its size is the size of the
+    widget's rect, which is part of the key.)'''
+    return (type(widget),) + key[2:]
+
+def _share_image(widget, key):
+    '''If another widget has already rendered the image which widget (whose
+    ._render_key() is key) needs, and still has it, then share that image
+    with widget and return True.  Otherwise return False.
+    '''
+    global changed
+    if widget.image.get_parent() is not None:
+        return False  # it renders into its parent's image (see Widget._child_view)
+    content = _image_content(widget, key)
+    try:
+        owner = _image_owners.get(content)
+    except TypeError:
+        return False  # something in the key isn't hashable
+    if (owner is None) or (owner is widget):
+        return False
+    owner_key = owner._rendered_key
+    if ( (owner_key is None) or (owner_key[0] is not owner.image) or
+         (_image_content(owner, owner_key) != content) or
+         (owner.image.get_size() != tuple(widget.rect.size)) ):
+        return False  # it has drawn something else since
+    widget._position_from_parent()
+    widget.image = owner.image
+    widget._image_shared = owner._image_shared = True
+    widget._last_rendered_bgcolor = widget.bgcolor
+    widget.image_version += 1
+    widget._rendered_key = widget._render_key()
+    changed = True
+    return True
+
+def _update_widget(widget):
+    '''Call widget.update(), unless nothing that affects the widget's image
+    has changed since it was last updated (according to its ._render_key()),
+    in which case just bring its position up to date.  Or, if another widget
+    has an identical image, share that (see share_identical_images).
+    '''
+    if (not compose_incrementally) or (type(widget).update not in _keyed_updates):
+        widget.update()
+        return
+    key = widget._render_key()
+    if (key is not None) and (key == widget._rendered_key):
+        widget._position_from_parent()
+    elif (key is not None) and share_identical_images and _share_image(widget, key):
+        pass
+    else:
+        widget.update()
+        key = widget._rendered_key = widget._render_key()
+        if ( share_identical_images and (key is not None) and
+             (widget.image.get_parent() is None) and (widget.image.get_size() == tuple(widget.rect.size)) ):
+            try:
+                _image_owners[_image_content(widget, key)] = widget
+            except TypeError:
+                pass  # something in the key isn't hashable
+
+#--------------[ End code for skipping updates of unchanged widgets ]--------------
+
+
+#--------------[ Begin code for laying out child widgets ]--------------
+
+# Instead of positioning each of its child widgets by hand (via their
+# relative_rects), a container widget can be given a layout (a Box or a
+# Grid), which positions and sizes them, and (optionally) sizes the container
+# to fit them.  E.g.:
+#
+#     form = BasicForm(bgcolor=(240,240,255))
+#     form.set_layout(Box(padding=10, spacing=4))
+#     form.layout.add(Label('Name:'))
+#     form.layout.add(TextEditBox(width=150))
+#
+# A child widget's preferred size is the size it gives itself (e.g., from
+# its text), or, for a container with a layout of its own, the size which
+# that layout needs.  Layouts can also be nested (e.g., a row of buttons in
+# a column) without a container widget for the inner layout.
+#
+# A layout is only re-run when something it depends on (the preferred sizes
+# of the widgets in it, or the size or position of the container) has
+# changed, and each layout remembers its last measurement, so it's cheap to
+# check on every update.
+
+def _limit(size, min_size, max_size):
+    '''Return size (width, height), kept within min_size and max_size.
+    Either limit, or either of its components, may be None, meaning no limit.
+    '''
+    (w, h) = size
+    if min_size:
+        if min_size[0] is not None:
+            w = max(w, min_size[0])
+        if min_size[1] is not None:
+            h = max(h, min_size[1])
+    if max_size:
+        if max_size[0] is not None:
+            w = min(w, max_size[0])
+        if max_size[1] is not None:
+            h = min(h, max_size[1])
+    return (w, h)
+
+def _share_out(sizes, extra, stretches, limits):
+    '''Share out extra pixels among sizes (a list, which is modified), in
+    proportion to stretches, without making any size bigger than its limit
+    (None means no limit).
+    '''
+    stretchy = [i for i in range(len(sizes)) if stretches[i] > 0]
+    while (extra > 0) and stretchy:
+        total = sum([stretches[i] for i in stretchy])
+        given = 0
+        done = 0
+        full = []
+        for i in stretchy:
+            share = ((extra * (done + stretches[i])) // total) - ((extra * done) // total)
+            done += stretches[i]
+            if (limits[i] is not None) and (sizes[i] + share >= limits[i]):
+                share = max(0, limits[i] - sizes[i])
+                full.append(i)
+            sizes[i] += share
+            given += share
+        extra -= given
+        if not full:
+            break
+        stretchy = [i for i in stretchy if i not in full]
+
+def _align_in(slot, size, align):
+    '''Return the Rect for something of size (width, height) within slot (a
+    Rect), aligned as specified (see LayoutItem).
+    '''
+    if isinstance(align, str):
+        align = (align, align)
+    result = Rect(slot.topleft, size)
+    for (axis, how) in ((0, align[0]), (1, align[1])):
+        if how == 'fill':
+            (lo, extent) = (slot[axis], slot[axis+2])
+        elif how == 'center':
+            (lo, extent) = (slot[axis] + (slot[axis+2] - size[axis]) // 2, size[axis])
+        elif how == 'end':
+            (lo, extent) = (slot[axis] + slot[axis+2] - size[axis], size[axis])
+        else:  # 'start'
+            (lo, extent) = (slot[axis], size[axis])
+        result[axis] = lo
+        result[axis+2] = extent
+    return result
+
+
+class LayoutItem(object):
+    '''A widget (or a nested layout) in a layout, with its layout parameters:
+        stretch  how much of any extra room along a Box it gets, relative to
+            the other widgets in the Box.  The default, 0, means none.
+        min_size, max_size  (width, height) limits on its size; None (or
+            None for either component) means no limit.
+        align  how it's placed within the room it gets: 'start', 'center',
+            'end' or 'fill', or a (horizontal, vertical) pair of those.  None
+            means to use the layout's align.
+        cell  (row, column), for Grid layouts.
+    '''
+    def __init__(self, widget, stretch=0, min_size=None, max_size=None,
+                 align=None, cell=None):
+        self.widget = widget
+        self.stretch = stretch
+        self.min_size = min_size
+        self.max_size = max_size
+        self.align = align
+        self.cell = cell
+        self.preferred = None
+        self.assigned = None  # the size the layout last gave the widget
+
+    def preferred_size(self, container):
+        '''Return the size the widget would like to be, within its limits.'''
+        widget = self.widget
+        if isinstance(widget, Layout):
+            size = widget.content_size(container)
+        elif (getattr(widget, 'layout', None) is not None) and widget.layout.fit:
+            size = widget.layout.measure(widget)
+        else:
+            if tuple(widget.rect.size) != self.assigned:
+                # the widget has sized itself (e.g., Label.set_text())
+                self.preferred = tuple(widget.rect.size)
+            size = self.preferred
+        return _limit(size, self.min_size, self.max_size)
+
+    def place(self, container, rect):
+        '''Put the widget in rect (which is relative to the container).'''
+        widget = self.widget
+        if isinstance(widget, Layout):
+            widget.place(container, rect)
+            return
+        size = tuple(rect.size)
+        if tuple(widget.rect.size) != size:
+            if (widget.rect.width != size[0]) and hasattr(widget, 'set_width'):
+                widget.set_width(size[0])
+            widget.rect.size = size
+            widget.relative_rect.size = size
+        self.assigned = size
+        widget.relative_rect.topleft = rect.topleft
+        widget.rect.topleft = (container.rect.left + rect.left, container.rect.top + rect.top)
+
+
+class Layout(object):
+    '''Base class for the Box and Grid layouts.
+
+        padding  the room around the widgets: a number, or a (left, top,
+            right, bottom) tuple
+        spacing  the room between adjacent widgets: a number, or a
+            (horizontal, vertical) pair
+        align  how each widget is placed within the room it gets (see
+            LayoutItem); the default is 'fill'
+        fit  if True (the default), the container is resized to fit its
+            widgets (but no smaller than its min_width & min_height).  If
+            False, the container keeps its size, and any extra room is
+            shared out among the stretchable widgets.  (Use fit=False for a
+            container which can be resized by the user.)
+
+    To use a layout, pass it to the container's set_layout() method, and
+    add() widgets to it.  If the container has a titlebar (see Form and
+    wrap_in_titlebar), then the widgets are laid out below it.
+    '''
+    def __init__(self, padding=0, spacing=0, align='fill', fit=True):
+        if isinstance(padding, int):
+            padding = (padding, padding, padding, padding)
+        if isinstance(spacing, int):
+            spacing = (spacing, spacing)
+        self.padding = tuple(padding)
+        self.spacing = tuple(spacing)
+        self.align = align
+        self.fit = fit
+        self.items = []
+        self.container = None
+        self._measured = (None, None)  # (the preferred sizes, the size they need)
+        self._arranged = None  # what the last arrangement depended on
+
+    def add(self, widget, stretch=0, min_size=None, max_size=None, align=None, **kwargs):
+        '''Add a widget (or a nested layout) to the layout, with the layout
+        parameters described in LayoutItem, and return it.  If the layout
+        already belongs to a container, then the widget is also made one of
+        the container's child widgets.
+        '''
+        if widget not in [item.widget for item in self.items]:
+            self.items.append(LayoutItem(widget, stretch, min_size, max_size, align, **kwargs))
+            if self.container is not None:
+                self._adopt(self.container)
+            self._arranged = None
+        return widget
+
+    def remove(self, widget):
+        '''Remove a widget (or a nested layout) from the layout.'''
+        for item in self.items:
+            if isinstance(item.widget, Layout):
+                item.widget.remove(widget)
+        self.items = [item for item in self.items if item.widget is not widget]
+        self._arranged = None
+
+    def widgets(self):
+        '''Return a list of the widgets in the layout (including nested layouts).'''
+        result = []
+        for item in self.items:
+            if isinstance(item.widget, Layout):
+                result.extend(item.widget.widgets())
+            else:
+                result.append(item.widget)
+        return result
+
+    def _adopt(self, container):
+        '''Make the layout's widgets children of container, if they aren't.'''
+        self.container = container
+        self._arranged = None
+        for item in self.items:
+            if isinstance(item.widget, Layout):
+                item.widget._adopt(container)
+            elif not container.children.has(item.widget):
+                container.add_widgets(item.widget)
+
+    def _top_inset(self, container):
+        titlebar = getattr(container, 'titlebar', None)
+        if (titlebar is not None) and container.children.has(titlebar):
+            return titlebar.rect.height
+        return 0
+
+    def content_size(self, container):
+        '''Return the size the widgets need, including the padding.'''
+        prefs = tuple([item.preferred_size(container) for item in self.items])
+        if prefs != self._measured[0]:
+            (w, h) = self._measure(prefs)
+            (left, top, right, bottom) = self.padding
+            self._measured = (prefs, (w + left + right, h + top + bottom))
+        return self._measured[1]
+
+    def measure(self, container):
+        '''Return the size the container needs, to fit its widgets.'''
+        (w, h) = self.content_size(container)
+        return (max(w, getattr(container, 'min_width', 0)),
+                max(h + self._top_inset(container), getattr(container, 'min_height', 0)))
+
+    def arrange(self, container):
+        '''Position and size the container's widgets (and, if self.fit, the
+        container), unless nothing they depend on has changed since the
+        last time.  This is called by the container's .update().
+        '''
+        global changed
+        if self.container is not container:
+            self._adopt(container)
+        if self.fit:
+            size = self.measure(container)
+            if tuple(container.rect.size) != size:
+                container.rect.size = size
+                container.relative_rect.size = size
+        else:
+            self.content_size(container)
+        inset = self._top_inset(container)
+        key = (self._measured[0], tuple(container.rect.size), inset)
+        if key == self._arranged:
+            return
+        self._arranged = key
+        self.place(container, Rect(0, inset, container.rect.width, container.rect.height - inset))
+        changed = True
+
+    def place(self, container, rect):
+        '''Lay out the widgets within rect (which is relative to container).'''
+        (left, top, right, bottom) = self.padding
+        area = Rect(rect.left + left, rect.top + top,
+                    rect.width - left - right, rect.height - top - bottom)
+        prefs = self._measured[0]
+        if prefs is None:
+            self.content_size(container)
+            prefs = self._measured[0]
+        for (item, slot, pref) in zip(self.items, self._slots(prefs, area), prefs):
+            item.place(container, _align_in(slot, pref, item.align or self.align))
+
+
+class Box(Layout):
+    '''A layout which arranges widgets in a column (or in a row, if
+    horizontal=True), in the order they were added.
+
+    Each widget gets as much room along the box as it prefers (plus its
+    share of any extra room, according to its stretch; see LayoutItem), and
+    as much room across the box as the widest (or tallest) widget.
+
+    If homogeneous=True, then every widget gets the same amount of room
+    along the box (give or take a pixel, so that all the room is used), e.g.,
+    for a row of evenly spaced buttons.
+
+    See Layout for the other parameters.
+    '''
+    def __init__(self, horizontal=False, padding=0, spacing=0, align='fill',
+                 fit=True, homogeneous=False):
+        Layout.__init__(self, padding=padding, spacing=spacing, align=align, fit=fit)
+        self.horizontal = horizontal
+        self.homogeneous = homogeneous
+
+    def _measure(self, prefs):
+        if not prefs:
+            return (0, 0)
+        (along, across) = (0, 1) if self.horizontal else (1, 0)
+        if self.homogeneous:
+            length = len(prefs) * max([pref[along] for pref in prefs])
+        else:
+            length = sum([pref[along] for pref in prefs])
+        length += self.spacing[along] * (len(prefs) - 1)
+        breadth = max([pref[across] for pref in prefs])
+        if self.horizontal:
+            return (length, breadth)
+        return (breadth, length)
+
+    def _slots(self, prefs, area):
+        n = len(prefs)
+        if not n:
+            return []
+        along = 0 if self.horizontal else 1
+        gap = self.spacing[along]
+        room = area[along+2] - (gap * (n - 1))
+        if self.homogeneous:
+            sizes = [room // n] * n
+            _share_out(sizes, room - sum(sizes), [1] * n, [None] * n)
+        else:
+            sizes = [pref[along] for pref in prefs]
+            limits = [(item.max_size or (None, None))[along] for item in self.items]
+            _share_out(sizes, room - sum(sizes), [item.stretch for item in self.items], limits)
+        slots = []
+        pos = area[along]
+        for size in sizes:
+            slot = Rect(area)
+            slot[along] = pos
+            slot[along+2] = size
+            slots.append(slot)
+            pos += size + gap
+        return slots
+
+
+class Grid(Layout):
+    '''A layout which arranges widgets in a grid with the specified number
+    of columns.  Widgets fill the cells row by row, in the order they were
+    added, unless they're added with cell=(row, column).
+
+    Each column is as wide as its widest widget, and each row is as tall as
+    its tallest widget.  If there's extra room (see fit, in Layout), it's
+    shared out among the columns and rows in proportion to col_stretch and
+    row_stretch (lists of stretch factors, one per column or row; missing
+    ones are 0).
+
+    See Layout for the other parameters.
+    '''
+    def __init__(self, columns=2, padding=0, spacing=0, align='fill', fit=True,
+                 col_stretch=None, row_stretch=None):
+        Layout.__init__(self, padding=padding, spacing=spacing, align=align, fit=fit)
+        self.columns = columns
+        self.col_stretch = col_stretch or []
+        self.row_stretch = row_stretch or []
+
+    def add(self, widget, stretch=0, min_size=None, max_size=None, align=None, cell=None):
+        if cell is None:
+            n = len(self.items)
+            cell = (n // self.columns, n % self.columns)
+        return Layout.add(self, widget, stretch, min_size, max_size, align, cell=cell)
+
+    def _tracks(self, prefs):
+        '''Return lists of the column widths and row heights the widgets need.'''
+        widths = [0] * self.columns
+        heights = [0] * (1 + max([item.cell[0] for item in self.items] + [-1]))
+        for (item, pref) in zip(self.items, prefs):
+            (row, col) = item.cell
+            widths[col] = max(widths[col], pref[0])
+            heights[row] = max(heights[row], pref[1])
+        return (widths, heights)
+
+    def _measure(self, prefs):
+        (widths, heights) = self._tracks(prefs)
+        return (sum(widths) + self.spacing[0] * max(0, len(widths) - 1),
+                sum(heights) + self.spacing[1] * max(0, len(heights) - 1))
+
+    def _slots(self, prefs, area):
+        (widths, heights) = self._tracks(prefs)
+        for (sizes, room, stretch, gap) in ((widths, area.width, self.col_stretch, self.spacing[0]),
+                                            (heights, area.height, self.row_stretch, self.spacing[1])):
+            stretches = [(stretch[i] if i < len(stretch) else 0) for i in range(len(sizes))]
+            extra = room - sum(sizes) - gap * max(0, len(sizes) - 1)
+            _share_out(sizes, extra, stretches, [None] * len(sizes))
+        lefts = [area.left + sum(widths[:col]) + self.spacing[0] * col for col in range(len(widths))]
+        tops = [area.top + sum(heights[:row]) + self.spacing[1] * row for row in range(len(heights))]
+        return [Rect(lefts[col], tops[row], widths[col], heights[row])
+                for (row, col) in [item.cell for item in self.items]]
+
+#--------------[ End code for laying out child widgets ]--------------
+
+
 class BasicForm(Widget):
     '''General-purpose container class in which multiple widgets are displayed
     within a widget "form."  To use it, first create the individual widgets,
@@ -1988,9 +4608,19 @@ class BasicForm(Widget):
     BasicForm widgets don't generate any pygame events (though the widgets which
     they contain might do so).  Consequently, use of the Id= parameter to name
     your forms is optional.
+
+    If you specify use_subsurfaces=True (or set form.use_subsurfaces=True
+    later, e.g., on a Form or DialogBox), then child widgets with opaque
+    background colors which don't overlap each other render directly into
+    subsurfaces of the form's image, rather than into images of their own
+    which are then copied into the form's image.  That saves a copy of each
+    pixel at each level of nested forms.  The form must have an opaque
+    background, too.  Note that such a child widget's .image is then a
+    subsurface of its parent's image, which is replaced whenever either of
+    them is moved or resized.
     '''
     def __init__(self, rect=(0,0,0,0), bgcolor=(240,240,255), boxcolors=None,
-                 Id='aForm', draggable=False, thick=1):
+                 Id='aForm', draggable=False, thick=1, use_subsurfaces=False):
         Widget.__init__(self)
         self.titlebar = None
         self.Id = Id
@@ -2004,12 +4634,36 @@ class BasicForm(Widget):
         self._make_image_surface(self.rect.size, transparent=not self.bgcolor)
         self.boxcolors = boxcolors
         self.thick=thick
+        self.use_subsurfaces = use_subsurfaces
 
     def update(self):
-        self._fill_bg()  # fill in the background color
-        # send .update() to each child widget, then blit each child widget onto
-        # the form's image.  Then, if there's a boxcolor, draw the box.
-        Widget.update(self)
+        '''Send .update() to each child widget, then blit each child widget
+        onto the form's image.  Then, if there's a boxcolor, draw the box.
+
+        The form's image is kept between updates as a composite of its child
+        widgets, so if the form's own appearance hasn't changed then only the
+        areas of child widgets which have changed (image or position) since
+        the last update are redrawn.  (See Widget._compose_children.)
+        '''
+        global changed
+        if self.layout is not None:
+            self._position_from_parent()
+            self.layout.arrange(self)
+        appearance = ( self.image, tuple(self.rect.size), _hashable(self.bgcolor),
+                       _hashable(getattr(self, 'boxcolors', None)),
+                       getattr(self, 'thick', 1), self.resizeable == 'byMouse' )
+        if (not compose_incrementally) or (appearance != self._composed_appearance):
+            self._fill_bg()  # fill in the background color
+            Widget.update(self)
+        else:
+            self._position_from_parent()
+            if self._compose_children(full=False):
+                self._draw_chrome()
+                self.image_version += 1
+            changed = True
+        self._composed_appearance = ( self.image, tuple(self.rect.size), _hashable(self.bgcolor),
+                                      _hashable(getattr(self, 'boxcolors', None)),
+                                      getattr(self, 'thick', 1), self.resizeable == 'byMouse' )
 
 
 class InputBox(BasicForm):
@@ -2021,7 +4675,7 @@ class InputBox(BasicForm):
                  bgcolor=(240,240,255), question='Question:',
                  answer='Type answer here & press [Enter]',
                  boxcolors=BLACK, Id='InputBox'):
-        q = Label(text=question, color=color, pos=(10,10), Id='Q.'+Id)
+        q = Label(text=question, color=color, Id='Q.'+Id)
         if width:
             w = width
         else:
@@ -2033,9 +4687,11 @@ class InputBox(BasicForm):
         elif w > 600:
             w = 600
         h = 60
-        a = TextEditBox(text=answer, pos=(10,30), maxlen=maxlen, width=w, bgcolor=(255,240,240), Id=Id)
+        a = TextEditBox(text=answer, maxlen=maxlen, width=w, bgcolor=(255,240,240), Id=Id)
         BasicForm.__init__(self, rect=(pos,((w+20),h)), bgcolor=bgcolor, boxcolors=boxcolors, Id='wrapperform.'+Id)
-        self.add_widgets(q, a)
+        box = self.set_layout(Box(padding=10, spacing=5, align='start', fit=False))
+        box.add(q)
+        box.add(a)
 
 
 class Titlebar(BasicForm):
@@ -2050,10 +4706,13 @@ class Titlebar(BasicForm):
 
     If there's a close button, its id (which is sent with its click events)
     is the titlebar's id with "close." prefixed.
+
+    use_glyph_atlas=True draws the caption from a glyph atlas (see Label).
     '''
-    def __init__(self, title='', width=100, Id='titlebar', draggable=True, closeable=True):
+    def __init__(self, title='', width=100, Id='titlebar', draggable=True, closeable=True,
+                 use_glyph_atlas=False):
         tt_id = 'text.' + Id
-        titletext = Label(title, Id=tt_id)
+        titletext = Label(title, Id=tt_id, use_glyph_atlas=use_glyph_atlas)
         BasicForm.__init__(self, rect=(0,0,width,TB_HEIGHT_21), bgcolor=(215,215,245),
                            Id=Id, draggable=draggable)
         if draggable:
@@ -2093,6 +4752,20 @@ class Titlebar(BasicForm):
                 self.relative_rect.top = 0
         BasicForm.update(self)
 
+    def move(self, amt):
+        '''When the title bar is dragged, it normally moves by itself, and then
+        .update() moves its parent form to follow it.  But if the form is a
+        top-level widget (and freeze_dragged_widgets is True), then the form
+        is moved right away, and frozen until the drag ends (see
+        Widget._freeze), so that it doesn't have to be updated at all.
+        '''
+        parent = self.parent
+        if freeze_dragged_widgets and self.dragging and (parent is not None) and (parent.parent is None):
+            parent._freeze()
+            parent.move(amt)
+        else:
+            BasicForm.move(self, amt)
+
     def set_caption(self, title):
         titletext = self.children.sprites()[0]
         titletext.set_text(title)
@@ -2151,8 +4824,9 @@ class SliderButton(SimpleButton):
     '''A SliderButton is a special button, which can be dragged either
     horizontally or vertically (but not both).  Clicking it doesn't actually
     do anything except change the 3D effect to show that it is being dragged,
-    but dragging it generates repeated click events.  It is for use by a
-    ScrollBar widget, of which it must be a child widget.
+    but dragging it tells the parent ScrollBar that its value changed (by
+    calling its .value_changed method).  It is for use by a ScrollBar widget,
+    of which it must be a child widget.
        Its initializer has two additional parameters: horizontal (boolean),
     and px_range (integer).  px_range is the number of pixels that the
     button can slide: the length of the "track" on which it slides, minus
@@ -2179,6 +4853,15 @@ class SliderButton(SimpleButton):
         # SliderButton instance
         self.accumulate_amt_moved = 0
 
+    def _slid(self, final=False):
+        '''Tell the parent ScrollBar that the slider was dragged.  (Its event
+        policy decides whether and when the application hears about it.)
+        '''
+        if hasattr(self.parent, 'value_changed'):
+            self.parent.value_changed(final=final)
+        elif not final:
+            self.click()  # slider buttons don't generate clicks except when dragged
+
     def notify(self, ev):
         '''Receive notification of a pygame event, and do something if it is
         for this slider.
@@ -2188,6 +4871,8 @@ class SliderButton(SimpleButton):
             if self.isdown and not ev.buttons[0]:
                 # button isn't down, so button-release was missed
                 self.isdown = False
+                if self.slider_dragging:
+                    self._slid(final=True)
                 self.slider_dragging = False
             if self.isdown:
                 # dragging!
@@ -2258,10 +4943,10 @@ class SliderButton(SimpleButton):
                         self.set_bgcolor(self.color_up)  # render the up-state non-hovering button image
                         self._3D_up()
                         self.hasmousefocus = False
-            if (self.accumulate_amt_moved != 0) and not pygame.event.peek(MOUSEMOTION):
+            if self.accumulate_amt_moved != 0:
                 self.accumulate_amt_moved = 0
-                # print("dbg: slider-click, parent.value=" + repr(self.parent.value))
-                self.click()  # slider buttons don't generate clicks except when dragged
+                # print("dbg: slider-moved, parent.value=" + repr(self.parent.value))
+                self._slid()
             # MOUSEMOTION events can affect more than one widget, so return rc=False
 
         elif (ev.type == MOUSEBUTTONDOWN) and (ev.button == MOUSEBUTTONLEFT) and self.top_collidepoint(ev.pos):
@@ -2281,11 +4966,8 @@ class SliderButton(SimpleButton):
             if self.isdown:
                 self.isdown = False
                 if self.slider_dragging:
-                    if self.accumulate_amt_moved:
-                        # this doesn't happen often, but it's possible if user gets wild with the mouse
-                        self.accumulate_amt_moved = 0
-                        self.click()  # slider buttons don't generate clicks except when dragged
-                        # print("dbg: slider-click generated on mousebuttonup")
+                    self.accumulate_amt_moved = 0
+                    self._slid(final=True)
                     self.slider_dragging = False
             if self.top_collidepoint(ev.pos):
                 self.hasmousefocus = True
@@ -2296,6 +4978,101 @@ class SliderButton(SimpleButton):
         return rc
 
 
+class RepeatButton(SimpleButton):
+    '''A RepeatButton is a special button, for use by a ScrollBar widget, of
+    which it must be a child widget.  (The ScrollBar uses them for its arrow
+    buttons and for the trough on either side of the slider.)
+       Unlike a SimpleButton, which clicks once when the mouse button is
+    released, a RepeatButton "clicks" as soon as it is pressed, and then keeps
+    on clicking for as long as it is held down, faster and faster, according
+    to the parent ScrollBar's auto-repeat settings (see
+    ScrollBar.set_autorepeat).  While the mouse pointer is moved off the
+    button, the clicks pause.
+       The repeats are driven by timers (see start_timer), not by the event
+    queue, and the "clicks" are delivered by calling the parent ScrollBar's
+    .step() method directly, rather than by posting pygame events.
+    '''
+    def __init__(self, text='', padding=0, image=None, pos=(0,0), border=0,
+                 color=BLACK, bgcolor=None, size=None, pic_pos=(0,0),
+                 Id='repeatbutton', three_D=False, internal=True):
+        SimpleButton.__init__(self, text=text, padding=padding, image=image,
+                 pos=pos, border=border, color=color, bgcolor=bgcolor,
+                 size=size, pic_pos=pic_pos, Id=Id, three_D=three_D,
+                 internal=internal)
+        self.held = False  # True while the mouse button is held down on this button
+        self.mouse_pos = None  # latest known mouse position, while held
+        self.repeat_interval = SB_REPEAT_INTERVAL  # current (accelerating) interval
+
+    def on_timer(self, now):
+        '''Called when our timer is due: click again (unless the mouse pointer
+        has wandered off), and restart the timer, with a shorter interval.
+        '''
+        sb = self.parent
+        if self.held and (sb is not None):
+            if self.rect.collidepoint(self.mouse_pos):
+                sb.step(self)
+            self.repeat_interval = max( sb.repeat_min_interval,
+                                        int(self.repeat_interval * sb.repeat_accel) )
+            start_timer(self, self.repeat_interval)
+
+    def _release(self):
+        '''Stop auto-repeating.'''
+        self.held = False
+        stop_timer(self)
+        if self.parent is not None:
+            self.parent.value_changed(final=True)
+
+    def notify_of_pending_removal(self, group):
+        '''Stop auto-repeating if we're removed while being held down.'''
+        if self.held:
+            self._release()
+        SimpleButton.notify_of_pending_removal(self, group)
+
+    def notify(self, ev):
+        '''Receive notification of a pygame event, and do something if it is
+        for this button.
+        '''
+        rc = False
+        if (ev.type == MOUSEBUTTONDOWN) and (ev.button == MOUSEBUTTONLEFT) and self.top_collidepoint(ev.pos):
+            self.set_bgcolor(self.color_dn)  # render the down-state button image
+            self._3D_dn()
+            self.isdown = True
+            self.hasmousefocus = True
+            self.held = True
+            self.mouse_pos = ev.pos
+            # send internal-use-only widget event to tell text-entry widgets that they've lost keyboard focus
+            tmpev = pygame.event.Event( WIDGETEVENT, {'Id':'KBDFOCUS', 'sender':self, 'internal':True} )
+            notify_all_widgets(tmpev)
+            sb = self.parent
+            sb.step(self)  # first click happens immediately
+            if sb.repeat_delay:
+                self.repeat_interval = sb.repeat_interval
+                start_timer(self, sb.repeat_delay)
+            rc = True  # no other widgets need to receive this event
+            Widget.notify(self, ev)  # for mouse cursor handling
+        elif (ev.type == MOUSEBUTTONUP) and (ev.button == MOUSEBUTTONLEFT):
+            if self.held:
+                self._release()
+                self.isdown = False
+                if self.top_collidepoint(ev.pos):
+                    self.set_bgcolor(self.color_hover)  # render the up-state hovering button image
+                else:
+                    self.set_bgcolor(self.color_up)  # render the up-state non-hovering button image
+                    self.hasmousefocus = False
+                self._3D_up()
+                rc = True  # no other widgets need to receive this event
+            Widget.notify(self, ev)  # for mouse cursor handling
+        else:
+            if ev.type == MOUSEMOTION:
+                if self.held:
+                    if not ev.buttons[0]:
+                        # button isn't down, so button-release was missed
+                        self._release()
+                    self.mouse_pos = ev.pos
+            SimpleButton.notify(self, ev)  # hover effects, mouse cursor handling
+        return rc
+
+
 class ScrollBar(BasicForm):
     '''A horizontal or vertical scroll bar widget.
 
@@ -2320,13 +5097,31 @@ class ScrollBar(BasicForm):
 
     Specify the length of the scroll bar by the size= parameter.
 
+    Holding down one of the little arrows, or the space between the slider
+    and an arrow, scrolls repeatedly, faster and faster; call set_autorepeat()
+    to change how it does that.
+
     The ScrollBar widget tells the application when the user changes .value,
-    by generating a pygame event.
+    by generating a pygame event (and by calling the on_change= function, if
+    you pass one).  No matter how fast .value changes, at most
+    one such event is generated per frame (the latest value wins); call
+    set_event_policy() to thin them out further, or to get an event with the
+    final value when the user lets go.  A change which can't be reported
+    right away is reported at the start of the next frame (from
+    WidgetGroup.update or .draw), or when the policy's interval is up (when
+    timers are serviced), even if no more events arrive.  So, unlike the
+    other widgets' callbacks, on_change isn't always called from within
+    notify.
+
+    Pass internal=True for a scroll bar which is part of another widget (like
+    a scrolling Menu); then its value-change events are internal events, so
+    they aren't taken as results (e.g., by modal_popup).
     '''
     def __init__(self, value=0.0, min_val=0.0, max_val=100.0, horizontal=False,
-                 small_inc=5.0, large_inc=25.0, size=250, pos=(0,0), Id='scrollbar'):
-        if size < 42:
-            size = 42  # minimum length of a scroll bar
+                 small_inc=5.0, large_inc=25.0, size=250, pos=(0,0), Id='scrollbar',
+                 on_change=None, internal=False):
+        if size < SB_MIN_LENGTH_42:
+            size = SB_MIN_LENGTH_42  # minimum length of a scroll bar
         if horizontal:
             rect = pygame.Rect(pos, (size,17))
         else:
@@ -2344,37 +5139,44 @@ class ScrollBar(BasicForm):
         self.horizontal = horizontal
         self.use_this_mouse_cursor = default_mouse_cursor
         self.value_to_pixel_ratio = 1.0  # this gets fixed by .update()
+        self.on_change = on_change
+        self.internal = internal
+        self.posted_in_frame = None  # frame_counter when we last posted a value-change event
+        self.posted_at = 0  # clock() when we last posted a value-change event
+        self.final_value = self.value  # the value reported by the last final event
+        self.set_autorepeat()
+        self.set_event_policy()
         # a scrollbar consists of 5 buttons: a slider (b3), end arrows (b1 & b5), and the gaps between (b2 & b4)
         if horizontal:
-            b1 = SimpleButton(image=scroll_left, pos=(SB_BORDER_1,SB_BORDER_1), size=(SB_ARROWSIZE_10,SB_CHANNEL_WIDTH_15),
+            b1 = RepeatButton(image=scroll_left, pos=(SB_BORDER_1,SB_BORDER_1), size=(SB_ARROWSIZE_10,SB_CHANNEL_WIDTH_15),
                               pic_pos=(3,4), Id='dec.'+self.Id,
                               border=0, internal=True)
-            b2 = SimpleButton(bgcolor=bgcolor, pos=(SB_ENDCAPSIZE_11,SB_BORDER_1), size=(1,SB_CHANNEL_WIDTH_15),
+            b2 = RepeatButton(bgcolor=bgcolor, pos=(SB_ENDCAPSIZE_11,SB_BORDER_1), size=(1,SB_CHANNEL_WIDTH_15),
                               Id='big_dec.'+self.Id,
                               border=0, internal=True)
             b3 = SliderButton(image=scroll_horizontal, pos=(12,SB_BORDER_1), size=(SB_CHANNEL_WIDTH_15,SB_CHANNEL_WIDTH_15),
                               pic_pos=(3,4), Id='slider.'+self.Id, three_D=True,
                               border=0, internal=True, horizontal=True)
-            b4 = SimpleButton(bgcolor=bgcolor, pos=(29,SB_BORDER_1), size=(1,SB_CHANNEL_WIDTH_15),
+            b4 = RepeatButton(bgcolor=bgcolor, pos=(29,SB_BORDER_1), size=(1,SB_CHANNEL_WIDTH_15),
                               Id='big_inc.'+self.Id,
                               border=0, internal=True)
-            b5 = SimpleButton(image=scroll_right, pos=(rect.width-SB_ENDCAPSIZE_11,SB_BORDER_1), size=(SB_ARROWSIZE_10,SB_CHANNEL_WIDTH_15),
+            b5 = RepeatButton(image=scroll_right, pos=(rect.width-SB_ENDCAPSIZE_11,SB_BORDER_1), size=(SB_ARROWSIZE_10,SB_CHANNEL_WIDTH_15),
                               pic_pos=(3,4), Id='inc.'+self.Id,
                               border=0, internal=True)
         else:
-            b1 = SimpleButton(image=scroll_up, pos=(SB_BORDER_1,SB_BORDER_1), size=(SB_CHANNEL_WIDTH_15,SB_ARROWSIZE_10),
+            b1 = RepeatButton(image=scroll_up, pos=(SB_BORDER_1,SB_BORDER_1), size=(SB_CHANNEL_WIDTH_15,SB_ARROWSIZE_10),
                               pic_pos=(4,3), Id='dec.'+self.Id,
                               border=0, internal=True)
-            b2 = SimpleButton(bgcolor=bgcolor, pos=(SB_BORDER_1,SB_ENDCAPSIZE_11), size=(SB_CHANNEL_WIDTH_15,1),
+            b2 = RepeatButton(bgcolor=bgcolor, pos=(SB_BORDER_1,SB_ENDCAPSIZE_11), size=(SB_CHANNEL_WIDTH_15,1),
                               Id='big_dec.'+self.Id,
                               border=0, internal=True)
             b3 = SliderButton(image=scroll_vertical, pos=(SB_BORDER_1,12), size=(SB_CHANNEL_WIDTH_15,SB_CHANNEL_WIDTH_15),
                               pic_pos=(4,3), Id='slider.'+self.Id, three_D=True,
                               border=0, internal=True, horizontal=False)
-            b4 = SimpleButton(bgcolor=bgcolor, pos=(SB_BORDER_1,29), size=(SB_CHANNEL_WIDTH_15,1),
+            b4 = RepeatButton(bgcolor=bgcolor, pos=(SB_BORDER_1,29), size=(SB_CHANNEL_WIDTH_15,1),
                               Id='big_inc.'+self.Id,
                               border=0, internal=True)
-            b5 = SimpleButton(image=scroll_down, pos=(SB_BORDER_1,rect.height-SB_ENDCAPSIZE_11), size=(SB_CHANNEL_WIDTH_15,SB_ARROWSIZE_10),
+            b5 = RepeatButton(image=scroll_down, pos=(SB_BORDER_1,rect.height-SB_ENDCAPSIZE_11), size=(SB_CHANNEL_WIDTH_15,SB_ARROWSIZE_10),
                               pic_pos=(4,3), Id='inc.'+self.Id,
                               border=0, internal=True)
         b3.set_boxcolors( color=((210,210,220),(110,110,120)) )  # 3D border colors for slider
@@ -2382,35 +5184,137 @@ class ScrollBar(BasicForm):
         self.add_widgets(b1,b2,b3,b4,b5)
         self.update()
 
+    def set_autorepeat(self, delay=SB_REPEAT_DELAY, interval=SB_REPEAT_INTERVAL,
+                       accel=SB_REPEAT_ACCEL, min_interval=SB_REPEAT_MIN_INTERVAL):
+        '''Set the auto-repeat behavior of the arrow and trough buttons.
+
+        When one of them is held down, it scrolls once immediately, then again
+        after delay milliseconds, then every interval milliseconds.  After each
+        repeat the interval is multiplied by accel (so accel < 1.0 means it
+        speeds up), but it never gets shorter than min_interval.
+
+        Pass delay=0 to disable auto-repeat (one scroll per click).
+        '''
+        self.repeat_delay = delay
+        self.repeat_interval = interval
+        self.repeat_accel = accel
+        self.repeat_min_interval = min_interval
+
+    def step(self, button):
+        '''Adjust .value as for one click of button, which is one of the arrow
+        or trough buttons.  (Called by the RepeatButtons.)
+        '''
+        btns = self.children.sprites()
+        if button is btns[0]:
+            self.value = max( self.value-self.small_inc, self.min_val )
+        elif button is btns[1]:
+            self.value = max( self.value-self.large_inc, self.min_val )
+        elif button is btns[3]:
+            self.value = min( self.value+self.large_inc, self.max_val )
+        elif button is btns[4]:
+            self.value = min( self.value+self.small_inc, self.max_val )
+        self.value_changed()
+
+    def set_event_policy(self, policy='frame', min_interval=0, min_delta=0.0,
+                         final_event=False):
+        '''Choose how often the scroll bar tells the application (by posting
+        a WIDGETEVENT) that its .value has changed.  The policy can be:
+
+            'frame'  -- at most once per frame, with the latest value (default)
+
+            'interval'  -- like 'frame', but also at least min_interval
+                milliseconds apart
+
+            'delta'  -- like 'frame', but only when the value has changed by
+                at least min_delta since the last event
+
+            'release'  -- only once, when the user releases the slider or the
+                arrow/trough button (implies final_event=True)
+
+        If final_event is True, then when the user releases the slider or an
+        arrow/trough button, one more event is posted with the final value,
+        unless that value was already reported by an earlier final event.
+
+        Every value-change event has a .final attribute, which is True for
+        these final events, and False for the others.
+        '''
+        assert policy in ('frame', 'interval', 'delta', 'release')
+        self.event_policy = policy
+        self.min_interval = min_interval
+        self.min_delta = min_delta
+        self.final_event = final_event or (policy == 'release')
+
+    def value_changed(self, final=False):
+        '''Tell the application that the user moved the scroll bar (if the
+        value has changed), subject to the event policy (see
+        set_event_policy).  Changes which can't be reported yet are deferred,
+        and by the time they are reported only the latest value matters.
+
+        final=True means that the user just let go of the slider or of an
+        arrow/trough button.
+        '''
+        if final:
+            stop_timer(self)
+            if self in deferred_widgets:
+                deferred_widgets.remove(self)
+            if self.final_event:
+                if self.value != self.final_value:
+                    self._post_value(final=True)
+            elif self.value != self.prev_value:
+                # don't leave a value unreported just because of the policy
+                self._post_value()
+        elif (self.value != self.prev_value) and (self.event_policy != 'release'):
+            now = clock()
+            if ( (self.event_policy == 'delta') and
+                 (abs(self.value - self.prev_value) < self.min_delta) ):
+                pass  # not enough change to bother the application with
+            elif ( (self.event_policy == 'interval') and
+                   ((now - self.posted_at) < self.min_interval) ):
+                start_timer(self, self.min_interval - (now - self.posted_at))
+            elif self.posted_in_frame == frame_counter:
+                run_at_next_frame(self)
+            else:
+                self._post_value()
+
+    def _post_value(self, final=False):
+        '''Post the value-change event.'''
+        self.posted_in_frame = frame_counter
+        self.posted_at = clock()
+        self.prev_value = self.value
+        if final:
+            self.final_value = self.value
+        ev2 = pygame.event.Event( WIDGETEVENT, {'Id':self.Id, 'value':self.value, 'final':final,
+                                                'sender':self, 'internal':self.internal} )
+        deliver_event(self, ev2, self.on_change)
+
+    def on_new_frame(self):
+        '''Report any value change which value_changed() deferred.'''
+        self.value_changed()
+
+    def on_timer(self, now):
+        '''Report any value change which value_changed() deferred.'''
+        self.value_changed()
+
     def notify(self, ev):
         rc = False
         if (ev.type == WIDGETEVENT) and ev.internal:
             btns = self.children.sprites()
             if (ev.Id != 'KBDFOCUS') and (ev.sender in btns):
                 # it was our button!
-                if ev.sender == btns[0]:
-                    self.value = max( self.value-self.small_inc, self.min_val )
-                elif ev.sender == btns[1]:
-                    self.value = max( self.value-self.large_inc, self.min_val )
-                elif ev.sender == btns[2]:
+                if ev.sender == btns[2]:
                     # slider slid
                     self.value = max( min(self.value, self.max_val), self.min_val )
-                elif ev.sender == btns[3]:
-                    self.value = min( self.value+self.large_inc, self.max_val )
-                elif ev.sender == btns[4]:
-                    self.value = min( self.value+self.small_inc, self.max_val )
+                    self.value_changed(final=True)
+                else:
+                    # somebody clicked an arrow or trough button programmatically
+                    self.step(ev.sender)
+                    self.value_changed(final=True)
                 rc = True
-        if rc and (self.value != self.prev_value):
-            # tell the application that the user moved the scroll bar
-            ev2 = pygame.event.Event( WIDGETEVENT, {'Id':self.Id, 'value':self.value, 'sender':self, 'internal':False} )
-            self.prev_value = self.value
-            pygame.event.post(ev2)
-        elif not rc:
+        if not rc:
             rc = BasicForm.notify(self, ev)
         return rc
 
     def update(self, by_dragging=False):
-        self._fill_bg()
         # ensure that min_val < max_val, and min_val <= value <= max_val
         self.value = float(self.value)
         if self.max_val <= self.min_val:
@@ -2482,15 +5386,20 @@ class ScrollBar(BasicForm):
                 b4.rect.height = px_size - SB_ENDCAPSIZE_11 - b4.relative_rect.top
                 b5.relative_rect.top = px_size - SB_ENDCAPSIZE_11  # in case of resize
             BasicForm.update(self)
+        else:
+            self._fill_bg()
 
 
-def wrap_in_titlebar(widget, title='', Id=None, draggable=True, closeable=True, resizeable=None):
+def wrap_in_titlebar(widget, title='', Id=None, draggable=True, closeable=True, resizeable=None,
+                     use_glyph_atlas=False):
     '''Use a BasicForm to wrap another widget, to add a Title Bar.
     The resulting form has two children:
     [0] = the title bar, which, in turn, has one or two children:
        [0] = the caption text
        [1] = the close button (optional)
     [1] = the widget
+
+    use_glyph_atlas=True draws the caption from a glyph atlas (see Label).
     '''
     widget.update()  # make sure widget's rect and relative_rect are consistent
     # create a new rect that is 21 pixels taller than widget's rect
@@ -2511,7 +5420,7 @@ def wrap_in_titlebar(widget, title='', Id=None, draggable=True, closeable=True,
     # shorter close button Id, I initially pass the widget ID without "title."
     # at the beginning, then change it.
     tb = Titlebar(title=title, width=widget.rect.width, Id=tb_id,
-                        draggable=draggable, closeable=closeable)
+                        draggable=draggable, closeable=closeable, use_glyph_atlas=use_glyph_atlas)
     if not Id:
         tb_id = 'title.' + widget.Id
         tb.Id = tb_id
@@ -2594,7 +5503,7 @@ class DialogBox(Form):
             w = width
         else:
             w = 600
-        m = Label(text=msg, color=color, pos=(10,10), Id='M.'+Id)
+        m = Label(text=msg, color=color, Id='M.'+Id)
 
         if w < (m.rect.width + 20):
             w = m.rect.width + 20
@@ -2604,18 +5513,24 @@ class DialogBox(Form):
             w = 600
         h = w // 2
         lbls = buttons.split('|')
+        btns = [Button(text=lbl, three_D=True, Id=lbl+'.'+Id) for lbl in lbls]
+
+        # the message goes below the titlebar, and the buttons go w//len(lbls)
+        # pixels apart across the form, with their tops halfway down the form
+        # (below the titlebar, and less the padding).  In a dialog box too
+        # small for that, the buttons go just below the message instead, and
+        # the dialog box is made tall enough for them.
+        gap = max(0, ((h-20) // 2) - 10 - m.rect.height)
+        h = max(h, TB_HEIGHT_21 + 10 + m.rect.height + gap + max([b.rect.height for b in btns]) + 10)
         Form.__init__(self, rect=(pos,((w+20),h)), bgcolor=bgcolor,
                       boxcolors=boxcolors, Id=Id, title=title,thick=2)
-
-        m.relative_rect.top = self.titlebar.rect.height + 10
-        self.add_widgets(m)
-        left = 10
-        top = self.titlebar.rect.height + ((h-20) // 2)
-
-        for lbl in lbls:
-            button = Button(text=lbl, pos=(left,top), three_D=True, Id=lbl+'.'+Id)
-            self.add_widgets(button)
-            left += (w // len(lbls))
+        box = self.set_layout(Box(padding=10, spacing=gap, align='start', fit=False))
+        box.add(m)
+        row = Box(horizontal=True, homogeneous=True, align='start')
+        for btn in btns:
+            row.add(btn)
+        width = (w // len(lbls)) * len(lbls)  # so that each button gets w//len(lbls)
+        box.add(row, min_size=(width, None), max_size=(width, None), align='start')
 
 
 def modal_popup(widget, bg_repaint=None):
@@ -0,0 +1,303 @@
+#!/usr/bin/python3
+'''
+GUIpygame_golden.py
+Golden-image regression checks for GUIpygame's rendering.
+
+This renders a set of canonical scenes headlessly (with the SDL "dummy"
+video driver), and compares each one, pixel by pixel, with a stored "golden"
+PNG image in the golden/ folder next to this file.  Any change to the way
+widgets are drawn (caching, dirty rectangles, etc.) which changes what ends
+up on the screen will show up as a mismatch.
+
+Usage:
+    python GUIpygame_golden.py              -- check all scenes
+    python GUIpygame_golden.py demo msgbox  -- check just those scenes
+    python GUIpygame_golden.py --update     -- (re)write the golden images
+    python GUIpygame_golden.py --list       -- list the scene names
+
+A pixel matches if none of its R, G, B values differs from the golden image
+by more than --tolerance (default 0); a scene passes if no more than
+--max-bad pixels (default 0) mismatch.  For each scene that fails, a diff
+"heatmap" is written to the --diffs folder (default golden_diffs): the
+rendered scene, dimmed, with mismatched pixels painted red (brighter red
+means a bigger difference).
+
+The comparison uses pygame.surfarray, so NumPy is required.  The exit status
+is 0 if every scene passed, 1 otherwise.
+'''
+
+# make Python 2.6 / 2.7 more compatible with Python 3
+from __future__ import print_function, division  # We require Python 2.6 or later
+
+
+import os
+import sys
+import time
+
+import GUIpygame_offscreen
+GUIpygame_offscreen.init_headless()  # this must happen before importing pygame
+
+import pygame
+from pygame.locals import *  #@UnusedWildImport
+import GUIpygame
+from GUIpygame import (WidgetGroup, Widget, Label, SimpleButton, Button,
+                       TextEditBox, Menu, Form, InputBox, wrap_in_border,
+                       MOUSEBUTTONLEFT)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+GOLDEN_DIR = GUIpygame.rel2me('golden')
+
+
+#-----------------------------[ The scenes ]-----------------------------
+# Each scene function returns (screen_size, list_of_groups, events), where
+# the groups are drawn in order onto an ivory background, and the events
+# (if any) are then fed to the last group before the scene is drawn again.
+
+def scene_demo():
+    '''The layout of demo.py, as it first appears.'''
+    scrsize = (800, 450)
+    vera_big = GUIpygame.get_font(None, 36)
+    vera_med = GUIpygame.get_font(None, 18)
+    line0 = Label( "This is a resizeable window", pos=(0,5), color=(0,0,220), font=vera_big)
+    line0.rect.centerx = scrsize[0] // 2
+    line1 = Label( "Right-click=pop-up menu,  [space]=save screenshot.jpg,  [Esc]=quit", pos=(0,line0.rect.bottom+5), color=(240,0,0) )
+    line1.set_text(line1.text, adjustwidth=True)
+    line1.rect.centerx = scrsize[0] // 2
+    mousepos = Label(repr((0,0)), pos=(line1.rect.left,line1.rect.bottom+5), color=(0,40,120))
+    mouseclick = Label(' '*20, pos=(line1.rect.left,mousepos.rect.bottom+5), color=(0,40,120), padding=2)
+    mouseclick.set_boxcolors((150,255,150))
+    line3 = Label( "(Here's where we'll show the results)", pos=(line1.rect.left,mouseclick.rect.bottom+5), color=(0,40,120), bgcolor=(255,240,100),font=vera_med )
+    sprite_group = pygame.sprite.Group( line0, line1, mousepos, mouseclick, line3 )
+
+    button1 = Button( 'Button#1', pos=(30,100) )
+    button1.set_border(4)
+    button1.draggable = True
+    button1 = wrap_in_border(button1, thick=3, color=(10,255,10))
+    button1 = wrap_in_border(button1, thick=3, color=(255,0,0))
+    button1 = wrap_in_border(button1, thick=4, color=(20,20,255), boxcolors=GUIpygame.BLACK)
+    button3 = Button( 'Button#3', pos=(5+button1.rect.right,100) )
+    button3.set_border(4)
+    button2 = Button( 'ShowMessagebox', pos=(30,135), three_D=True )
+    button2.set_border(4)
+    menuitem1 = SimpleButton('New')
+    menuitem2 = SimpleButton('Open')
+    menuitem3 = SimpleButton('Save')
+    menuitem3.set_colors(fg=(128,128,128))
+    menuitem4 = SimpleButton('Exit')
+    a4itemMenu = Menu(Id='a4itemMenu')
+    a4itemMenu.add_widgets(menuitem1, menuitem2, menuitem3, menuitem4)
+    a4itemMenu.rect.topleft = (60, 0)
+    junk = Widget()
+    junk.rect = pygame.Rect(0,0, 6,6)
+    junk.image = pygame.Surface((6,6))
+    apicture = pygame.image.load(GUIpygame.rel2me('GUIpygame.png'))
+    image1 = GUIpygame.Image(apicture, pos=(30,380), bgcolor=(0,255,100), padding=4)
+    textbox1 = TextEditBox( 'editable transparent', maxlen=30, width=180, pos=(30,165), Id='textbox1' )
+    textbox2 = TextEditBox( 'editable opaque', maxlen=30, width=180, pos=(30,190), bgcolor=(240,255,240), Id='textbox2' )
+    textbox2.set_boxcolors((225,225,225))
+    ckbox1 = GUIpygame.SimpleCheckbox(Id='ckbox1', pos=(30,210), checked=False)
+
+    form = GUIpygame.BasicForm( rect=((250,150),(340,230)), bgcolor=(255,240,240), boxcolors=(255,0,0), Id='bigform' )
+    form_l1 = Label('This is a form', pos=(1,5), color=(220,0,0))
+    form_l1.relative_rect.centerx = form.rect.width // 2
+    form_b1 = Button('Increment', pos=(50,55), three_D=True)
+    form_b1.set_border(6)
+    form_b2 = Button('Decrement', pos=(140,55), three_D=True)
+    form_b2.set_border(6)
+    form_b3 = Button('Double', pos=(230,55), three_D=True)
+    form_b3.set_border(6)
+    form_t1 = TextEditBox('edit me!', maxlen=30, width=200, pos=(60,90), bgcolor=(230,255,255), Id='textbox_in_form')
+    form_l2 = Label("Here's a Q&A (specialized form) within the form:", pos=(100,125))
+    form_l2.relative_rect.centerx = form.rect.width // 2
+    hbar = GUIpygame.ScrollBar(size=200, pos=(65,30), horizontal=True, min_val=0, max_val=100, Id='hbar')
+    hbar.slider_size = 25
+    qa = InputBox(question='How tall are you (in inches)?', answer='''5'10"''', Id='textbox_howtall')
+    qa.relative_rect.midtop = (form.rect.width//2, 140)
+    qa = GUIpygame.wrap_in_titlebar(qa, 'a title for the height question & answer', closeable=True, draggable=True, Id='textbox_howtall')
+    qa.resizeable = 'byMouse'
+    form.add_widgets(form_l1, form_b1, form_b2, form_b3, form_t1, form_l2, qa, hbar)
+    form2 = Form( rect=((600,150),(160,230+21)), bgcolor=(255,230,230), boxcolors=(0,0,255), Id='rightform', title='This is a non-basic form')
+    form2_b1 = Button('Draggable button', pos=(20,50+21), border=5, three_D=True)
+    ckbox2 = GUIpygame.Checkbox(Id='ckbox2', pos=(10,190), checked=False, text='Checkbox 2', bgcolor=(250,222,255), padding=10, boxcolors=(0,255,0))
+    form2.add_widgets(form2_b1,ckbox2)
+    form2.resizeable = 'byMouse'
+    form = GUIpygame.wrap_in_titlebar(form, 'a title for the form, which is very long so that I can see it get truncated', resizeable = 'byMouse')
+    vbar = GUIpygame.ScrollBar(size=100, pos=(100,240))
+    widget_group = WidgetGroup( button1, image1, button2, button3, junk, textbox1, textbox2, ckbox1, a4itemMenu, form, form2, vbar)
+    return scrsize, [sprite_group, widget_group], []
+
+def scene_msgbox():
+    '''A MsgBox's dialog box, centered, as MsgBox() shows it.'''
+    scrsize = (420, 260)
+    box = GUIpygame.DialogBox(width=100, msg='Click OK to close this draggable box', Id='MsgBox',
+                              title='message box title', buttons='OK|Close|Cancel')
+    box.rect.topleft = ( max(1, (scrsize[0]-box.rect.width) // 2),
+                         max(1, (scrsize[1]-box.rect.height) // 2) )
+    return scrsize, [WidgetGroup(box)], []
+
+def scene_nested_titlebars():
+    '''Forms within titlebar-wrapped forms, and a pop-up menu with a titlebar.'''
+    scrsize = (560, 360)
+    inner = InputBox(question='Inner question?', answer='inner answer', Id='inner')
+    inner.relative_rect.topleft = (10, 40)
+    inner = GUIpygame.wrap_in_titlebar(inner, 'inner wrapped InputBox', Id='inner_tb')
+    inner.resizeable = 'byMouse'
+    middle = GUIpygame.BasicForm(rect=((0,0),(320,200)), bgcolor=(230,255,230), boxcolors=(0,128,0), Id='middle')
+    middle.add_widgets(Label('middle form', pos=(5,5)), inner)
+    middle = GUIpygame.wrap_in_titlebar(middle, 'middle wrapped form', resizeable='byMouse')
+    outer = Form(rect=((10,10),(360,300)), bgcolor=(255,250,230), boxcolors=(0,0,0), Id='outer', title='outer Form', thick=2)
+    middle.relative_rect.topleft = (15, 40)
+    outer.add_widgets(middle)
+    menu = Menu.ActionMenu('create node|remove node|-disabled item|cancel')
+    tb_menu = GUIpygame.wrap_in_titlebar(menu, 'Pop-up menu', closeable=True, draggable=True, Id='popup_menu')
+    tb_menu.rect.topleft = (390, 40)
+    return scrsize, [WidgetGroup(outer, tb_menu)], []
+
+def scene_scrollbars():
+    '''Horizontal and vertical scroll bars, fixed and proportional sliders.'''
+    scrsize = (330, 260)
+    h1 = GUIpygame.ScrollBar(size=300, pos=(10,10), horizontal=True, Id='h1')
+    h2 = GUIpygame.ScrollBar(value=60, size=250, pos=(10,40), horizontal=True, Id='h2')
+    h2.slider_size = 25
+    h3 = GUIpygame.ScrollBar(value=100, size=42, pos=(10,70), horizontal=True, Id='h3')
+    v1 = GUIpygame.ScrollBar(size=150, pos=(10,100), Id='v1')
+    v2 = GUIpygame.ScrollBar(value=35, size=150, pos=(40,100), Id='v2')
+    v2.slider_size = 50
+    v3 = GUIpygame.ScrollBar(value=100, min_val=-50, max_val=150, size=100, pos=(70,100), Id='v3')
+    return scrsize, [WidgetGroup(h1, h2, h3, v1, v2, v3)], []
+
+def scene_interaction():
+    '''Widgets in their hover, pressed, checked, and keyboard-focus states.'''
+    scrsize = (360, 240)
+    form = GUIpygame.BasicForm(rect=((10,10),(330,210)), bgcolor=(240,240,255), boxcolors=(0,0,0), Id='iform')
+    b_press = Button('Pressed', pos=(10,10), three_D=True)
+    b_3D = Button('Plain 3D', pos=(90,10), three_D=True)
+    b_plain = Button('Plain', pos=(180,10))
+    tb = TextEditBox('focused text', maxlen=30, width=150, pos=(10,50), Id='tb')
+    ck = GUIpygame.Checkbox(Id='ck', pos=(10,80), text='Checked')
+    menu = Menu.ActionMenu('first|hovered|third', pos=(180,50))
+    form.add_widgets(b_press, b_3D, b_plain, tb, ck, menu)
+    group = WidgetGroup(form)
+    def at(widg, dx=4, dy=4):
+        form.update()
+        return (widg.rect.left + dx, widg.rect.top + dy)
+    def motion(pos):
+        return pygame.event.Event(MOUSEMOTION, {'pos':pos, 'rel':(0,0), 'buttons':(0,0,0)})
+    def button(typ, pos):
+        return pygame.event.Event(typ, {'pos':pos, 'button':MOUSEBUTTONLEFT})
+    hovered = menu.children.sprites()[1]
+    # (the order matters: pressing a button takes the keyboard focus away
+    # from text-edit boxes, and moving the mouse un-hovers other buttons)
+    events = [ button(MOUSEBUTTONDOWN, at(ck)), button(MOUSEBUTTONUP, at(ck)),
+               motion(at(hovered)),
+               button(MOUSEBUTTONDOWN, at(b_press)),
+               button(MOUSEBUTTONDOWN, at(tb, 40)) ]
+    return scrsize, [group], events
+
+scenes = [('demo', scene_demo), ('msgbox', scene_msgbox),
+          ('nested_titlebars', scene_nested_titlebars),
+          ('scrollbars', scene_scrollbars), ('interaction', scene_interaction)]
+
+
+#--------------------[ Rendering and comparing scenes ]--------------------
+
+def render_scene(scene_func):
+    '''Render a scene the way an application would: update and draw every
+    group, then (if the scene has events) feed them to the widgets and
+    update and draw again.  Returns the resulting surface.
+    '''
+    GUIpygame.screen_is_cleared()
+    scrsize, groups, events = scene_func()
+    surface = pygame.Surface(scrsize)
+    def draw():
+        surface.fill((255,255,230))  # off-white/ivory background, like demo.py
+        for group in groups:
+            group.update()
+            group.draw(surface)
+    draw()
+    if events:
+        for ev in events:
+            groups[-1].notify(ev)
+        pygame.event.clear()  # discard the result events the widgets posted
+        draw()
+    GUIpygame.done_drawing()
+    return surface
+
+def compare(surface, golden, tolerance=0):
+    '''Compare two surfaces.  Returns (number_of_mismatched_pixels,
+    largest_difference, heatmap_surface).  If the sizes differ, every pixel
+    counts as mismatched.
+    '''
+    a = pygame.surfarray.array3d(surface).astype(numpy.int16)
+    b = pygame.surfarray.array3d(golden).astype(numpy.int16)
+    if a.shape != b.shape:
+        return (a.shape[0] * a.shape[1], 255, surface.copy())
+    diff = numpy.abs(a - b).max(axis=2)  # per-pixel largest channel difference
+    bad = diff > tolerance
+    heat = (a // 3).astype(numpy.uint8)  # dimmed copy of the rendered scene
+    heat[bad] = 0
+    heat[..., 0][bad] = numpy.clip(128 + diff[bad], 0, 255).astype(numpy.uint8)
+    return (int(bad.sum()), int(diff.max()), pygame.surfarray.make_surface(heat))
+
+def run(names=None, update=False, tolerance=0, max_bad=0, diffdir='golden_diffs', verbose=True):
+    '''Render the scenes (all of them, or just those named), and either
+    compare them with the golden images or (if update=True) save them as the
+    new golden images.  Returns a list of the names of the scenes that
+    failed.
+    '''
+    if (numpy is None) and not update:
+        raise ImportError('NumPy is required to compare images')
+    failed = []
+    for (name, scene_func) in scenes:
+        if names and (name not in names):
+            continue
+        t0 = time.time()
+        surface = render_scene(scene_func)
+        ms = 1000 * (time.time() - t0)
+        fname = os.path.join(GOLDEN_DIR, name + '.png')
+        if update:
+            if not os.path.isdir(GOLDEN_DIR):
+                os.makedirs(GOLDEN_DIR)
+            pygame.image.save(surface, fname)
+            status = 'saved'
+        elif not os.path.exists(fname):
+            failed.append(name)
+            status = 'FAILED: no golden image (run with --update)'
+        else:
+            (n_bad, worst, heatmap) = compare(surface, pygame.image.load(fname), tolerance)
+            if n_bad > max_bad:
+                failed.append(name)
+                if not os.path.isdir(diffdir):
+                    os.makedirs(diffdir)
+                dname = os.path.join(diffdir, name + '_diff.png')
+                pygame.image.save(heatmap, dname)
+                status = ( 'FAILED: ' + repr(n_bad) + ' pixels differ (by up to ' +
+                           repr(worst) + '); see ' + dname )
+            else:
+                status = 'ok'
+        if verbose:
+            print('%-18s %6.1f ms  %s' % (name, ms, status))
+    return failed
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Golden-image regression checks for GUIpygame.')
+    parser.add_argument('names', nargs='*', help='scenes to check (default: all)')
+    parser.add_argument('--update', action='store_true', help='save the renderings as the new golden images')
+    parser.add_argument('--tolerance', type=int, default=0, help='allowed difference per color channel')
+    parser.add_argument('--max-bad', type=int, default=0, help='allowed number of mismatched pixels per scene')
+    parser.add_argument('--diffs', default='golden_diffs', help='folder for the diff heatmaps')
+    parser.add_argument('--list', action='store_true', help='list the scene names')
+    args = parser.parse_args()
+    if args.list:
+        for (name, scene_func) in scenes:
+            print('%-18s %s' % (name, scene_func.__doc__))
+        sys.exit(0)
+    failed = run(args.names, args.update, args.tolerance, args.max_bad, args.diffs)
+    sys.exit(1 if failed else 0)
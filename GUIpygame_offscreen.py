@@ -0,0 +1,276 @@
+#!/usr/bin/python3
+'''
+GUIpygame_offscreen.py
+Headless (offscreen) rendering of GUIpygame widgets to images.
+
+This is for programs which generate lots of static pictures of user
+interfaces (report panels, kiosk screens, etc.) from data, rather than
+showing them interactively.  It has three parts:
+
+1. A serialisable description of a widget tree, made only of dicts, lists,
+   strings and numbers (so it can be stored as JSON, or sent to another
+   process).  A widget is described by a dict like this:
+
+       {'type': 'Form',                  # a GUIpygame widget class, or
+                                         # 'wrap_in_titlebar', 'wrap_in_border'
+                                         # or 'ActionMenu'
+        'args': {'rect': [10,10,300,200], 'title': 'Report', 'Id': 'rpt'},
+        'attrs': {'resizeable': 'byMouse'},   # optional, set after creation
+        'children': [ ...more widget descriptions... ],  # optional
+        'widget': { ...a widget description... } }  # only for the wrap_ types
+
+   In 'args', lists are converted to tuples, a 'font' is given as
+   [filename, size] or [filename, size, bold, italic] (a filename of None
+   means the default Vera font), and an 'image' is given as a filename.
+   Fonts and images are loaded once per process and then reused.
+
+   A "scene" (one picture) is a dict with the size of the picture, its
+   background color, and a list of top-level widget descriptions:
+
+       {'size': [640, 480], 'bgcolor': [255,255,255], 'widgets': [...]}
+
+2. render(scene) builds the widgets against an offscreen surface, and
+   returns the picture as PNG bytes (or as raw RGBA bytes, or as a pygame
+   Surface).  If pygame hasn't been imported yet, the SDL "dummy" video
+   driver is used, so no window is ever opened.
+
+3. render_many(scenes) and SnapshotPool fan the work out across a pool of
+   worker processes.  Each worker imports pygame and GUIpygame once, and
+   keeps its font and image caches warm from one job to the next.
+
+Example:
+    import GUIpygame_offscreen
+    scene = {'size': [200, 60], 'bgcolor': [255,255,255],
+             'widgets': [{'type': 'Label', 'args': {'text': 'Hello', 'pos': [10,10]}}]}
+    png = GUIpygame_offscreen.render(scene)
+    pngs = GUIpygame_offscreen.render_many([scene] * 1000)
+'''
+
+# make Python 2.6 / 2.7 more compatible with Python 3
+from __future__ import print_function, division  # We require Python 2.6 or later
+
+
+__all__ = ['init_headless', 'build', 'render', 'render_many', 'SnapshotPool']
+
+
+import os
+import io
+import multiprocessing
+
+# pygame and GUIpygame are imported by init_headless(), because the video
+# driver has to be chosen before pygame is imported.
+pygame = None
+GUIpygame = None
+
+
+def init_headless():
+    '''Import pygame & GUIpygame (if they haven't been already), and make sure
+    that there's a display surface, which pygame needs for some surface
+    conversions.  If pygame wasn't already imported, this selects the SDL
+    "dummy" video driver (unless SDL_VIDEODRIVER is already set), so that
+    no window is opened.
+
+    This is also the initializer for the worker processes of SnapshotPool.
+    '''
+    global pygame, GUIpygame
+    if GUIpygame is None:
+        import sys
+        if 'pygame' not in sys.modules:
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+            os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        import pygame as pygame_
+        import GUIpygame as GUIpygame_
+        pygame = pygame_
+        GUIpygame = GUIpygame_
+    if pygame.display.get_surface() is None:
+        # a 1x1 display surface, hidden if there's a real video driver
+        pygame.display.set_mode((1,1), getattr(pygame, 'HIDDEN', 0))
+
+
+# per-process cache of loaded images, so that each is loaded only once
+# (fonts are shared by GUIpygame.get_font)
+_images = {}
+
+def _font(spec):
+    '''Return the pygame Font for a [filename, size, bold, italic] spec.'''
+    return GUIpygame.get_font(*spec)
+
+def _image(fname):
+    '''Return the pygame Surface loaded from fname.'''
+    if fname not in _images:
+        _images[fname] = pygame.image.load(fname)
+    return _images[fname]
+
+def _tuplify(value):
+    '''Convert lists (e.g., from JSON) to tuples, recursively.'''
+    if isinstance(value, list):
+        value = tuple([_tuplify(x) for x in value])
+    return value
+
+# the functions which may be named as a widget's 'type' (besides the classes)
+_factories = {'wrap_in_titlebar': 'widget', 'wrap_in_border': 'widget',
+              'ActionMenu': None}
+
+def build(desc):
+    '''Build and return the widget (with its children) described by desc.
+    See the module docstring for the format.
+    '''
+    init_headless()
+    typ = desc['type']
+    args = {}
+    for (name, value) in desc.get('args', {}).items():
+        if name == 'font':
+            value = _font(value)
+        elif name == 'image':
+            value = _image(value)
+        else:
+            value = _tuplify(value)
+        args[str(name)] = value
+    if typ in _factories:
+        if typ == 'ActionMenu':
+            widget = GUIpygame.Menu.ActionMenu(**args)
+        else:
+            widget = getattr(GUIpygame, typ)(build(desc['widget']), **args)
+    else:
+        cls = getattr(GUIpygame, typ, None)
+        if not (isinstance(cls, type) and issubclass(cls, GUIpygame.Widget)):
+            raise ValueError('Not a GUIpygame widget type: ' + repr(typ))
+        widget = cls(**args)
+    for (name, value) in desc.get('attrs', {}).items():
+        setattr(widget, str(name), _tuplify(value))
+    children = [build(child) for child in desc.get('children', [])]
+    if children:
+        widget.add_widgets(*children)
+    return widget
+
+
+def render_surface(scene):
+    '''Build the scene's widgets and draw them onto a new offscreen surface,
+    which is returned.
+
+    This doesn't use WidgetGroup.draw, so it doesn't disturb the overlap
+    bookkeeping of an application that is also displaying widgets.
+    '''
+    init_headless()
+    surface = pygame.Surface(_tuplify(scene['size']))
+    surface.fill(_tuplify(scene.get('bgcolor', (255,255,255))))
+    for desc in scene.get('widgets', []):
+        widget = build(desc)
+        widget.anchor_surface_size = surface.get_size()  # not the (dummy) display's
+        widget.update()
+        surface.blit(widget.image, widget.rect)
+    return surface
+
+def _encode(surface, fmt):
+    if fmt == 'surface':
+        return surface
+    elif fmt == 'rgba':
+        return pygame.image.tostring(surface, 'RGBA')
+    elif fmt == 'png':
+        buf = io.BytesIO()
+        try:
+            pygame.image.save(surface, buf, 'png')
+        except TypeError:
+            # older pygame can only save to a named file
+            import tempfile
+            (fd, fname) = tempfile.mkstemp(suffix='.png')
+            os.close(fd)
+            try:
+                pygame.image.save(surface, fname)
+                with open(fname, 'rb') as f:
+                    buf.write(f.read())
+            finally:
+                os.remove(fname)
+        return buf.getvalue()
+    raise ValueError('Unknown image format: ' + repr(fmt))
+
+def render(scene, fmt='png'):
+    '''Render a scene (see the module docstring), and return the picture.
+
+    fmt='png' returns PNG file contents (bytes), fmt='rgba' returns the raw
+    pixels (bytes, 4 per pixel, row by row, as from pygame.image.tostring),
+    and fmt='surface' returns a pygame Surface.
+    '''
+    return _encode(render_surface(scene), fmt)
+
+def _render_job(job):
+    '''Worker-process side of SnapshotPool.render'''
+    (scene, fmt) = job
+    return render(scene, fmt)
+
+
+class SnapshotPool(object):
+    '''A pool of worker processes for rendering scenes in parallel.
+
+    The workers are started once, and each one keeps its pygame, GUIpygame,
+    fonts and images loaded between jobs, so it pays to keep using the same
+    pool for many batches:
+
+        with SnapshotPool() as pool:
+            for batch in batches:
+                pngs = pool.render(batch)
+
+    processes  is the number of worker processes (default: one per CPU).
+
+    The workers are started with the "spawn" method (where available), so
+    they don't inherit the parent process's display.
+    '''
+    def __init__(self, processes=None):
+        try:
+            ctx = multiprocessing.get_context('spawn')
+        except AttributeError:
+            ctx = multiprocessing  # Python 2
+        self.pool = ctx.Pool(processes, initializer=init_headless)
+
+    def render(self, scenes, fmt='png', chunksize=4):
+        '''Render each scene, and return a list of the pictures, in the same
+        order.  (fmt is as for render(), except that 'surface' isn't allowed,
+        since Surfaces can't be sent between processes.)
+        '''
+        if fmt == 'surface':
+            raise ValueError("fmt='surface' can't be used with a process pool")
+        return self.pool.map(_render_job, [(scene, fmt) for scene in scenes], chunksize)
+
+    def close(self):
+        '''Shut down the worker processes.'''
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def render_many(scenes, fmt='png', processes=None, chunksize=4):
+    '''Render a list of scenes across a temporary pool of worker processes,
+    and return a list of the pictures.  (See SnapshotPool.)
+    '''
+    with SnapshotPool(processes) as pool:
+        return pool.render(scenes, fmt, chunksize)
+
+
+if __name__ == '__main__':
+    # Demo: render a small report panel a few hundred times, in parallel
+    import time
+    def panel(n):
+        return {'size': [320, 200], 'bgcolor': [255,255,230], 'widgets': [
+                  {'type': 'wrap_in_titlebar', 'args': {'title': 'Report #' + str(n)},
+                   'widget': {'type': 'BasicForm',
+                              'args': {'rect': [10,10,300,160], 'bgcolor': [240,240,255], 'Id': 'report'},
+                              'children': [
+                                {'type': 'Label', 'args': {'text': 'Items: ' + str(n*7), 'pos': [10,10]}},
+                                {'type': 'Label', 'args': {'text': 'Total: $' + str(n*13), 'pos': [10,30],
+                                                           'font': [None, 18]}},
+                                {'type': 'Checkbox', 'args': {'text': 'Shipped', 'pos': [10,60],
+                                                              'checked': bool(n % 2), 'Id': 'ck'}},
+                                {'type': 'ScrollBar', 'args': {'value': n % 100, 'horizontal': True,
+                                                               'size': 200, 'pos': [10,100], 'Id': 'sb'}}]}}]}
+    scenes = [panel(n) for n in range(400)]
+    t0 = time.time()
+    pngs = render_many(scenes)
+    t1 = time.time()
+    print('rendered ' + repr(len(pngs)) + ' PNGs in ' + ('%.2f' % (t1-t0)) + ' seconds')
+    with open('offscreen_demo.png', 'wb') as f:
+        f.write(pngs[0])
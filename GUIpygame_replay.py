@@ -0,0 +1,487 @@
+#!/usr/bin/python3
+'''
+GUIpygame_replay.py
+Recording of the events a GUIpygame application handles, and deterministic
+replay of those recordings.
+
+A recording captures, with their times:
+  - every pygame event the application passes to WidgetGroup.notify()
+    (except WIDGETEVENTs, which the widgets themselves generate, and which
+    will be generated again on replay, and timer wake-ups),
+  - every result event (button clicks, checkbox changes, etc.) which the
+    widgets deliver to the application,
+  - the start of every frame (i.e., each time the application updates or
+    draws its WidgetGroup after handling events), and
+  - each time that GUIpygame's timers (e.g., for auto-repeating scroll bar
+    buttons) were due.
+
+To record, create a Recorder before the application's event loop starts, and
+close it when the application is done:
+
+    import GUIpygame_replay
+    recorder = GUIpygame_replay.Recorder('session.rec')
+    ... the application's event loop ...
+    recorder.close()
+
+(Recorder is also a context manager.)  Recordings are compact binary files.
+
+To replay, build the same user interface (headlessly, if you like: see
+GUIpygame_offscreen.init_headless), and pass its WidgetGroup to replay():
+
+    report = GUIpygame_replay.replay('session.rec', widget_group)
+    print(report.summary())
+
+Each recorded input event is fed to the WidgetGroup, followed by the
+WIDGETEVENTs that the widgets post in response (just as an application's
+event loop would do), each recorded frame is drawn, and the timers are run
+at the recorded times.  The time taken for
+each event and frame is measured, and the result events generated on replay
+are compared with the recorded ones, so the report shows both the latency
+of each event and whether the replay behaved the same as the original.
+
+Replay runs as fast as possible by default, or at the recorded speed (or a
+multiple of it) with speed=1.0 (etc).  Either way, GUIpygame's clock is
+replaced by the recorded times during the replay, so replays are repeatable.
+
+From the command line:
+    python GUIpygame_replay.py session.rec              -- describe a recording
+    python GUIpygame_replay.py session.rec mymodule:ui  -- replay it headlessly
+where mymodule.ui() builds the user interface, and returns its WidgetGroup
+(or a (WidgetGroup, handler) tuple: see replay()).
+'''
+
+# make Python 2.6 / 2.7 more compatible with Python 3
+from __future__ import print_function, division  # We require Python 2.6 or later
+
+
+__all__ = ['Recorder', 'read_recording', 'replay', 'ReplayReport',
+           'INPUT', 'RESULT', 'FRAME', 'TIMERS']
+
+
+import struct
+import time
+
+if __name__ == '__main__':
+    import GUIpygame_offscreen
+    GUIpygame_offscreen.init_headless()  # this must happen before importing pygame
+
+import pygame
+import GUIpygame
+from GUIpygame import WIDGETEVENT
+
+try:
+    perf_counter = time.perf_counter
+except AttributeError:
+    perf_counter = time.time  # Python 2
+
+try:
+    unicode
+except NameError:
+    unicode = str  # Python 3
+
+
+#--------------------------[ The file format ]--------------------------
+#
+# A recording file starts with an 8-byte signature, and the width & height
+# of the display surface (if any) when the recording was started:
+#
+#     b'GUIPYRC1'  uint16 width  uint16 height
+#
+# followed by records, each of which is:
+#
+#     uint8 kind  uint32 time  uint16 event_type  uint8 n_attributes
+#
+# where kind is INPUT, RESULT, FRAME or TIMERS, time is in milliseconds since
+# the start of the recording, and event_type is 0 for FRAME and TIMERS
+# records (which have no attributes).  Then come
+# n_attributes of the event's attributes (from its .dict), each one as:
+#
+#     uint8 name_length  name (ASCII)  tagged value
+#
+# A tagged value is a one-byte tag followed by the value:
+#     b'n'                          None
+#     b'?'  uint8                   bool
+#     b'i'  int32                   int (if it fits)
+#     b'q'  int64                   int
+#     b'd'  double                  float
+#     b's'  uint16 length  UTF-8    str
+#     b't'  uint8 length  values    tuple (or list)
+# Attributes whose values are none of these (e.g., the sender widget of a
+# result event) are not recorded.  All the numbers are little-endian.
+
+SIGNATURE = b'GUIPYRC1'
+INPUT, RESULT, FRAME, TIMERS = 0, 1, 2, 3
+KIND_NAMES = {INPUT: 'input', RESULT: 'result', FRAME: 'frame', TIMERS: 'timers'}
+
+_header = struct.Struct('<HH')
+_record = struct.Struct('<BIHB')
+
+
+def _encode_value(value):
+    '''Return the tagged encoding of value, or None if it can't be encoded.'''
+    if value is None:
+        return b'n'
+    elif isinstance(value, bool):
+        return b'?' + struct.pack('<B', value)
+    elif isinstance(value, int) or type(value).__name__ == 'long':
+        if -0x80000000 <= value <= 0x7fffffff:
+            return b'i' + struct.pack('<i', value)
+        elif -0x8000000000000000 <= value <= 0x7fffffffffffffff:
+            return b'q' + struct.pack('<q', value)
+    elif isinstance(value, float):
+        return b'd' + struct.pack('<d', value)
+    elif isinstance(value, (str, unicode)):
+        if not isinstance(value, bytes):
+            value = value.encode('utf-8')
+        if len(value) <= 0xffff:
+            return b's' + struct.pack('<H', len(value)) + value
+    elif isinstance(value, (tuple, list)) and len(value) <= 0xff:
+        parts = [_encode_value(x) for x in value]
+        if None not in parts:
+            return b't' + struct.pack('<B', len(parts)) + b''.join(parts)
+    return None
+
+def _decode_value(data, pos):
+    '''Decode the tagged value at data[pos:], and return (value, new_pos).'''
+    tag = data[pos:pos+1]
+    pos += 1
+    if tag == b'n':
+        return None, pos
+    elif tag == b'?':
+        return bool(data[pos:pos+1] != b'\0'), pos+1
+    elif tag == b'i':
+        return struct.unpack_from('<i', data, pos)[0], pos+4
+    elif tag == b'q':
+        return struct.unpack_from('<q', data, pos)[0], pos+8
+    elif tag == b'd':
+        return struct.unpack_from('<d', data, pos)[0], pos+8
+    elif tag == b's':
+        (n,) = struct.unpack_from('<H', data, pos)
+        pos += 2
+        return data[pos:pos+n].decode('utf-8'), pos+n
+    elif tag == b't':
+        (n,) = struct.unpack_from('<B', data, pos)
+        pos += 1
+        items = []
+        for _ in range(n):
+            (item, pos) = _decode_value(data, pos)
+            items.append(item)
+        return tuple(items), pos
+    raise ValueError('Bad value tag ' + repr(tag) + ' in event recording')
+
+def _encode_record(kind, when, ev=None):
+    attrs = []
+    if ev is not None:
+        for (name, value) in sorted(ev.dict.items()):
+            encoded = _encode_value(value)
+            if (encoded is not None) and (len(name) <= 0xff):
+                attrs.append(struct.pack('<B', len(name)) + name.encode('ascii') + encoded)
+    etype = 0 if ev is None else ev.type
+    return _record.pack(kind, when, etype, len(attrs)) + b''.join(attrs)
+
+
+class RecordedEvent(object):
+    '''One record of a recording: .kind (INPUT, RESULT, FRAME or TIMERS), .time
+    (in milliseconds since the start of the recording), and (for INPUT and
+    RESULT records) .event (a pygame event).
+    '''
+    def __init__(self, kind, when, event=None):
+        self.kind = kind
+        self.time = when
+        self.event = event
+
+    def __repr__(self):
+        if self.event is None:
+            return '<%s @%d>' % (KIND_NAMES.get(self.kind, self.kind), self.time)
+        return '<%s @%d %s %r>' % (KIND_NAMES.get(self.kind, self.kind), self.time,
+                                   pygame.event.event_name(self.event.type), self.event.dict)
+
+
+def read_recording(fname):
+    '''Read the recording file fname, and return (size, records), where size
+    is the (width, height) of the display when the recording was made, and
+    records is a list of RecordedEvents.
+    '''
+    with open(fname, 'rb') as f:
+        data = f.read()
+    if data[:len(SIGNATURE)] != SIGNATURE:
+        raise ValueError(repr(fname) + ' is not a GUIpygame event recording')
+    pos = len(SIGNATURE)
+    size = _header.unpack_from(data, pos)
+    pos += _header.size
+    records = []
+    while pos < len(data):
+        (kind, when, etype, n_attrs) = _record.unpack_from(data, pos)
+        pos += _record.size
+        attrs = {}
+        for _ in range(n_attrs):
+            (n,) = struct.unpack_from('<B', data, pos)
+            name = data[pos+1:pos+1+n].decode('ascii')
+            (attrs[str(name)], pos) = _decode_value(data, pos+1+n)
+        if kind in (FRAME, TIMERS):
+            records.append(RecordedEvent(kind, when))
+        else:
+            records.append(RecordedEvent(kind, when, pygame.event.Event(etype, attrs)))
+    return size, records
+
+
+#---------------------------[ The recorder ]---------------------------
+
+class Recorder(object):
+    '''Records the events handled by GUIpygame's WidgetGroups, the result
+    events delivered by widgets, and the starts of frames, to the file fname
+    (see the module docstring).  Recording starts when the Recorder is
+    created, and stops when it's closed.  Only one Recorder can be active at
+    a time.
+    '''
+    def __init__(self, fname):
+        if GUIpygame.event_recorder is not None:
+            raise RuntimeError('An event recording is already in progress')
+        self.file = open(fname, 'wb')
+        screen = pygame.display.get_surface()
+        size = screen.get_size() if screen is not None else (0, 0)
+        self.file.write(SIGNATURE + _header.pack(*size))
+        self.start = GUIpygame.clock()
+        GUIpygame.event_recorder = self
+
+    def _write(self, kind, ev=None):
+        when = max(0, GUIpygame.clock() - self.start)
+        self.file.write(_encode_record(kind, when, ev))
+
+    def input(self, ev):
+        '''Called by WidgetGroup.notify() with each event.'''
+        if ev.type not in (WIDGETEVENT, GUIpygame.WAKEUPEVENT):
+            self._write(INPUT, ev)
+
+    def result(self, ev):
+        '''Called by GUIpygame.deliver_event() with each result event.'''
+        self._write(RESULT, ev)
+
+    def frame(self):
+        '''Called by GUIpygame.start_of_frame() at the start of each frame.'''
+        self._write(FRAME)
+
+    def timers(self):
+        '''Called by GUIpygame.service_timers() when timers are due.'''
+        self._write(TIMERS)
+
+    def close(self):
+        '''Stop recording, and close the file.'''
+        if GUIpygame.event_recorder is self:
+            GUIpygame.event_recorder = None
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+#---------------------------[ The replayer ]---------------------------
+
+class _ResultCollector(object):
+    '''Stands in for the Recorder during a replay, to collect result events.'''
+    def __init__(self):
+        self.results = []
+
+    def input(self, ev):
+        pass
+
+    def result(self, ev):
+        self.results.append(ev)
+
+    def frame(self):
+        pass
+
+    def timers(self):
+        pass
+
+
+def _comparable(ev):
+    '''The recordable parts of a result event, for comparing replayed result
+    events with recorded ones.'''
+    attrs = {}
+    for (name, value) in ev.dict.items():
+        if _encode_value(value) is not None:
+            attrs[name] = _tuplify(value)
+    return (ev.type, attrs)
+
+def _tuplify(value):
+    if isinstance(value, (tuple, list)):
+        value = tuple([_tuplify(x) for x in value])
+    return value
+
+
+class ReplayReport(object):
+    '''The results of replay():
+
+    .latencies   list of (record_index, event_type_name, milliseconds): the
+                 time taken to handle each input event (including the
+                 WIDGETEVENTs that it caused, and the application's handler)
+    .frame_times list of (record_index, milliseconds): the time taken to
+                 draw each frame
+    .timer_times list of (record_index, milliseconds): the time taken to
+                 run the timers which were due
+    .mismatches  list of (position, recorded_event, replayed_event): the
+                 result events which differed between the recording and the
+                 replay (either event may be None, if one sequence was
+                 longer than the other)
+    .elapsed     the total (wall clock) time the replay took, in seconds
+    '''
+    def __init__(self):
+        self.latencies = []
+        self.frame_times = []
+        self.timer_times = []
+        self.mismatches = []
+        self.elapsed = 0.0
+
+    @staticmethod
+    def _stats(times):
+        times = sorted(times)
+        n = len(times)
+        return ( n, sum(times)/n, times[n//2],
+                 times[min(n-1, int(n*0.95))], times[-1] )
+
+    def summary(self, slowest=5):
+        '''Return a printable summary: latency statistics for each type of
+        event and for frames, the slowest events, and any mismatches.
+        '''
+        lines = ['%-16s %6s %9s %9s %9s %9s' % ('', 'count', 'mean ms', 'median', '95%', 'max')]
+        by_type = {}
+        for (_, name, ms) in self.latencies:
+            by_type.setdefault(name, []).append(ms)
+        rows = sorted(by_type.items())
+        if self.frame_times:
+            rows.append(('(frames)', [ms for (_, ms) in self.frame_times]))
+        if self.timer_times:
+            rows.append(('(timers)', [ms for (_, ms) in self.timer_times]))
+        for (name, times) in rows:
+            lines.append('%-16s %6d %9.3f %9.3f %9.3f %9.3f' % ((name,) + self._stats(times)))
+        if self.latencies:
+            lines.append('slowest events:')
+            for (indx, name, ms) in sorted(self.latencies, key=lambda x: -x[2])[:slowest]:
+                lines.append('  #%-6d %-16s %9.3f ms' % (indx, name, ms))
+        if self.mismatches:
+            lines.append(repr(len(self.mismatches)) + ' result event(s) differ from the recording; the first:')
+            (posn, recorded, replayed) = self.mismatches[0]
+            lines.append('  result #%d: recorded %r' % (posn, recorded.dict if recorded else None))
+            lines.append('  %s replayed %r' % (' '*len(str(posn)), replayed.dict if replayed else None))
+        else:
+            lines.append('the result events match the recording')
+        lines.append('replay took %.3f s' % self.elapsed)
+        return '\n'.join(lines)
+
+
+def _default_draw(group, surface):
+    def draw():
+        GUIpygame.screen_is_cleared()
+        surface.fill((255,255,255))
+        group.update()
+        group.draw(surface)
+    return draw
+
+def replay(fname, group, handler=None, draw=None, speed=None):
+    '''Replay the recording in the file fname to the WidgetGroup group (which
+    should contain the same user interface as when the recording was made),
+    and return a ReplayReport.
+
+    handler  if given, is called with each event which the widgets don't
+             handle (i.e., for which group.notify() returns False), as an
+             application's event loop would do.
+    draw     is called (with no parameters) for each recorded frame; the
+             default updates the group and draws it on an offscreen surface
+             the size of the recorded display.
+    speed    None (the default) replays as fast as possible; otherwise the
+             replay is paced to the recording's timing, sped up by this
+             factor (so speed=1.0 is the recorded speed).
+    '''
+    (size, records) = read_recording(fname)
+    if draw is None:
+        surface = pygame.Surface((max(1, size[0]), max(1, size[1])))
+        draw = _default_draw(group, surface)
+    report = ReplayReport()
+    collector = _ResultCollector()
+    saved = (GUIpygame.event_recorder, GUIpygame.clock)
+    now = [0]
+    GUIpygame.event_recorder = collector
+    GUIpygame.clock = lambda: now[0]  # the recorded time
+    pygame.event.clear()
+    replay_start = perf_counter()
+    try:
+        for (indx, rec) in enumerate(records):
+            if speed:
+                delay = replay_start + rec.time/(1000.0*speed) - perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            now[0] = rec.time
+            if rec.kind == INPUT:
+                t0 = perf_counter()
+                queue = [rec.event]
+                while queue:
+                    ev = queue.pop(0)
+                    if not group.notify(ev) and (handler is not None):
+                        handler(ev)
+                    # as in an application's event loop, the widgets get to
+                    # see the events they post (timer wake-ups are left in
+                    # the queue, since we run the timers ourselves)
+                    queue.extend(pygame.event.get(WIDGETEVENT))
+                report.latencies.append( (indx, pygame.event.event_name(rec.event.type),
+                                          (perf_counter()-t0)*1000.0) )
+            elif rec.kind == FRAME:
+                t0 = perf_counter()
+                draw()
+                report.frame_times.append( (indx, (perf_counter()-t0)*1000.0) )
+            elif rec.kind == TIMERS:
+                t0 = perf_counter()
+                GUIpygame.service_timers()
+                report.timer_times.append( (indx, (perf_counter()-t0)*1000.0) )
+    finally:
+        (GUIpygame.event_recorder, GUIpygame.clock) = saved
+        GUIpygame.done_drawing()
+    report.elapsed = perf_counter() - replay_start
+    recorded = [rec.event for rec in records if rec.kind == RESULT]
+    replayed = collector.results
+    for posn in range(max(len(recorded), len(replayed))):
+        rec_ev = recorded[posn] if posn < len(recorded) else None
+        rep_ev = replayed[posn] if posn < len(replayed) else None
+        if ( (rec_ev is None) or (rep_ev is None) or
+             (_comparable(rec_ev) != _comparable(rep_ev)) ):
+            report.mismatches.append( (posn, rec_ev, rep_ev) )
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    import importlib
+    import sys
+    parser = argparse.ArgumentParser(description='Describe or replay a GUIpygame event recording.')
+    parser.add_argument('recording', help='the recording file')
+    parser.add_argument('ui', nargs='?', help='module:function which builds the user interface '
+                        'and returns its WidgetGroup (or a (WidgetGroup, handler) tuple)')
+    parser.add_argument('--speed', type=float, default=None,
+                        help='replay at this multiple of the recorded speed (default: as fast as possible)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='replay this many times (building the user interface afresh each time)')
+    args = parser.parse_args()
+
+    (size, records) = read_recording(args.recording)
+    counts = {}
+    for rec in records:
+        counts[rec.kind] = counts.get(rec.kind, 0) + 1
+    print('%s: %dx%d display, %.3f s, %d input events, %d result events, %d frames, %d timer runs' % (
+          args.recording, size[0], size[1], (records[-1].time/1000.0 if records else 0),
+          counts.get(INPUT, 0), counts.get(RESULT, 0), counts.get(FRAME, 0), counts.get(TIMERS, 0)))
+    if args.ui:
+        sys.path.insert(0, '.')
+        (modname, funcname) = args.ui.split(':')
+        build = getattr(importlib.import_module(modname), funcname)
+        failed = False
+        for _ in range(args.repeat):
+            ui = build()
+            (group, handler) = ui if isinstance(ui, tuple) else (ui, None)
+            report = replay(args.recording, group, handler, speed=args.speed)
+            print(report.summary())
+            failed = failed or bool(report.mismatches)
+        sys.exit(1 if failed else 0)
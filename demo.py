@@ -86,12 +86,8 @@ if __name__ == '__main__':
     # import os  # module os is needed to access environment variables
     import re  # regular expressions
 
-    try:
-        vera_big = pygame.font.Font('Vera.ttf', 36)
-        vera_med = pygame.font.Font('Vera.ttf', 18)
-    except:
-        vera_big = pygame.font.SysFont('arial,microsoftsansserif,courier', 36)
-        vera_med = pygame.font.SysFont('arial,microsoftsansserif,courier', 18)
+    vera_big = GUIpygame.get_font('Vera.ttf', 36)
+    vera_med = GUIpygame.get_font('Vera.ttf', 18)
 
     fullscreen_sz = (pygame.display.Info().current_w, pygame.display.Info().current_h)
     # print( 'dbg: screen size =', fullscreen_sz )
@@ -139,7 +135,7 @@ if __name__ == '__main__':
 
     # instructions, centered at the top of the screen
     line0 = Label( "This is a resizeable window", pos=(0,5), color=(0,0,220), font=vera_big)
-    line0.rect.centerx = screen.get_size()[0] // 2
+    line0.set_anchor(centerx=0)  # keep it centered when the window is resized
 
     line1 = Label( "Right-click=pop-up menu,  [space]=save screenshot.jpg,  [Esc]=quit", pos=(0,line0.rect.bottom+5), color=(240,0,0) )
     line1.set_text(line1.text, adjustwidth=True)
@@ -414,7 +410,6 @@ if __name__ == '__main__':
         for line in (line1, mousepos, line3):
             line.rect.left = left_x
         mouseclick.rect.left = left_x
-        line0.rect.centerx = screen.get_size()[0] // 2
 
         # Tell GUIpygame that we're about to clear the screen
         GUIpygame.screen_is_cleared()
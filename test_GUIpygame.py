@@ -0,0 +1,2124 @@
+'''Unit tests for GUIpygame.
+
+Run them with:
+
+    python -m unittest test_GUIpygame
+
+(or with pytest).  They use SDL's "dummy" video driver, so no window is
+opened.  Timers run on a fake clock (see FakeClockTest), so the tests
+don't depend on how fast the machine is.
+'''
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import io
+import random
+import sys
+import tempfile
+import unittest
+
+import pygame
+from pygame.locals import *
+import GUIpygame
+from GUIpygame import WIDGETEVENT
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def setUpModule():
+    pygame.init()
+    pygame.display.set_mode((640,480))
+
+def event(type, **attrs):
+    '''Return a pygame event of the given type, with the given attributes.'''
+    return pygame.event.Event(type, attrs)
+
+def wakeup():
+    '''Return the internal event that GUIpygame's timers post to wake up the
+    application (see GUIpygame._arm_wakeup).
+    '''
+    return event(GUIpygame.WAKEUPEVENT)
+
+def show(group):
+    '''Update and draw the group, as an application's event loop does.'''
+    group.update()
+    group.draw(pygame.display.get_surface())
+
+def block(width, height):
+    '''Return a plain widget of the given size.'''
+    return GUIpygame.Image(size=(width, height), bgcolor=(0,0,0))
+
+def form(width=10, height=10):
+    '''Return an empty, opaque form of the given size.'''
+    return GUIpygame.BasicForm(rect=(0,0,width,height), bgcolor=(255,255,255))
+
+def disc(diameter, alpha=255):
+    '''Return a transparent surface with a filled circle on it.'''
+    surface = pygame.Surface((diameter, diameter), SRCALPHA)
+    pygame.draw.circle(surface, (200,0,0,alpha), (diameter//2, diameter//2), diameter//2)
+    return surface
+
+
+class FakeClockTest(unittest.TestCase):
+    '''Base class for tests which need GUIpygame.clock() to only move when
+    they say so (by calling self.tick).
+    '''
+    def setUp(self):
+        self.now = 100000
+        self.saved_clock = GUIpygame.clock
+        GUIpygame.clock = lambda: self.now
+        GUIpygame.timed_widgets.clear()
+        pygame.event.clear()
+
+    def tearDown(self):
+        GUIpygame.clock = self.saved_clock
+        GUIpygame.timed_widgets.clear()
+        del GUIpygame.deferred_widgets[:]
+        pygame.event.clear()
+
+    def tick(self, ms, group):
+        '''Let ms milliseconds pass, then deliver a timer wake-up to group.'''
+        self.now += ms
+        group.notify(wakeup())
+
+
+class SessionTest(FakeClockTest):
+    '''Base class for tests which compare the screens of a random session
+    (of mouse and keyboard events) with various optional ways of drawing
+    turned on, and off.
+    '''
+    def build(self):
+        '''Return a WidgetGroup of assorted (and nested) widgets.'''
+        group = GUIpygame.WidgetGroup()
+        outer = GUIpygame.Form(rect=(20,20,300,250), Id='s.form', title='Form')
+        outer.resizeable = 'byMouse'
+        inner = GUIpygame.BasicForm(rect=(10,160,200,60), bgcolor=(200,230,200),
+                                    boxcolors=((0,0,0),(255,255,255)), Id='s.inner')
+        label = GUIpygame.Label('inner label', pos=(5,5))
+        label.draggable = True
+        inner.add_widgets(label, GUIpygame.SimpleCheckbox(pos=(100,30), Id='s.scb'))
+        inner2 = GUIpygame.BasicForm(rect=(215,160,80,80), bgcolor=(230,200,200), Id='s.inner2')
+        deep = GUIpygame.BasicForm(rect=(5,5,60,40), bgcolor=(200,200,250), Id='s.deep', draggable=True)
+        deep.add_widgets(GUIpygame.Label('d', pos=(3,3), bgcolor=(255,255,0)))
+        inner2.add_widgets(deep)
+        outer.add_widgets(GUIpygame.ScrollBar(size=200, pos=(10,30), horizontal=True, Id='s.sb'),
+                          GUIpygame.Checkbox(pos=(10,60), text='check me', Id='s.cb'),
+                          GUIpygame.TextEditBox(text='hello', pos=(10,90), width=150, Id='s.te'),
+                          GUIpygame.SimpleButton('Push', pos=(10,130), Id='s.bt'),
+                          inner, inner2)
+        wrapped = GUIpygame.wrap_in_titlebar(GUIpygame.ScrollBar(size=150, Id='s.vs'),
+                                             title='Wrapped', resizeable='byMouse')
+        wrapped.rect.topleft = (350, 50)
+        group.add(outer, wrapped, GUIpygame.Menu.ActionMenu('One|Two|-Three|Four', pos=(400,300)))
+        return group
+
+    def session(self, seed, frames=150, **attrs):
+        '''Play a random session, and return the screen after each frame.
+        attrs are set on every widget which has such attributes.
+        '''
+        rnd = random.Random(seed)
+        GUIpygame.screen_is_cleared()
+        group = self.build()
+        widgets = []
+        def walk(widget):
+            widgets.append(widget)
+            for child_widget in widget.children:
+                walk(child_widget)
+        for widget in group:
+            walk(widget)
+        for widget in widgets:
+            for (name, value) in attrs.items():
+                if hasattr(widget, name):
+                    setattr(widget, name, value)
+        screen = pygame.display.get_surface()
+        shots = []
+        down = False
+        for i in range(frames):
+            rect = rnd.choice(widgets).rect
+            pos = (rnd.randint(rect.left-2, max(rect.left, rect.right)+2),
+                   rnd.randint(rect.top-2, max(rect.top, rect.bottom)+2))
+            r = rnd.random()
+            if r < 0.5:
+                ev = event(MOUSEMOTION, pos=pos, rel=(1,1), buttons=(int(down),0,0))
+            elif r < 0.7:
+                down = not down
+                ev = event(MOUSEBUTTONDOWN if down else MOUSEBUTTONUP, pos=pos, button=1)
+            else:
+                key = rnd.choice([K_a, K_b, K_LEFT, K_RIGHT, K_BACKSPACE])
+                ev = event(KEYDOWN, key=key, unicode=chr(key) if key in (K_a, K_b) else '', mod=0, scancode=0)
+            self.now += 16
+            group.notify(ev)
+            for ev in pygame.event.get():
+                group.notify(ev)
+            group.update()
+            screen.fill((255,255,255))
+            group.draw(screen)
+            shots.append(pygame.image.tostring(screen, 'RGB'))
+        GUIpygame.done_drawing()
+        return shots
+
+    def assertSameSessions(self, seeds=(0, 1, 2), **settings):
+        '''Play sessions with the module-level settings (from GUIpygame) and
+        widget attributes given, and check that they look the same as with
+        the defaults.
+        '''
+        options = dict((name, value) for (name, value) in settings.items() if hasattr(GUIpygame, name))
+        attrs = dict((name, value) for (name, value) in settings.items() if name not in options)
+        for seed in seeds:
+            expected = self.session(seed)
+            saved = dict((name, getattr(GUIpygame, name)) for name in options)
+            for (name, value) in options.items():
+                setattr(GUIpygame, name, value)
+            try:
+                shots = self.session(seed, **attrs)
+            finally:
+                for (name, value) in saved.items():
+                    setattr(GUIpygame, name, value)
+            differ = [frame for frame in range(len(shots)) if shots[frame] != expected[frame]]
+            self.assertEqual(differ, [], 'seed ' + repr(seed))
+
+
+class TestAutoRepeat(FakeClockTest):
+    '''Press-and-hold auto-repeat of ScrollBar arrow and trough buttons.'''
+    def setUp(self):
+        FakeClockTest.setUp(self)
+        self.sb = GUIpygame.ScrollBar(pos=(10,10), size=200, small_inc=1.0, large_inc=10.0)
+        self.group = GUIpygame.WidgetGroup(self.sb)
+        show(self.group)
+        self.down_arrow = self.sb.children.sprites()[4]
+
+    def press(self, button):
+        self.group.notify(event(MOUSEBUTTONDOWN, pos=button.rect.center, button=1))
+
+    def release(self, button):
+        self.group.notify(event(MOUSEBUTTONUP, pos=button.rect.center, button=1))
+
+    def test_first_step_is_immediate(self):
+        self.press(self.down_arrow)
+        self.assertEqual(self.sb.value, 1.0)
+
+    def test_repeats_after_delay_then_faster(self):
+        self.sb.set_autorepeat(delay=400, interval=100, accel=0.5, min_interval=30)
+        self.press(self.down_arrow)
+        self.tick(399, self.group)
+        self.assertEqual(self.sb.value, 1.0)
+        self.tick(1, self.group)
+        self.assertEqual(self.sb.value, 2.0)
+        self.tick(100, self.group)
+        self.assertEqual(self.sb.value, 3.0)
+        self.tick(50, self.group)  # the interval was halved...
+        self.assertEqual(self.sb.value, 4.0)
+        self.tick(30, self.group)  # ...but not below min_interval
+        self.assertEqual(self.sb.value, 5.0)
+        self.tick(29, self.group)
+        self.assertEqual(self.sb.value, 5.0)
+
+    def test_release_stops_repeating(self):
+        self.press(self.down_arrow)
+        self.release(self.down_arrow)
+        self.tick(5000, self.group)
+        self.assertEqual(self.sb.value, 1.0)
+        self.assertNotIn(self.down_arrow, GUIpygame.timed_widgets)
+
+    def test_pauses_while_pointer_is_off_the_button(self):
+        self.sb.set_autorepeat(delay=400, interval=100)
+        self.press(self.down_arrow)
+        self.group.notify(event(MOUSEMOTION, pos=(300,300), rel=(0,0), buttons=(1,0,0)))
+        self.tick(400, self.group)
+        self.tick(100, self.group)
+        self.assertEqual(self.sb.value, 1.0)
+        self.group.notify(event(MOUSEMOTION, pos=self.down_arrow.rect.center, rel=(0,0), buttons=(1,0,0)))
+        self.tick(100, self.group)
+        self.assertEqual(self.sb.value, 2.0)
+
+    def test_delay_zero_disables_auto_repeat(self):
+        self.sb.set_autorepeat(delay=0)
+        self.press(self.down_arrow)
+        self.tick(5000, self.group)
+        self.assertEqual(self.sb.value, 1.0)
+
+    def test_trough_button_steps_by_large_inc(self):
+        self.press(self.sb.children.sprites()[3])
+        self.assertEqual(self.sb.value, 10.0)
+
+    def test_wakeup_leaves_application_timers_alone(self):
+        pygame.time.set_timer(WIDGETEVENT, 20)  # the application's timer
+        try:
+            self.sb.set_autorepeat(delay=40)
+            self.press(self.down_arrow)  # arms a wake-up
+            pygame.time.wait(100)
+            types = [ev.type for ev in pygame.event.get()]
+        finally:
+            pygame.time.set_timer(WIDGETEVENT, 0)
+        self.assertIn(WIDGETEVENT, types)
+        self.assertIn(GUIpygame.WAKEUPEVENT, types)
+        self.assertNotEqual(GUIpygame.WAKEUPEVENT, WIDGETEVENT)
+
+    def test_wakeup_is_handled(self):
+        self.sb.set_autorepeat(delay=400, interval=100)
+        self.press(self.down_arrow)
+        self.now += 400
+        self.assertTrue(self.group.notify(wakeup()))
+        self.assertEqual(self.sb.value, 2.0)
+
+
+class TestEventPolicies(FakeClockTest):
+    '''ScrollBar value-change event policies (see ScrollBar.set_event_policy).
+    The down arrow is held, auto-repeating every 100 ms.
+    '''
+    def setUp(self):
+        FakeClockTest.setUp(self)
+        self.reports = []  # (value, final, clock) for each value-change event
+        self.sb = GUIpygame.ScrollBar(pos=(10,10), size=200, small_inc=1.0)
+        self.sb.set_autorepeat(delay=100, interval=100, accel=1.0, min_interval=100)
+        self.group = GUIpygame.WidgetGroup(self.sb)
+        show(self.group)
+        self.arrow = self.sb.children.sprites()[4]
+
+    def collect(self):
+        '''Pick up the value-change events posted since the last call.'''
+        for ev in pygame.event.get(WIDGETEVENT):
+            if (ev.sender is self.sb) and not ev.internal:
+                self.reports.append( (ev.value, ev.final, self.now) )
+
+    def values(self):
+        self.collect()
+        return [value for (value, final, now) in self.reports]
+
+    def hold(self, repeats, new_frames=True):
+        '''Press the arrow, and hold it down for that many repeats, with a
+        new frame before each one (unless new_frames is False).
+        '''
+        self.group.notify(event(MOUSEBUTTONDOWN, pos=self.arrow.rect.center, button=1))
+        self.collect()
+        for i in range(repeats):
+            if new_frames:
+                show(self.group)
+            self.tick(100, self.group)
+            self.collect()
+
+    def let_go(self):
+        show(self.group)
+        self.group.notify(event(MOUSEBUTTONUP, pos=self.arrow.rect.center, button=1))
+        self.collect()
+
+    def test_frame_policy_reports_each_frame(self):
+        self.hold(3)
+        self.assertEqual(self.values(), [1.0, 2.0, 3.0, 4.0])
+
+    def test_frame_policy_coalesces_within_a_frame(self):
+        self.hold(3, new_frames=False)
+        self.assertEqual(self.values(), [1.0])
+        show(self.group)  # a new frame...
+        self.group.notify(wakeup())  # ...and the wake-up it asked for
+        self.assertEqual(self.values(), [1.0, 4.0])  # the latest value wins
+
+    def test_interval_policy(self):
+        self.sb.set_event_policy('interval', min_interval=250)
+        self.hold(10)
+        self.let_go()
+        times = [now for (value, final, now) in self.reports]
+        for (earlier, later) in zip(times[:-2], times[1:-1]):
+            self.assertGreaterEqual(later - earlier, 250)
+        self.assertEqual(self.values()[-1], 11.0)  # nothing is left unreported
+
+    def test_delta_policy(self):
+        self.sb.set_event_policy('delta', min_delta=2.5)
+        self.hold(6)
+        self.assertEqual(self.values(), [3.0, 6.0])
+
+    def test_release_policy(self):
+        self.sb.set_event_policy('release')
+        self.hold(5)
+        self.assertEqual(self.reports, [])
+        self.let_go()
+        self.assertEqual([(value, final) for (value, final, now) in self.reports], [(6.0, True)])
+
+    def test_final_event(self):
+        self.sb.set_event_policy('frame', final_event=True)
+        self.hold(2)
+        self.let_go()
+        self.assertEqual([(value, final) for (value, final, now) in self.reports],
+                         [(1.0, False), (2.0, False), (3.0, False), (3.0, True)])
+        # letting go again without changing the value doesn't repeat it
+        self.sb.set_autorepeat(delay=0)
+        self.group.notify(event(MOUSEBUTTONUP, pos=self.arrow.rect.center, button=1))
+        self.assertEqual(len(self.values()), 4)
+
+
+class TestCallbacks(FakeClockTest):
+    '''Delivering result events by callback and by Id (see deliver_event).'''
+    def setUp(self):
+        FakeClockTest.setUp(self)
+        self.calls = []
+        self.sb = GUIpygame.ScrollBar(pos=(10,10), size=200, small_inc=1.0, Id='cb.sb')
+        self.sb.set_autorepeat(delay=100, interval=100, accel=1.0, min_interval=100)
+        self.button = GUIpygame.SimpleButton(text='Go', pos=(10,40), Id='cb.go',
+                                             on_click=lambda ev: self.calls.append(('click', ev.Id)))
+        self.group = GUIpygame.WidgetGroup(self.sb, self.button)
+        show(self.group)
+        self.arrow = self.sb.children.sprites()[4]
+
+    def tearDown(self):
+        GUIpygame.handlers.clear()
+        FakeClockTest.tearDown(self)
+
+    def click(self, widget):
+        self.group.notify(event(MOUSEBUTTONDOWN, pos=widget.rect.center, button=1))
+        self.group.notify(event(MOUSEBUTTONUP, pos=widget.rect.center, button=1))
+
+    def hold(self, repeats, new_frames=True):
+        self.group.notify(event(MOUSEBUTTONDOWN, pos=self.arrow.rect.center, button=1))
+        for i in range(repeats):
+            if new_frames:
+                show(self.group)
+            self.tick(100, self.group)
+
+    def posted(self):
+        return [ev.Id for ev in pygame.event.get(WIDGETEVENT) if not ev.internal]
+
+    def test_callback_then_handler_then_queue(self):
+        GUIpygame.set_handler('cb.go', lambda ev: self.calls.append(('handler', ev.Id)))
+        self.click(self.button)
+        self.assertEqual(self.calls, [('click', 'cb.go'), ('handler', 'cb.go')])
+        self.assertEqual(self.posted(), ['cb.go'])
+
+    def test_not_posted(self):
+        self.button.post_events = False
+        self.click(self.button)
+        self.assertEqual(self.calls, [('click', 'cb.go')])
+        self.assertEqual(self.posted(), [])
+
+    def test_handler_removed(self):
+        GUIpygame.set_handler('cb.go', lambda ev: self.calls.append(('handler', ev.Id)))
+        GUIpygame.set_handler('cb.go', None)
+        self.click(self.button)
+        self.assertEqual(self.calls, [('click', 'cb.go')])
+
+    def test_scrollbar_on_change(self):
+        values = []
+        self.sb.on_change = lambda ev: values.append(ev.value)
+        self.hold(2)
+        self.assertEqual(values, [1.0, 2.0, 3.0])
+
+    def drag_slider(self, *offsets):
+        slider = self.sb.children.sprites()[2]
+        (x, y) = slider.rect.center
+        self.group.notify(event(MOUSEBUTTONDOWN, pos=(x, y), button=1))
+        for dy in offsets:
+            self.group.notify(event(MOUSEMOTION, pos=(x, y+dy), rel=(0, dy), buttons=(1,0,0)))
+
+    def test_reported_at_next_frame_without_further_events(self):
+        values = []
+        self.sb.on_change = lambda ev: values.append(ev.value)
+        show(self.group)
+        self.drag_slider(10, 20, 30)  # all within one frame
+        self.assertEqual(len(values), 1)
+        show(self.group)  # the next frame, with no more events
+        self.assertEqual(len(values), 2)
+        self.assertEqual(values[-1], self.sb.value)
+
+    def test_reported_when_interval_is_up_without_further_events(self):
+        values = []
+        self.sb.on_change = lambda ev: values.append(ev.value)
+        self.sb.set_event_policy('interval', min_interval=250)
+        self.sb.step(self.arrow)
+        self.sb.step(self.arrow)
+        self.assertEqual(values, [1.0])
+        self.now += 250
+        self.group.notify(wakeup())  # only GUIpygame's own timer wake-up...
+        show(self.group)  # ...and the frame that follows it
+        self.assertEqual(values, [1.0, 2.0])
+
+    def test_step_outside_notify_is_reported_right_away(self):
+        values = []
+        self.sb.on_change = lambda ev: values.append(ev.value)
+        show(self.group)
+        self.sb.step(self.arrow)
+        self.assertEqual(values, [1.0])
+
+
+class TestRegistry(unittest.TestCase):
+    '''Finding widgets by Id, class and Id prefix (see WidgetRegistry).'''
+    class Tagged(GUIpygame.Label):
+        pass  # a class that only these tests use
+
+    def test_find(self):
+        label = GUIpygame.Label('x', Id='reg.find')
+        self.assertIsNone(GUIpygame.find('reg.find'))  # not in any group yet
+        group = GUIpygame.WidgetGroup(label)
+        self.assertIs(GUIpygame.find('reg.find'), label)
+        group.remove(label)
+        self.assertIsNone(GUIpygame.find('reg.find'))
+
+    def test_find_child_widgets(self):
+        form = GUIpygame.BasicForm(rect=(0,0,100,100), bgcolor=(255,255,255))
+        inner = GUIpygame.BasicForm(rect=(5,5,50,50), bgcolor=(255,255,255))
+        label = GUIpygame.Label('x', Id='reg.nested')
+        inner.add_widgets(label)
+        form.add_widgets(inner)
+        group = GUIpygame.WidgetGroup(form)
+        self.assertIs(GUIpygame.find('reg.nested'), label)
+        form.remove_nested_widgets(label)
+        self.assertIsNone(GUIpygame.find('reg.nested'))
+
+    def test_most_recently_registered_wins(self):
+        first = GUIpygame.Label('1', Id='reg.dup')
+        second = GUIpygame.Label('2', Id='reg.dup')
+        group = GUIpygame.WidgetGroup(first, second)
+        self.assertIs(GUIpygame.find('reg.dup'), second)
+        self.assertEqual(set(GUIpygame.find_all(Id='reg.dup')), set([first, second]))
+        second.kill()
+        self.assertIs(GUIpygame.find('reg.dup'), first)
+
+    def test_renaming(self):
+        label = GUIpygame.Label('x', Id='reg.old')
+        group = GUIpygame.WidgetGroup(label)
+        label.Id = 'reg.new'
+        self.assertIsNone(GUIpygame.find('reg.old'))
+        self.assertIs(GUIpygame.find('reg.new'), label)
+
+    def test_in_two_groups(self):
+        label = GUIpygame.Label('x', Id='reg.two')
+        group1 = GUIpygame.WidgetGroup(label)
+        group2 = GUIpygame.WidgetGroup(label)
+        group1.remove(label)
+        self.assertIs(GUIpygame.find('reg.two'), label)  # still in group2
+        group2.remove(label)
+        self.assertIsNone(GUIpygame.find('reg.two'))
+
+    def test_find_all_by_class(self):
+        tagged = [self.Tagged('t' + str(i)) for i in range(3)]
+        plain = GUIpygame.Label('plain')
+        group = GUIpygame.WidgetGroup(plain, *tagged)
+        self.assertEqual(set(GUIpygame.find_all(self.Tagged)), set(tagged))
+        self.assertIn(tagged[0], GUIpygame.find_all(GUIpygame.Label))  # subclasses count
+        self.assertEqual(GUIpygame.find_all(self.Tagged, Id='t1'), [tagged[1]])
+
+    def test_find_prefix(self):
+        ids = ['row.10', 'row.2', 'row.1', 'rowing', 'other.row.3']
+        group = GUIpygame.WidgetGroup(*[GUIpygame.Label(Id, Id=Id) for Id in ids])
+        self.assertEqual([widget.Id for widget in GUIpygame.find_prefix('row.')],
+                         ['row.1', 'row.10', 'row.2'])  # sorted by Id
+        self.assertEqual([widget.Id for widget in GUIpygame.find_prefix('row')],
+                         ['row.1', 'row.10', 'row.2', 'rowing'])
+        self.assertEqual(GUIpygame.find_prefix('nothing.like.this'), [])
+
+    def test_unhashable_Id(self):
+        label = GUIpygame.Label('x', Id=['not', 'hashable'])
+        group = GUIpygame.WidgetGroup(label)
+        self.assertIsNone(GUIpygame.find(['not', 'hashable']))
+        self.assertIn(label, GUIpygame.find_all(GUIpygame.Label))
+
+
+class TestOffscreen(unittest.TestCase):
+    '''Rendering widget trees offscreen (see GUIpygame_offscreen).'''
+    scene = {'size': [220, 120], 'bgcolor': [255,255,230], 'widgets': [
+               {'type': 'wrap_in_titlebar', 'args': {'title': 'Report'},
+                'widget': {'type': 'BasicForm',
+                           'args': {'rect': [10,10,200,80], 'bgcolor': [240,240,255], 'Id': 'off.form'},
+                           'children': [
+                             {'type': 'Label', 'args': {'text': 'Total: $12', 'pos': [10,5]}},
+                             {'type': 'Checkbox', 'args': {'text': 'Shipped', 'pos': [10,30],
+                                                           'checked': True, 'Id': 'off.ck'}}]}}]}
+
+    @classmethod
+    def setUpClass(cls):
+        import GUIpygame_offscreen
+        cls.offscreen = GUIpygame_offscreen
+
+    def by_hand(self):
+        '''Build and draw self.scene as an application would.'''
+        form = GUIpygame.BasicForm(rect=(10,10,200,80), bgcolor=(240,240,255), Id='off.form')
+        form.add_widgets(GUIpygame.Label('Total: $12', pos=(10,5)),
+                         GUIpygame.Checkbox(text='Shipped', pos=(10,30), checked=True, Id='off.ck'))
+        widget = GUIpygame.wrap_in_titlebar(form, title='Report')
+        surface = pygame.Surface((220, 120))
+        surface.fill((255,255,230))
+        widget.update()
+        surface.blit(widget.image, widget.rect)
+        return surface
+
+    def test_build(self):
+        widget = self.offscreen.build(self.scene['widgets'][0])
+        self.assertIsInstance(widget, GUIpygame.Titlebar.__bases__[0])
+        checkbox = [w for w in widget.children.sprites()[-1].children if w.Id == 'off.ck'][0]
+        self.assertTrue(checkbox.checked)
+        self.assertRaises(ValueError, self.offscreen.build, {'type': 'WidgetGroup'})
+
+    def test_round_trip(self):
+        expected = pygame.image.tostring(self.by_hand(), 'RGB')
+        surface = self.offscreen.render(self.scene, 'surface')
+        self.assertEqual(surface.get_size(), (220, 120))
+        self.assertEqual(pygame.image.tostring(surface, 'RGB'), expected)
+        rgba = self.offscreen.render(self.scene, 'rgba')
+        self.assertEqual(pygame.image.tostring(pygame.image.fromstring(rgba, (220,120), 'RGBA'), 'RGB'),
+                         expected)
+        png = self.offscreen.render(self.scene)
+        self.assertEqual(png[:8], b'\x89PNG\r\n\x1a\n')
+        picture = pygame.image.load(io.BytesIO(png))
+        self.assertEqual(pygame.image.tostring(picture, 'RGB'), expected)
+
+    def test_pool(self):
+        scenes = [self.scene, dict(self.scene, bgcolor=[0,0,0])]
+        with self.offscreen.SnapshotPool(processes=2) as pool:
+            pictures = pool.render(scenes, 'rgba')
+        self.assertEqual(pictures, [self.offscreen.render(scene, 'rgba') for scene in scenes])
+        self.assertNotEqual(pictures[0], pictures[1])
+
+
+@unittest.skipIf(numpy is None, 'comparing images needs NumPy')
+class TestGolden(unittest.TestCase):
+    '''The scenes of GUIpygame_golden, compared with their golden images.
+
+    Subclasses draw the scenes again with one of the optional ways of
+    drawing turned on, which mustn't change what ends up on the screen.
+    '''
+    options = {}  # GUIpygame module-level settings to change
+    attrs = {}  # attributes to set on every widget in the scene which has them
+    tolerance = 0  # how much each color channel of a pixel may differ
+    shift = 0  # how many pixels sideways a pixel may be from its golden one
+    max_bad = 0  # how many pixels may differ anyway
+
+    @classmethod
+    def setUpClass(cls):
+        import GUIpygame_golden
+        cls.golden = GUIpygame_golden
+
+    def setUp(self):
+        self.saved = dict((name, getattr(GUIpygame, name)) for name in self.options)
+        for (name, value) in self.options.items():
+            setattr(GUIpygame, name, value)
+
+    def tearDown(self):
+        for (name, value) in self.saved.items():
+            setattr(GUIpygame, name, value)
+
+    def widgets(self, groups):
+        '''Return all the widgets in groups, including child widgets.'''
+        result = []
+        def walk(widget):
+            result.append(widget)
+            for child_widget in getattr(widget, 'children', []):
+                walk(child_widget)
+        for group in groups:
+            for sprite in group.sprites():
+                walk(sprite)
+        return result
+
+    def prepare(self, size, groups):
+        '''Called with a scene's groups, before the scene is drawn.'''
+        for widget in self.widgets(groups):
+            for (name, value) in self.attrs.items():
+                if hasattr(widget, name):
+                    setattr(widget, name, value)
+
+    def mismatches(self, surface, golden):
+        '''Return how many pixels of surface differ from golden.'''
+        if not self.shift:
+            return self.golden.compare(surface, golden, self.tolerance)[0]
+        a = pygame.surfarray.array3d(surface).astype(numpy.int16)
+        b = pygame.surfarray.array3d(golden).astype(numpy.int16)
+        if a.shape != b.shape:
+            return a.shape[0] * a.shape[1]
+        diff = numpy.abs(a - b).max(axis=2)
+        for dx in range(-self.shift, self.shift+1):
+            diff = numpy.minimum(diff, numpy.abs(a - numpy.roll(b, dx, axis=0)).max(axis=2))
+        return int((diff > self.tolerance).sum())
+
+    def check(self, name):
+        scene_func = dict(self.golden.scenes)[name]
+        def scene():
+            (size, groups, events) = scene_func()
+            self.prepare(size, groups)
+            return (size, groups, events)
+        surface = self.golden.render_scene(scene)
+        golden = pygame.image.load(os.path.join(self.golden.GOLDEN_DIR, name + '.png'))
+        self.assertLessEqual(self.mismatches(surface, golden), self.max_bad)
+
+    def test_demo(self):
+        self.check('demo')
+
+    def test_msgbox(self):
+        self.check('msgbox')
+
+    def test_nested_titlebars(self):
+        self.check('nested_titlebars')
+
+    def test_scrollbars(self):
+        self.check('scrollbars')
+
+    def test_interaction(self):
+        self.check('interaction')
+
+    def test_every_scene_is_checked(self):
+        self.assertEqual(sorted([name for (name, scene_func) in self.golden.scenes]),
+                         sorted([name[5:] for name in dir(self) if name.startswith('test_')
+                                 and name != 'test_every_scene_is_checked']))
+
+
+class TestReplay(FakeClockTest):
+    '''Recording a session, and replaying it (see GUIpygame_replay).'''
+    def setUp(self):
+        FakeClockTest.setUp(self)
+        import GUIpygame_replay
+        self.replay = GUIpygame_replay
+        (fd, self.fname) = tempfile.mkstemp(suffix='.rec')
+        os.close(fd)
+
+    def tearDown(self):
+        FakeClockTest.tearDown(self)
+        GUIpygame.event_recorder = None
+        os.remove(self.fname)
+
+    def build(self):
+        self.ck = GUIpygame.Checkbox(pos=(40,10), text='check', Id='rp.ck')
+        self.te = GUIpygame.TextEditBox(text='', pos=(40,40), width=100, bgcolor=(255,255,255), Id='rp.te')
+        return GUIpygame.WidgetGroup(self.ck, self.te)
+
+    def state(self):
+        return (self.ck.checked, self.te.text)
+
+    def handle(self, group, ev):
+        '''Handle ev, and the events it causes, as an application would.'''
+        group.notify(ev)
+        for posted in pygame.event.get():
+            group.notify(posted)
+
+    def inputs(self):
+        '''Return the input events to play.'''
+        return [event(MOUSEBUTTONDOWN, pos=self.ck.rect.center, button=1),
+                event(MOUSEBUTTONUP, pos=self.ck.rect.center, button=1),
+                event(MOUSEBUTTONDOWN, pos=self.te.rect.center, button=1),
+                event(KEYDOWN, key=K_h, unicode='h', mod=0),
+                event(KEYDOWN, key=K_i, unicode='i', mod=0),
+                event(KEYDOWN, key=K_RETURN, unicode='\r', mod=0)]
+
+    def play(self, group):
+        '''Use the widgets, with a frame after each event.'''
+        show(group)
+        for ev in self.inputs():
+            self.now += 20
+            self.handle(group, ev)
+            show(group)
+
+    def record(self):
+        '''Record a session, and return the final state of the widgets.'''
+        group = self.build()
+        with self.replay.Recorder(self.fname):
+            self.play(group)
+        return self.state()
+
+    def test_round_trip(self):
+        self.build()
+        expected_inputs = [(ev.type, ev.dict) for ev in self.inputs()]
+        expected = self.record()
+        self.assertEqual(expected, (True, 'hi'))
+        (size, records) = self.replay.read_recording(self.fname)
+        self.assertEqual(size, pygame.display.get_surface().get_size())
+        self.assertEqual([(rec.event.type, rec.event.dict) for rec in records if rec.kind == self.replay.INPUT],
+                         expected_inputs)
+        self.assertEqual([rec.event.Id for rec in records if rec.kind == self.replay.RESULT],
+                         ['rp.ck', 'rp.te'])
+        self.assertEqual(len([rec for rec in records if rec.kind == self.replay.FRAME]), 7)
+        times = [rec.time for rec in records]
+        self.assertEqual(times, sorted(times))
+        self.assertEqual(times[-1], 120)
+        saved_clock = GUIpygame.clock
+        group = self.build()
+        report = self.replay.replay(self.fname, group)
+        self.assertIs(GUIpygame.clock, saved_clock)  # it's put back afterwards
+        self.assertEqual(report.mismatches, [])
+        self.assertEqual(self.state(), expected)
+        self.assertEqual(len(report.latencies), 6)
+        self.assertIn('the result events match the recording', report.summary())
+
+    def test_mismatch(self):
+        self.record()
+        group = self.build()
+        self.ck.checked = True  # so clicking it unchecks it
+        report = self.replay.replay(self.fname, group)
+        self.assertEqual(len(report.mismatches), 1)
+        (position, recorded, replayed) = report.mismatches[0]
+        self.assertEqual((recorded.checked, replayed.checked), (True, False))
+
+    def test_one_recorder_at_a_time(self):
+        with self.replay.Recorder(self.fname):
+            self.assertRaises(RuntimeError, self.replay.Recorder, self.fname)
+        self.assertIsNone(GUIpygame.event_recorder)
+
+
+class TestReplayTimers(TestReplay):
+    '''Replaying a session in which a held-down ScrollBar arrow auto-repeats,
+    so that value changes come from timers and from the frames.
+    '''
+    def build(self):
+        self.sb = GUIpygame.ScrollBar(pos=(10,100), size=200, small_inc=1.0, Id='rp.sb')
+        self.sb.set_autorepeat(delay=40, interval=20, accel=1.0, min_interval=20)
+        self.arrow = self.sb.children.sprites()[4]
+        return GUIpygame.WidgetGroup(self.sb)
+
+    def state(self):
+        return self.sb.value
+
+    def inputs(self):
+        hold = event(MOUSEMOTION, pos=self.arrow.rect.center, rel=(0,0), buttons=(1,0,0))
+        return ([event(MOUSEBUTTONDOWN, pos=self.arrow.rect.center, button=1)] + [hold] * 6 +
+                [event(MOUSEBUTTONUP, pos=self.arrow.rect.center, button=1)])
+
+    def test_round_trip(self):
+        expected = self.record()
+        self.assertGreater(expected, 3.0)
+        (size, records) = self.replay.read_recording(self.fname)
+        results = [rec.event for rec in records if rec.kind == self.replay.RESULT]
+        self.assertEqual([ev.value for ev in results], sorted(set(ev.value for ev in results)))
+        self.assertTrue([rec for rec in records if rec.kind == self.replay.TIMERS])
+        report = self.replay.replay(self.fname, self.build())
+        self.assertEqual(report.mismatches, [])
+        self.assertEqual(self.state(), expected)
+
+    def test_mismatch(self):
+        self.record()
+        group = self.build()
+        self.sb.set_autorepeat(delay=0)
+        report = self.replay.replay(self.fname, group)
+        self.assertTrue(report.mismatches)
+
+
+class TestGlyphAtlas(unittest.TestCase):
+    '''Drawing text from a GlyphAtlas, instead of with font.render().'''
+    def test_same_size_as_font_render(self):
+        font = GUIpygame.vera
+        atlas = GUIpygame.get_glyph_atlas(font, (0,0,0))
+        self.assertIs(GUIpygame.get_glyph_atlas(font, [0,0,0]), atlas)
+        for text in ['Hello, world', 'This is a resizeable window', 'x', '']:
+            (width, height) = font.size(text)
+            self.assertLessEqual(abs(atlas.size(text)[0] - width), 1, text)
+            self.assertEqual(atlas.render(text).get_size(), atlas.size(text))
+        self.assertIs(atlas.render('Hello, world'), atlas.render('Hello, world'))  # kept
+
+    def test_labels(self):
+        plain = GUIpygame.Label('Glyph atlas', pos=(0,0), bgcolor=(255,255,255))
+        fast = GUIpygame.Label('Glyph atlas', pos=(0,0), bgcolor=(255,255,255), use_glyph_atlas=True)
+        show(GUIpygame.WidgetGroup(plain, fast))
+        self.assertLessEqual(abs(fast.rect.width - plain.rect.width), 1)
+        fast.set_text('Glyph atlas!')
+        fast.update()
+        self.assertIn('Glyph atlas!', GUIpygame.get_glyph_atlas(fast.font, fast.color).strings)
+
+
+class TestGoldenGlyphAtlas(TestGolden):
+    '''The golden scenes, with the text of every Label, TextEditBox and
+    Titlebar drawn from a glyph atlas.  (That can put a glyph a pixel away
+    from where font.render() puts it, so that much is allowed.)
+    '''
+    attrs = {'use_glyph_atlas': True}
+    tolerance = 64
+    shift = 1
+    max_bad = 40
+
+
+class TestFonts(unittest.TestCase):
+    '''Shared fonts, and cached text measurements (see get_font).'''
+    missing = os.path.join(tempfile.gettempdir(), 'no such font.ttf')
+
+    def tearDown(self):
+        GUIpygame.missing_font_files.discard(os.path.abspath(self.missing))
+
+    def get_font(self, *args, **kwargs):
+        '''Return GUIpygame.get_font(*args, **kwargs), and what it printed.'''
+        saved = sys.stdout
+        sys.stdout = io.StringIO()
+        try:
+            font = GUIpygame.get_font(*args, **kwargs)
+            return (font, sys.stdout.getvalue())
+        finally:
+            sys.stdout = saved
+
+    def test_shared(self):
+        self.assertIs(GUIpygame.get_font(None, 12), GUIpygame.vera)
+        self.assertIs(GUIpygame.get_font(None, 18), GUIpygame.get_font(None, 18))
+        self.assertIsNot(GUIpygame.get_font(None, 18), GUIpygame.get_font(None, 18, bold=True))
+
+    def test_fallback_sizes(self):
+        (font, printed) = self.get_font(self.missing, 36)
+        self.assertIs(font, GUIpygame.get_sysfont(GUIpygame.fallback_fonts, 36))
+        (font, printed) = self.get_font(self.missing, 12, fallback_size=13)
+        self.assertIs(font, GUIpygame.get_sysfont(GUIpygame.fallback_fonts, 13))
+
+    def test_warns_once_per_file(self):
+        warnings = [self.get_font(self.missing, size)[1] for size in (10, 18, 36)]
+        self.assertIn('could not load', warnings[0])
+        self.assertEqual(warnings[1:], ['', ''])
+
+    def test_text_size(self):
+        font = GUIpygame.get_font(None, 18)
+        self.assertEqual(GUIpygame.text_size(font, 'Hello'), font.size('Hello'))
+        self.assertIs(GUIpygame.text_size(font, 'Hello'), GUIpygame.text_size(font, 'Hello'))
+
+
+class TestButtonStateImages(unittest.TestCase):
+    '''SimpleButtons keep their rendered up, down and hover images.'''
+    def setUp(self):
+        self.button = GUIpygame.SimpleButton('Press me', pos=(10,10), Id='bsi.b')
+        self.group = GUIpygame.WidgetGroup(self.button)
+        show(self.group)
+
+    def click(self, typ):
+        self.group.notify(event(typ, pos=self.button.rect.center, button=1))
+        show(self.group)
+
+    def test_images_are_reused(self):
+        up = self.button.image
+        self.click(MOUSEBUTTONDOWN)
+        down = self.button.image
+        self.assertIsNot(down, up)
+        self.click(MOUSEBUTTONUP)
+        self.assertIs(self.button.image, up)
+        self.click(MOUSEBUTTONDOWN)
+        self.assertIs(self.button.image, down)
+        self.assertEqual(len(self.button.state_images), 2)
+
+    def test_images_look_right(self):
+        self.click(MOUSEBUTTONDOWN)
+        self.click(MOUSEBUTTONUP)
+        fresh = GUIpygame.SimpleButton('Press me', pos=(10,10))
+        show(GUIpygame.WidgetGroup(fresh))
+        self.assertEqual(pygame.image.tostring(self.button.image, 'RGB'),
+                         pygame.image.tostring(fresh.image, 'RGB'))
+
+    def test_new_appearance(self):
+        up = self.button.image
+        self.button.set_text('Now press me', adjustwidth=True)
+        show(self.group)
+        self.assertIsNot(self.button.image, up)
+        self.assertEqual(self.button.image.get_size(), self.button.rect.size)
+        self.assertEqual(list(self.button.state_images.values()), [self.button.image])
+
+
+class TestBoxChrome(unittest.TestCase):
+    '''Two-color boxes are drawn from cached strips (see bevel_chrome).'''
+    colors = ((230,230,230), (83,83,83))
+
+    def reference(self, size):
+        '''Draw the box the way pygame.draw would.'''
+        surface = pygame.Surface(size)
+        surface.fill((255,255,255))
+        (w, h) = size
+        pygame.draw.lines(surface, self.colors[1], False, [(w-1,1), (w-1,h-1), (1,h-1)])
+        pygame.draw.lines(surface, self.colors[0], False, [(0,h-1), (0,0), (w-1,0)])
+        return pygame.image.tostring(surface, 'RGB')
+
+    def test_same_as_lines(self):
+        for size in [(2,2), (3,7), (40,18), (200,3)]:
+            widget = block(*size)
+            widget.image.fill((255,255,255))
+            widget._box_around(self.colors)
+            self.assertEqual(pygame.image.tostring(widget.image, 'RGB'), self.reference(size), size)
+
+    def test_strips_are_shared(self):
+        layout = GUIpygame.bevel_chrome(self.colors, (40,18))
+        self.assertIs(GUIpygame.bevel_chrome([list(c) for c in self.colors], (40,18)), layout)
+        strips = [strip for (strip, pos) in GUIpygame.bevel_chrome(self.colors, (40,30))]
+        self.assertIn(layout[3][0], strips)  # the same top edge
+
+    def test_cache_is_bounded(self):
+        saved = GUIpygame.CHROME_CACHE_MAX
+        GUIpygame.CHROME_CACHE_MAX = 10
+        try:
+            for width in range(2, 40):
+                GUIpygame.bevel_chrome(self.colors, (width, 5))
+            self.assertLessEqual(len(GUIpygame.chrome_layouts), 10)
+            self.assertLessEqual(len(GUIpygame.chrome_strips), 10)
+        finally:
+            GUIpygame.CHROME_CACHE_MAX = saved
+
+
+class TestIncrementalComposition(SessionTest):
+    '''compose_incrementally=True mustn't change what ends up on the screen.'''
+    def test_random_sessions(self):
+        self.assertSameSessions(compose_incrementally=True)
+
+    def test_invalidate(self):
+        saved = GUIpygame.compose_incrementally
+        GUIpygame.compose_incrementally = True
+        try:
+            container = form(100, 100)
+            image = GUIpygame.Image(pygame.Surface((20,20)))
+            container.add_widgets(image)
+            show(GUIpygame.WidgetGroup(container))
+            image.pic.fill((255,0,0))  # drawing on it behind its back...
+            show(GUIpygame.WidgetGroup(container))
+            self.assertNotEqual(tuple(container.image.get_at((5,5)))[:3], (255,0,0))  # skipped...
+            image.invalidate()
+            show(GUIpygame.WidgetGroup(container))
+            self.assertEqual(tuple(container.image.get_at((5,5)))[:3], (255,0,0))  # ...until invalidated
+        finally:
+            GUIpygame.compose_incrementally = saved
+
+
+class TestGoldenIncremental(TestGolden):
+    options = {'compose_incrementally': True}
+
+
+class TestSubsurfaces(SessionTest):
+    '''Child widgets rendering straight into subsurfaces of their form's
+    image (see BasicForm's use_subsurfaces), which mustn't change what ends
+    up on the screen.
+    '''
+    def nested(self, use_subsurfaces):
+        '''Return a WidgetGroup of forms within titlebar-wrapped forms.'''
+        self.inner = GUIpygame.BasicForm(rect=(0,0,150,80), bgcolor=(240,240,255), Id='ss.inner')
+        self.child = GUIpygame.Label('child', pos=(10,10), bgcolor=(255,255,0), Id='ss.child')
+        self.inner.add_widgets(self.child, GUIpygame.Label('sibling', pos=(10,45), bgcolor=(200,255,200)))
+        self.inner.relative_rect.topleft = (10, 30)
+        self.window = GUIpygame.wrap_in_titlebar(self.inner, 'inner')
+        middle = GUIpygame.BasicForm(rect=(0,0,220,160), bgcolor=(230,255,230), Id='ss.middle')
+        middle.add_widgets(GUIpygame.Label('middle', pos=(5,5)), self.window)
+        middle = GUIpygame.wrap_in_titlebar(middle, 'middle')
+        middle.relative_rect.topleft = (15, 40)
+        self.outer = GUIpygame.Form(rect=(10,10,300,240), bgcolor=(255,250,230), title='outer', Id='ss.outer')
+        self.outer.add_widgets(middle)
+        def walk(widget):
+            if isinstance(widget, GUIpygame.BasicForm):
+                widget.use_subsurfaces = use_subsurfaces
+            for child_widget in widget.children:
+                walk(child_widget)
+        walk(self.outer)
+        return GUIpygame.WidgetGroup(self.outer)
+
+    def assertSameChanges(self, *changes):
+        '''Check that the nested forms look the same with and without
+        subsurfaces, at first and after each of the changes (functions of no
+        arguments, called with self.child etc. set).
+        '''
+        screens = []
+        for use_subsurfaces in (False, True):
+            group = self.nested(use_subsurfaces)
+            show(group)
+            shots = [pygame.image.tostring(self.outer.image, 'RGB')]
+            for change in changes:
+                change()
+                show(group)
+                shots.append(pygame.image.tostring(self.outer.image, 'RGB'))
+            screens.append(shots)
+            if use_subsurfaces:
+                self.assertIsNotNone(self.window.image.get_parent())
+            for widget in list(group):
+                widget.kill()
+        differ = [i for i in range(len(changes)+1) if screens[0][i] != screens[1][i]]
+        self.assertEqual(differ, [])
+
+    def test_renders_into_subsurfaces(self):
+        group = self.nested(True)
+        show(group)
+        self.assertIsNotNone(self.child.image.get_parent())
+        self.assertIsNotNone(self.inner.image.get_parent())
+        self.assertIsNone(self.outer.image.get_parent())
+
+    def test_same_pixels(self):
+        self.assertSameChanges()
+
+    def test_move_child(self):
+        self.assertSameChanges(lambda: self.child.relative_rect.move_ip(20, 5),
+                               lambda: self.child.relative_rect.move_ip(-15, 0))
+
+    def test_move_child_out_and_back(self):
+        def out():
+            self.child.relative_rect.left = 130  # partly outside its form
+        def back():
+            self.child.relative_rect.left = 10
+        self.assertSameChanges(out, back, out)
+
+    def test_move_child_onto_sibling(self):
+        self.assertSameChanges(lambda: self.child.relative_rect.move_ip(0, 30),
+                               lambda: self.child.relative_rect.move_ip(0, -30))
+
+    def test_resize_child(self):
+        self.assertSameChanges(lambda: self.child.set_text('a longer child'),
+                               lambda: self.child.set_text('c'))
+
+    def test_move_and_resize_window(self):
+        def grow():
+            self.inner.rect.size = (180, 100)
+        self.assertSameChanges(lambda: self.window.relative_rect.move_ip(30, 20), grow,
+                               lambda: self.window.relative_rect.move_ip(-40, 0))
+
+    def test_random_sessions(self):
+        self.assertSameSessions(use_subsurfaces=True)
+
+    def test_random_sessions_composed_incrementally(self):
+        self.assertSameSessions(use_subsurfaces=True, compose_incrementally=True)
+
+
+class TestGoldenSubsurfaces(TestGolden):
+    attrs = {'use_subsurfaces': True}
+
+
+class CountingImage(GUIpygame.Image):
+    '''An Image which counts its updates.'''
+    updates = 0
+
+    def update(self):
+        self.updates += 1
+        GUIpygame.Image.update(self)
+
+
+class TestOcclusion(unittest.TestCase):
+    '''Not updating or drawing widgets hidden under opaque widgets (see
+    cull_occluded_widgets).  A red widget at (20,20) is under another one.
+    '''
+    def setUp(self):
+        self.screen = pygame.display.get_surface()
+        self.saved = GUIpygame.cull_occluded_widgets
+
+    def tearDown(self):
+        GUIpygame.cull_occluded_widgets = self.saved
+
+    def draw(self, front_rect, front_bgcolor=(0,0,255), alpha=None):
+        '''Draw the red widget under another (blue, by default) one, with
+        culling on and off, check that they look the same, and return how
+        often the red one was updated with culling on, and the screen.
+        '''
+        results = []
+        for cull in (True, False):
+            GUIpygame.cull_occluded_widgets = cull
+            self.back = CountingImage(size=(100,100), pos=(20,20), bgcolor=(255,0,0))
+            self.front = GUIpygame.Image(size=front_rect[2:], pos=front_rect[:2], bgcolor=front_bgcolor)
+            group = GUIpygame.WidgetGroup(self.back, self.front)
+            show(group)  # (the first update is in the constructor)
+            if alpha is not None:
+                self.front.image.set_alpha(alpha)
+            self.back.updates = 0
+            self.screen.fill((255,255,255))
+            show(group)
+            results.append( (self.back.updates, pygame.image.tostring(self.screen, 'RGB')) )
+            GUIpygame.done_drawing()
+        self.assertEqual(results[0][1], results[1][1])
+        self.assertEqual(results[1][0], 1)  # culling off: always updated
+        return results[0]
+
+    def pixel(self, pos):
+        return tuple(self.screen.get_at(pos))[:3]
+
+    def test_fully_covered(self):
+        (updates, screen) = self.draw((10,10,150,150))
+        self.assertEqual(updates, 0)
+
+    def test_partly_covered(self):
+        (updates, screen) = self.draw((60,60,150,150))
+        self.assertEqual(updates, 1)
+        self.assertEqual(self.pixel((30,30)), (255,0,0))
+        self.assertEqual(self.pixel((70,70)), (0,0,255))
+
+    def test_transparent_occluder(self):
+        (updates, screen) = self.draw((10,10,150,150), front_bgcolor=(0,0,255,128))
+        self.assertEqual(updates, 1)
+
+    def test_occluder_with_surface_alpha(self):
+        (updates, screen) = self.draw((10,10,150,150), alpha=128)
+        self.assertEqual(updates, 1)
+
+    def test_occluder_without_bgcolor(self):
+        (updates, screen) = self.draw((10,10,150,150), front_bgcolor=None)
+        self.assertEqual(updates, 1)
+        self.assertEqual(self.pixel((30,30)), (255,0,0))
+
+    def test_uncovered_before_drawing(self):
+        self.back = CountingImage(size=(100,100), pos=(20,20), bgcolor=(255,0,0))
+        self.front = GUIpygame.Image(size=(150,150), pos=(10,10), bgcolor=(0,0,255))
+        group = GUIpygame.WidgetGroup(self.back, self.front)
+        show(group)
+        self.back.updates = 0
+        group.update()
+        self.assertEqual(self.back.updates, 0)
+        self.front.rect.topleft = (300, 300)  # moved between update and draw
+        group.draw(self.screen)
+        self.assertEqual(self.back.updates, 1)  # updated after all
+        self.assertEqual(self.pixel((30,30)), (255,0,0))
+        GUIpygame.done_drawing()
+
+    def test_draw_returns_changed_areas(self):
+        self.back = CountingImage(size=(100,100), pos=(20,20), bgcolor=(255,0,0))
+        self.front = GUIpygame.Image(size=(150,150), pos=(10,10), bgcolor=(0,0,255))
+        group = GUIpygame.WidgetGroup(self.back, self.front)
+        group.update()
+        self.assertEqual(group.draw(self.screen), [Rect(20,20,100,100), Rect(10,10,150,150)])
+        self.front.rect.topleft = (300, 300)
+        group.update()
+        self.assertEqual(group.draw(self.screen), [Rect(20,20,100,100), Rect(300,300,150,150),
+                                                   Rect(10,10,150,150)])  # (new, then old)
+        GUIpygame.done_drawing()
+
+
+class TestFreezeWhileDragging(unittest.TestCase):
+    '''A top-level widget isn't redrawn while it's being dragged (see
+    freeze_dragged_widgets).
+    '''
+    def setUp(self):
+        self.form = GUIpygame.BasicForm(rect=(0,0,200,100), bgcolor=(255,255,255), Id='fr.form')
+        self.button = GUIpygame.SimpleButton('Push', pos=(20,20), Id='fr.b')
+        self.form.add_widgets(self.button)
+        self.window = GUIpygame.wrap_in_titlebar(self.form, 'Drag me')
+        self.window.rect.topleft = (50,50)
+        self.group = GUIpygame.WidgetGroup(self.window)
+        show(self.group)
+        titlebar = self.window.children.sprites()[0]
+        self.grip = (titlebar.rect.left + 5, titlebar.rect.centery)
+
+    def tearDown(self):
+        self.group.notify(event(MOUSEBUTTONUP, pos=(0,0), button=1))
+
+    def drag(self, dx, dy):
+        self.group.notify(event(MOUSEBUTTONDOWN, pos=self.grip, button=1))
+        self.grip = (self.grip[0]+dx, self.grip[1]+dy)
+        self.group.notify(event(MOUSEMOTION, pos=self.grip, rel=(dx,dy), buttons=(1,0,0)))
+
+    def drop(self):
+        self.group.notify(event(MOUSEBUTTONUP, pos=self.grip, button=1))
+
+    def test_drag(self):
+        (image, version) = (self.window.image, self.window.image_version)
+        self.drag(30, 40)
+        self.assertIs(GUIpygame.frozen_widget, self.window)
+        self.assertEqual(self.window.rect.topleft, (80,90))
+        show(self.group)
+        self.assertIs(self.window.image, image)
+        self.assertEqual(self.window.image_version, version)  # not redrawn
+
+    def test_drop(self):
+        self.drag(30, 40)
+        show(self.group)
+        self.drop()
+        self.assertIsNone(GUIpygame.frozen_widget)
+        self.assertIsNone(GUIpygame.widget_being_dragged)
+        self.assertEqual(self.button.rect.topleft, (100, 90+21+20))
+        version = self.window.image_version
+        show(self.group)
+        self.assertNotEqual(self.window.image_version, version)
+
+    def test_hit_test_while_dragging(self):
+        self.drag(30, 40)
+        self.drag(-10, 5)
+        center = (80-10+20+5, 90+5+21+20+5)
+        self.assertTrue(self.button.top_collidepoint(center))
+        self.assertEqual(self.button.rect.topleft, (90, 136))
+        self.assertIs(self.form.children.get_widget_at(center), self.button)
+        self.assertFalse(self.button.collidepoint((75, 96)))  # where it was
+
+    def test_not_frozen(self):
+        saved = GUIpygame.freeze_dragged_widgets
+        GUIpygame.freeze_dragged_widgets = False
+        try:
+            version = self.window.image_version
+            self.drag(30, 40)
+            self.assertIsNone(GUIpygame.frozen_widget)
+            show(self.group)
+            self.assertNotEqual(self.window.image_version, version)
+        finally:
+            GUIpygame.freeze_dragged_widgets = saved
+
+
+class TestFreezeRemoval(TestFreezeWhileDragging):
+    '''Removing a widget while it's being dragged ends the drag.'''
+    def test_removed_while_dragging(self):
+        self.drag(30, 40)
+        self.group.remove(self.window)
+        self.assertIsNone(GUIpygame.frozen_widget)
+        self.assertIsNone(GUIpygame.widget_being_dragged)
+        self.assertEqual(self.button.rect.topleft, (100, 131))
+
+    def test_killed_while_dragging(self):
+        self.drag(30, 40)
+        self.window.kill()
+        self.assertIsNone(GUIpygame.frozen_widget)
+        other = GUIpygame.BasicForm(rect=(0,0,50,50), bgcolor=(0,0,0), draggable=True)
+        group = GUIpygame.WidgetGroup(other)
+        show(group)
+        group.notify(event(MOUSEBUTTONDOWN, pos=(5,5), button=1))
+        group.notify(event(MOUSEMOTION, pos=(15,15), rel=(10,10), buttons=(1,0,0)))
+        self.assertIs(GUIpygame.frozen_widget, other)
+        group.notify(event(MOUSEBUTTONUP, pos=(15,15), button=1))
+
+
+class TestLayouts(unittest.TestCase):
+    '''Box and Grid layouts (see "laying out child widgets").'''
+    def test_box_fits_container(self):
+        container = form()
+        box = container.set_layout(GUIpygame.Box(padding=5, spacing=2))
+        (a, b) = (box.add(block(30,10)), box.add(block(50,20)))
+        container.update()
+        self.assertEqual(container.rect.size, (60, 42))
+        self.assertEqual(tuple(a.relative_rect), (5, 5, 50, 10))  # 'fill' makes it as wide as b
+        self.assertEqual(tuple(b.relative_rect), (5, 17, 50, 20))
+        self.assertTrue(container.children.has(a, b))
+
+    def test_stretch_and_max_size(self):
+        container = form(200, 30)
+        row = container.set_layout(GUIpygame.Box(horizontal=True, fit=False))
+        a = row.add(block(20,10), stretch=1)
+        b = row.add(block(30,10))
+        c = row.add(block(10,10), stretch=1, max_size=(40, None))
+        container.update()
+        self.assertEqual(container.rect.size, (200, 30))
+        self.assertEqual([w.relative_rect.width for w in (a, b, c)], [130, 30, 40])
+        self.assertEqual([w.relative_rect.left for w in (a, b, c)], [0, 130, 160])
+
+    def test_grid(self):
+        container = form()
+        grid = container.set_layout(GUIpygame.Grid(columns=2, spacing=(4,3), align='start'))
+        widgets = [grid.add(block(w, h)) for (w, h) in ((10,5), (20,8), (15,12))]
+        container.update()
+        self.assertEqual(container.rect.size, (15+4+20, 8+3+12))
+        self.assertEqual([w.relative_rect.topleft for w in widgets], [(0,0), (19,0), (0,11)])
+
+    def test_relayout_when_a_widget_resizes_itself(self):
+        container = form()
+        box = container.set_layout(GUIpygame.Box())
+        label = box.add(GUIpygame.Label('short'))
+        container.update()
+        width = container.rect.width
+        label.set_text('a much longer text', adjustwidth=True)
+        container.update()
+        self.assertGreater(container.rect.width, width)
+
+    def test_widgets_go_below_the_titlebar(self):
+        container = GUIpygame.Form(rect=(0,0,100,100), title='T')
+        box = container.set_layout(GUIpygame.Box(fit=False))
+        a = box.add(block(10,10))
+        container.update()
+        self.assertEqual(a.relative_rect.top, container.titlebar.rect.height)
+
+    def check_removal(self, remove):
+        '''Check that remove(container, widget) takes the widget out of the
+        container's layout.
+        '''
+        container = form()
+        box = container.set_layout(GUIpygame.Box())
+        box.add(block(10,10))
+        victim = box.add(block(10,20))
+        container.update()
+        self.assertEqual(container.rect.height, 30)
+        remove(container, victim)
+        container.update()
+        self.assertEqual(container.rect.height, 10)
+        self.assertNotIn(victim, box.widgets())
+        box.add(block(10,5))  # mustn't bring back the removed widget
+        container.update()
+        self.assertFalse(container.children.has(victim))
+        self.assertEqual(container.rect.height, 15)
+
+    def test_remove_widgets(self):
+        self.check_removal(lambda container, widget: container.remove_widgets(widget))
+
+    def test_remove_nested_widgets(self):
+        self.check_removal(lambda container, widget: container.remove_nested_widgets(widget))
+
+    def test_kill(self):
+        self.check_removal(lambda container, widget: widget.kill())
+
+    def test_children_remove(self):
+        self.check_removal(lambda container, widget: container.children.remove(widget))
+
+    def test_menu_shrinks_when_a_button_is_removed(self):
+        menu = GUIpygame.Menu.ActionMenu('a|bb|ccc')
+        menu.update()
+        height = menu.rect.height
+        menu.remove_nested_widgets(menu.children.sprites()[-1])
+        menu.update()
+        self.assertEqual(menu.rect.height, height - menu.children.sprites()[-1].rect.height)
+
+    def test_dialog_box_buttons(self):
+        for w in (300, 301, 302):
+            h = w // 2
+            dialog = GUIpygame.DialogBox(width=w, msg='Hello', buttons='Yes|No|Maybe')
+            dialog.update()
+            buttons = dialog.children.sprites()[2:]
+            top = dialog.titlebar.rect.height + ((h-20) // 2)
+            self.assertEqual([b.relative_rect.topleft for b in buttons],
+                             [(10 + (i * (w // 3)), top) for i in range(3)])
+
+    def test_small_dialog_box(self):
+        for (w, msg) in ((30, 'Hi'), (60, 'Hi'), (100, 'Short'), (120, 'A short, wide message')):
+            dialog = GUIpygame.DialogBox(width=w, msg=msg, buttons='OK|Cancel')
+            dialog.update()
+            message = dialog.children.sprites()[1]
+            for button in dialog.children.sprites()[2:]:
+                self.assertGreaterEqual(button.relative_rect.top, message.relative_rect.bottom, msg)
+                self.assertLessEqual(button.relative_rect.bottom, dialog.rect.height - 10, msg)
+
+    def test_homogeneous_box_uses_all_the_room(self):
+        row = form(110, 20)
+        box = row.set_layout(GUIpygame.Box(horizontal=True, homogeneous=True, fit=False))
+        widgets = [box.add(block(10, 10)) for i in range(4)]
+        row.update()
+        self.assertEqual([w.relative_rect.width for w in widgets], [27, 28, 27, 28])
+        self.assertEqual(widgets[-1].relative_rect.right, 110)
+
+
+class TestAnchors(unittest.TestCase):
+    '''Anchoring top-level widgets to the display (see Widget.set_anchor).
+    The display is 640x480.
+    '''
+    def anchored(self, **anchor):
+        widget = block(100, 50)
+        widget.set_anchor(**anchor)
+        show(GUIpygame.WidgetGroup(widget))
+        return widget.rect
+
+    def test_pixels(self):
+        self.assertEqual(self.anchored(right=10, bottom=20), Rect(530,410,100,50))
+        self.assertEqual(self.anchored(centerx=0, top=5), Rect(270,5,100,50))
+        self.assertEqual(self.anchored(centerx=-20, centery=10), Rect(250,225,100,50))
+
+    def test_percentages(self):
+        self.assertEqual(self.anchored(left='25%', top='10%'), Rect(160,48,100,50))
+        self.assertEqual(self.anchored(right='50%', bottom='0%'), Rect(220,430,100,50))
+        self.assertEqual(self.anchored(centerx='25%', centery='50%'), Rect(110,215,100,50))
+
+    def test_stretched(self):
+        self.assertEqual(self.anchored(left=10, right=10), Rect(10,0,620,50))
+        self.assertEqual(self.anchored(left='10%', right='10%', top=0, bottom=0), Rect(64,0,512,480))
+
+    def test_dock(self):
+        self.assertEqual(self.anchored(dock='bottom'), Rect(0,430,640,50))
+        self.assertEqual(self.anchored(dock='right'), Rect(540,0,100,480))
+        self.assertEqual(self.anchored(dock='fill'), Rect(0,0,640,480))
+        self.assertEqual(self.anchored(dock='top', left=40), Rect(40,0,600,50))  # explicit edges win
+
+    def test_other_widgets(self):
+        status = block(100, 20)
+        status.set_anchor(dock='bottom')
+        side = block(30, 30)
+        side.set_anchor(right=0, top=0, bottom=status)
+        group = GUIpygame.WidgetGroup(side, status)
+        show(group)
+        self.assertEqual(side.rect, Rect(610,0,30,480))  # lined up with the status bar's bottom
+        status.set_anchor(dock='top')  # re-anchoring the other widget moves this one too
+        show(group)
+        self.assertEqual(side.rect, Rect(610,0,30,20))
+
+    def test_display_resized(self):
+        widget = block(100, 50)
+        widget.set_anchor(right=10, bottom=10)
+        group = GUIpygame.WidgetGroup(widget)
+        show(group)
+        pygame.display.set_mode((800, 600))
+        try:
+            show(group)
+            self.assertEqual(widget.rect.topleft, (690, 540))
+        finally:
+            pygame.display.set_mode((640, 480))
+        widget.set_anchor()
+        show(group)
+        self.assertEqual(widget.rect.topleft, (690, 540))  # no longer anchored
+
+
+class TestAnchorSurfaces(unittest.TestCase):
+    '''Anchoring widgets to a surface other than the display.'''
+    def test_group_surface_size(self):
+        widget = block(100, 50)
+        widget.set_anchor(right=0, bottom=0)
+        group = GUIpygame.WidgetGroup(widget)
+        group.surface_size = (300, 200)
+        group.update()
+        self.assertEqual(widget.rect.topleft, (200, 150))
+
+    def test_offscreen(self):
+        import GUIpygame_offscreen
+        scene = {'size': [300, 200], 'bgcolor': [255,255,255],
+                 'widgets': [{'type': 'Image', 'args': {'size': [100,50], 'bgcolor': [0,0,0]},
+                              'attrs': {}}]}
+        widget = GUIpygame_offscreen.build(scene['widgets'][0])
+        widget.set_anchor(right=0, bottom=0)
+        surface = pygame.Surface((300, 200))
+        surface.fill((255,255,255))
+        widget.anchor_surface_size = surface.get_size()
+        widget.update()
+        self.assertEqual(widget.rect.topleft, (200, 150))
+
+
+class TestResizePreview(unittest.TestCase):
+    '''Showing a cheap preview of a widget while it's being resized (see
+    resize_preview).
+    '''
+    def setUp(self):
+        self.widget = GUIpygame.Form(rect=(10,10,150,100), title='Resize me', Id='rs.form')
+        self.widget.add_widgets(GUIpygame.Label('A label', pos=(10,30)))
+        self.group = GUIpygame.WidgetGroup(self.widget)
+        show(self.group)
+        self.before = self.widget.image.copy()
+
+    def resize(self, preview, dw=50, dh=30):
+        self.widget.resize_preview = preview
+        self.widget.resizing = True
+        self.widget.rect.width += dw
+        self.widget.rect.height += dh
+        show(self.group)
+
+    def release(self):
+        self.widget.resizing = False
+        self.widget._end_resize_preview()
+        show(self.group)
+
+    def test_scaled(self):
+        self.resize('scaled')
+        self.assertEqual(self.widget.image.get_size(), (200,130))
+        expected = pygame.transform.scale(self.before, (200,130))
+        self.assertEqual(pygame.image.tostring(self.widget.image, 'RGB'), pygame.image.tostring(expected, 'RGB'))
+
+    def test_outline(self):
+        self.resize('outline')
+        image = self.widget.image
+        self.assertEqual(image.get_size(), (200,130))
+        self.assertEqual(tuple(image.get_at((199,129)))[:3], (0,0,0))  # the outline
+        self.assertEqual(tuple(image.get_at((120,80))), tuple(self.before.get_at((120,80))))
+        self.assertEqual(tuple(image.get_at((170,60)))[:3], self.widget.bgcolor[:3])
+
+    def test_preview_is_reused(self):
+        self.resize('scaled')
+        preview = self.widget.image
+        show(self.group)
+        self.assertIs(self.widget.image, preview)
+        self.resize('scaled', 10, 0)
+        self.assertEqual(self.widget.image.get_size(), (210,130))
+
+    def test_redrawn_when_released(self):
+        for preview in ('scaled', 'outline', 'live'):
+            self.resize(preview)
+            self.release()
+            fresh = GUIpygame.Form(rect=(10,10,200,130), title='Resize me', Id='rs.fresh')
+            fresh.add_widgets(GUIpygame.Label('A label', pos=(10,30)))
+            show(GUIpygame.WidgetGroup(fresh))
+            self.assertEqual(pygame.image.tostring(self.widget.image, 'RGB'),
+                             pygame.image.tostring(fresh.image, 'RGB'), preview)
+            self.widget.rect.size = (150,100)
+            show(self.group)
+
+    def test_global_setting(self):
+        saved = GUIpygame.resize_preview
+        GUIpygame.resize_preview = 'scaled'
+        try:
+            version = self.widget.image_version
+            self.widget.resizing = True
+            self.widget.rect.width += 20
+            show(self.group)
+            self.assertEqual(self.widget.image_version, version)  # not redrawn
+            self.widget.resize_preview = 'live'  # the widget's own setting wins
+            self.widget.rect.width += 20
+            show(self.group)
+            self.assertNotEqual(self.widget.image_version, version)
+        finally:
+            GUIpygame.resize_preview = saved
+
+
+class TestGoldenResizePreview(TestGolden):
+    '''The golden scenes, after every top-level widget has been previewed
+    at another size (see resize_preview), and then put back.
+    '''
+    options = {'resize_preview': 'scaled'}
+
+    def prepare(self, size, groups):
+        scratch = pygame.Surface(size)
+        for group in groups:
+            widgets = [sprite for sprite in group.sprites() if isinstance(sprite, GUIpygame.Widget)]
+            for widget in widgets:
+                widget.resizing = True
+                widget.rect.width += 30
+                widget.rect.height += 20
+            group.update()
+            group.draw(scratch)
+            for widget in widgets:
+                self.assertEqual(widget.image.get_size(), tuple(widget.rect.size))
+                widget.rect.width -= 30
+                widget.rect.height -= 20
+                widget.resizing = False
+                widget._end_resize_preview()
+        GUIpygame.done_drawing()
+        TestGolden.prepare(self, size, groups)
+
+
+class TestGoldenResizeOutline(TestGoldenResizePreview):
+    options = {'resize_preview': 'outline'}
+
+
+class TestSharedImages(unittest.TestCase):
+    '''Identical widgets sharing one image (see share_identical_images).'''
+    def setUp(self):
+        self.saved = (GUIpygame.compose_incrementally, GUIpygame.share_identical_images)
+        GUIpygame.compose_incrementally = GUIpygame.share_identical_images = True
+        self.boxes = [GUIpygame.Checkbox(pos=(10, 10+20*i), text='Same', Id='sh.' + str(i))
+                      for i in range(3)]
+        self.container = form(200, 100)
+        self.container.add_widgets(*self.boxes)
+        self.group = GUIpygame.WidgetGroup(self.container)
+        show(self.group)
+
+    def tearDown(self):
+        (GUIpygame.compose_incrementally, GUIpygame.share_identical_images) = self.saved
+
+    def test_shared(self):
+        (a, b, c) = self.boxes
+        self.assertIs(a.image, b.image)
+        self.assertIs(b.image, c.image)
+
+    def test_one_changes(self):
+        (a, b, c) = self.boxes
+        unchecked = pygame.image.tostring(b.image, 'RGB')
+        self.group.notify(event(MOUSEBUTTONDOWN, pos=a.rect.center, button=1))
+        self.group.notify(event(MOUSEBUTTONUP, pos=a.rect.center, button=1))
+        show(self.group)
+        self.assertTrue(a.checked)
+        self.assertIsNot(a.image, b.image)
+        self.assertIs(b.image, c.image)
+        self.assertEqual(pygame.image.tostring(b.image, 'RGB'), unchecked)
+        self.assertNotEqual(pygame.image.tostring(a.image, 'RGB'), unchecked)
+        # what's on the screen, too
+        on_screen = lambda box: pygame.image.tostring(self.container.image.subsurface(box.relative_rect), 'RGB')
+        self.assertEqual(on_screen(b), on_screen(c))
+        self.assertNotEqual(on_screen(a), on_screen(b))
+
+    def test_drawing_on_a_shared_image(self):
+        (a, b, c) = self.boxes
+        a.unshare_image()
+        a.image.fill((255,0,0))
+        self.assertNotEqual(tuple(b.image.get_at((0,0)))[:3], (255,0,0))
+
+    def test_only_when_turned_on(self):
+        GUIpygame.share_identical_images = False
+        boxes = [GUIpygame.Checkbox(pos=(10, 10+20*i), text='Same') for i in range(2)]
+        container = form(200, 100)
+        container.add_widgets(*boxes)
+        show(GUIpygame.WidgetGroup(container))
+        self.assertIsNot(boxes[0].image, boxes[1].image)
+        self.assertIsNot(boxes[0].pic, boxes[1].pic)
+
+
+class TestSharedImageSessions(SessionTest):
+    def test_random_sessions(self):
+        self.assertSameSessions(compose_incrementally=True, share_identical_images=True)
+
+
+class TestGoldenSharedImages(TestGolden):
+    options = {'compose_incrementally': True, 'share_identical_images': True}
+
+
+class TestMany(unittest.TestCase):
+    '''Constructing widgets in bulk (see Widget.many).'''
+    def test_same_as_one_at_a_time(self):
+        texts = ['apples', 'pears', 'apples', 'plums']
+        positions = [(10, 10+20*i) for i in range(4)]
+        container = form(200, 100)
+        group = GUIpygame.WidgetGroup()
+        boxes = GUIpygame.Checkbox.many({'text': texts, 'pos': positions}, parent=container,
+                                        group=group, bgcolor=(255,255,255))
+        self.assertEqual(len(boxes), 4)
+        self.assertEqual(container.children.sprites(), boxes)
+        self.assertEqual(group.sprites(), boxes)
+        show(group)
+        for (box, text, pos) in zip(boxes, texts, positions):
+            single = GUIpygame.Checkbox(text=text, pos=pos, bgcolor=(255,255,255))
+            show(GUIpygame.WidgetGroup(single))
+            self.assertEqual(box.rect, single.rect)
+            self.assertEqual(pygame.image.tostring(box.image, 'RGB'), pygame.image.tostring(single.image, 'RGB'))
+
+    def test_shared_blank_images(self):
+        saved = GUIpygame.share_identical_images
+        GUIpygame.share_identical_images = True
+        try:
+            labels = GUIpygame.Label.many({'text': ['one', 'two', 'one'], 'pos': [(0,0), (0,20), (0,40)]},
+                                          bgcolor=(255,255,255))
+        finally:
+            GUIpygame.share_identical_images = saved
+        self.assertIs(labels[0].image, labels[2].image)  # the same size, until they're drawn
+        show(GUIpygame.WidgetGroup(*labels))
+        self.assertIsNot(labels[0].image, labels[1].image)
+        self.assertNotEqual(pygame.image.tostring(labels[0].image, 'RGB'),
+                            pygame.image.tostring(labels[1].image, 'RGB'))
+        self.assertEqual(pygame.image.tostring(labels[0].image, 'RGB'),
+                         pygame.image.tostring(labels[2].image, 'RGB'))
+
+    def test_columns_must_match(self):
+        self.assertRaises(ValueError, GUIpygame.Label.many, {'text': ['a', 'b'], 'pos': [(0,0)]})
+        self.assertEqual(GUIpygame.Label.many({}), [])
+
+
+class TestMenuCache(FakeClockTest):
+    '''Reusing pop-up menus (see Menu.ActionMenu(..., cached=True)).'''
+    labels = '|'.join(['item%02d' % i for i in range(40)])
+
+    def setUp(self):
+        FakeClockTest.setUp(self)
+        self.saved_menus = GUIpygame.action_menus.copy()
+        GUIpygame.action_menus.clear()
+
+    def tearDown(self):
+        GUIpygame.action_menus.clear()
+        GUIpygame.action_menus.update(self.saved_menus)
+        FakeClockTest.tearDown(self)
+
+    def click(self, group, button):
+        pos = button.rect.center
+        group.notify(event(MOUSEMOTION, pos=pos, rel=(0,0), buttons=(0,0,0)))
+        group.notify(event(MOUSEBUTTONDOWN, pos=pos, button=1))
+        group.notify(event(MOUSEBUTTONUP, pos=pos, button=1))
+
+    def test_keyed_on_content(self):
+        menu = GUIpygame.Menu.ActionMenu('One|Two', cached=True, on_click=lambda ev: None)
+        self.assertIs(GUIpygame.Menu.ActionMenu('One|Two', pos=(50,60), cached=True,
+                                                on_click=lambda ev: None), menu)
+        self.assertEqual(menu.rect.topleft, (50,60))
+        self.assertIsNot(GUIpygame.Menu.ActionMenu('One|Two|Three', cached=True), menu)
+        self.assertIsNot(GUIpygame.Menu.ActionMenu('One|Two', ['a', 'b'], cached=True), menu)
+        self.assertIsNot(GUIpygame.Menu.ActionMenu('One|Two', Id='other', cached=True), menu)
+        self.assertIsNot(GUIpygame.Menu.ActionMenu('One|Two', cached=True, max_height=100), menu)
+        self.assertIsNot(GUIpygame.Menu.ActionMenu('One|Two'), menu)  # not cached
+
+    def test_on_click_is_reassigned(self):
+        clicks = []
+        menu = GUIpygame.Menu.ActionMenu('One|Two', cached=True, on_click=lambda ev: clicks.append(('first', ev.Id)))
+        GUIpygame.Menu.ActionMenu('One|Two', cached=True, on_click=lambda ev: clicks.append(('second', ev.Id)))
+        group = GUIpygame.WidgetGroup(menu)
+        show(group)
+        self.click(group, menu.children.sprites()[1])
+        self.assertEqual(clicks, [('second', 'Two')])
+
+    def test_state_is_reset(self):
+        menu = GUIpygame.Menu.ActionMenu(self.labels, cached=True, max_height=150)
+        group = GUIpygame.WidgetGroup(menu)
+        show(group)
+        pos = menu.rows[0].rect.center
+        group.notify(event(MOUSEMOTION, pos=pos, rel=(0,0), buttons=(0,0,0)))
+        group.notify(event(MOUSEBUTTONDOWN, pos=pos, button=5))  # the mouse wheel
+        group.notify(event(KEYDOWN, key=K_i, unicode='i', mod=0))
+        group.notify(event(MOUSEBUTTONDOWN, pos=pos, button=1))
+        self.assertTrue(menu.rows[0].isdown)
+        self.assertNotEqual((menu.first_item, menu.scrollbar.value, menu.selected, menu.typed),
+                            (0, 0.0, None, ''))
+        group.remove(menu)
+        self.assertIs(GUIpygame.Menu.ActionMenu(self.labels, cached=True, max_height=150), menu)
+        self.assertEqual((menu.first_item, menu.scrollbar.value, menu.selected, menu.typed),
+                         (0, 0.0, None, ''))
+        self.assertEqual(menu.rows[0].text, 'item00')
+        self.assertFalse(menu.hasmousefocus)
+        self.assertFalse([row for row in menu.rows if row.isdown or row.hasmousefocus])
+        # and the old typing doesn't carry over to the next key
+        group = GUIpygame.WidgetGroup(menu)
+        show(group)
+        group.notify(event(MOUSEMOTION, pos=pos, rel=(0,0), buttons=(0,0,0)))
+        group.notify(event(KEYDOWN, key=K_3, unicode='i', mod=0))
+        self.assertEqual(menu.typed, 'i')
+
+    def test_least_recently_used_is_dropped(self):
+        saved = GUIpygame.MENU_CACHE_MAX
+        GUIpygame.MENU_CACHE_MAX = 3
+        try:
+            menus = [GUIpygame.Menu.ActionMenu(labels, cached=True) for labels in ('a', 'b', 'c')]
+            GUIpygame.Menu.ActionMenu('a', cached=True)  # now 'b' is the least recently used
+            GUIpygame.Menu.ActionMenu('d', cached=True)
+            self.assertEqual(len(GUIpygame.action_menus), 3)
+            self.assertIs(GUIpygame.Menu.ActionMenu('a', cached=True), menus[0])
+            self.assertIs(GUIpygame.Menu.ActionMenu('c', cached=True), menus[2])
+            self.assertIsNot(GUIpygame.Menu.ActionMenu('b', cached=True), menus[1])
+        finally:
+            GUIpygame.MENU_CACHE_MAX = saved
+
+
+class TestScrollingMenus(FakeClockTest):
+    '''Menus with more items than rows (see Menu.set_items).'''
+    def setUp(self):
+        FakeClockTest.setUp(self)
+        self.menu = GUIpygame.Menu()
+        self.menu.set_items(['item%02d' % i for i in range(40)], max_height=150)
+        self.group = GUIpygame.WidgetGroup(self.menu)
+        show(self.group)
+        self.point_at(self.menu.rows[0])
+
+    def point_at(self, widget):
+        self.pos = widget.rect.center
+        self.group.notify(event(MOUSEMOTION, pos=self.pos, rel=(0,0), buttons=(0,0,0)))
+
+    def type(self, text):
+        for char in text:
+            self.group.notify(event(KEYDOWN, key=ord(char), unicode=char, mod=0))
+        return self.menu.selected
+
+    def shown(self):
+        return [row.text for row in self.menu.rows]
+
+    def test_ties_go_to_the_first_item(self):
+        self.menu.set_items(['Banana', 'apple2', 'Apple1', 'cherry'])
+        self.assertEqual(self.type('ap'), 1)
+        self.now += GUIpygame.MENU_TYPE_AHEAD_TIMEOUT + 1
+        self.assertEqual(self.type('APPLE1'), 2)
+        self.now += GUIpygame.MENU_TYPE_AHEAD_TIMEOUT + 1
+        self.menu.set_items(['b', 'same', 'a', 'same'])
+        self.assertEqual(self.type('s'), 1)
+
+    def test_typing_scrolls(self):
+        rows = len(self.menu.rows)
+        self.assertEqual(self.type('item3'), 30)
+        self.assertEqual(self.menu.first_item, 30 - rows + 1)
+        self.assertEqual(self.menu.scrollbar.value, 30 - rows + 1)
+        self.assertEqual(self.shown()[-1], 'item30')
+        self.now += GUIpygame.MENU_TYPE_AHEAD_TIMEOUT + 1
+        self.assertEqual(self.type('item0'), 0)
+        self.assertEqual(self.menu.first_item, 0)
+        self.now += GUIpygame.MENU_TYPE_AHEAD_TIMEOUT + 1
+        self.assertFalse(self.menu.type_ahead('x'))
+        self.assertEqual(self.menu.selected, 0)  # no match leaves the selection alone
+
+    def test_typing_pauses_start_again(self):
+        self.type('item1')
+        self.now += GUIpygame.MENU_TYPE_AHEAD_TIMEOUT + 1
+        self.type('i')
+        self.assertEqual(self.menu.typed, 'i')
+        self.assertEqual(self.menu.selected, 0)
+
+    def test_mouse_wheel(self):
+        rows = len(self.menu.rows)
+        self.group.notify(event(MOUSEBUTTONDOWN, pos=self.pos, button=5))
+        self.assertEqual(self.menu.first_item, GUIpygame.MENU_WHEEL_ROWS)
+        self.assertEqual(self.menu.scrollbar.value, GUIpygame.MENU_WHEEL_ROWS)
+        self.assertEqual(self.shown()[0], 'item%02d' % GUIpygame.MENU_WHEEL_ROWS)
+        for i in range(20):
+            self.group.notify(event(MOUSEBUTTONDOWN, pos=self.pos, button=5))
+        self.assertEqual(self.menu.first_item, 40 - rows)
+        self.assertEqual(self.shown()[-1], 'item39')
+        for i in range(20):
+            self.group.notify(event(MOUSEBUTTONDOWN, pos=self.pos, button=4))
+        self.assertEqual(self.menu.first_item, 0)
+        # not while the pointer is elsewhere
+        self.group.notify(event(MOUSEMOTION, pos=(600,450), rel=(0,0), buttons=(0,0,0)))
+        self.group.notify(event(MOUSEBUTTONDOWN, pos=(600,450), button=5))
+        self.assertEqual(self.menu.first_item, 0)
+
+    def test_enter_chooses_the_selected_item(self):
+        chosen = []
+        self.menu.set_items(['item%02d' % i for i in range(40)], ['sel%02d' % i for i in range(40)],
+                            max_height=150, on_click=lambda ev: chosen.append(ev.Id))
+        show(self.group)
+        self.group.notify(event(KEYDOWN, key=K_RETURN, unicode='\r', mod=0))
+        self.assertEqual(chosen, [])  # nothing selected yet
+        self.type('item25')
+        self.group.notify(event(MOUSEBUTTONDOWN, pos=self.pos, button=4))  # scroll it out of view
+        self.group.notify(event(KEYDOWN, key=K_RETURN, unicode='\r', mod=0))
+        self.assertEqual(chosen, ['sel25'])
+
+    def test_set_items_starts_afresh(self):
+        self.type('item2')
+        self.menu.set_items(['one', 'two', 'three'], max_height=150)
+        self.assertEqual((self.menu.first_item, self.menu.selected, self.menu.typed), (0, None, ''))
+        self.assertEqual(self.shown(), ['one', 'two', 'three'])
+        self.assertIsNone(self.menu.scrollbar)  # they all fit
+        self.assertEqual(self.type('t'), 1)
+
+    def test_no_items(self):
+        self.menu.set_items([])
+        show(self.group)
+        self.assertEqual(self.menu.rows, [])
+        self.assertIsNone(self.menu.scrollbar)
+        self.assertFalse(self.menu.type_ahead('a'))
+        self.group.notify(event(MOUSEBUTTONDOWN, pos=self.pos, button=5))
+        self.group.notify(event(KEYDOWN, key=K_RETURN, unicode='\r', mod=0))
+        self.assertEqual(self.menu.first_item, 0)
+
+
+class TestZOrder(unittest.TestCase):
+    '''The drawing order of the widgets in a group (see WidgetGroup.set_z).'''
+    def setUp(self):
+        self.widgets = [GUIpygame.Label('w' + str(i), Id='z' + str(i)) for i in range(5)]
+        self.group = GUIpygame.WidgetGroup(*self.widgets)
+
+    def order(self):
+        return [widget.Id for widget in self.group.sprites()]
+
+    def test_set_z(self):
+        (w0, w1, w2, w3, w4) = self.widgets
+        self.assertTrue(self.group.set_z(w4, 1))
+        self.assertEqual(self.order(), ['z0', 'z4', 'z1', 'z2', 'z3'])
+        self.group.set_z(w0, -2)  # negative positions count from the top
+        self.assertEqual(self.order(), ['z4', 'z1', 'z2', 'z0', 'z3'])
+        self.group.set_z(w1, 99)  # out-of-range positions are clamped
+        self.assertEqual(self.order(), ['z4', 'z2', 'z0', 'z3', 'z1'])
+        self.assertFalse(self.group.set_z(w1, -1))  # already there
+        self.assertEqual([self.group.get_z(w) for w in self.widgets], [2, 4, 1, 3, 0])
+        self.assertIsNone(self.group.get_z(GUIpygame.Label('stranger')))
+
+    def test_raise_and_lower(self):
+        (w0, w1, w2, w3, w4) = self.widgets
+        w1.raise_to_top()
+        w3.lower_to_bottom()
+        self.assertEqual(self.order(), ['z3', 'z0', 'z2', 'z4', 'z1'])
+        self.assertEqual(self.group.sprites_painted_after(w2), [w4, w1])
+
+    def test_added_widgets_go_on_top(self):
+        self.group.raise_to_top(self.widgets[0])
+        newcomer = GUIpygame.Label('new', Id='znew')
+        self.group.add(newcomer)
+        self.assertEqual(self.order()[-2:], ['z0', 'znew'])
+
+    def test_keys_are_renumbered(self):
+        # Repeatedly moving the top widget to position 1 halves the gap
+        # between the two bottom z keys each time, until there's no room
+        # left between them and the keys have to be renumbered.
+        expected = list(self.widgets)
+        for i in range(1200):
+            top = expected.pop()
+            expected.insert(1, top)
+            self.group.set_z(top, 1)
+        self.assertEqual(self.group.sprites(), expected)
+        self.assertEqual([self.group.get_z(w) for w in expected], list(range(len(expected))))
+        keys = self.group._z_keys
+        self.assertEqual(sorted(set(keys)), keys)
+
+    def test_matches_a_plain_list(self):
+        rnd = random.Random(1)
+        widgets = [GUIpygame.Label('x' + str(i)) for i in range(60)]
+        group = GUIpygame.WidgetGroup(*widgets)
+        expected = list(widgets)
+        for i in range(2000):
+            widget = rnd.choice(widgets)
+            op = rnd.random()
+            if widget not in expected:
+                group.add(widget)
+                expected.append(widget)
+            elif op < 0.3:
+                group.raise_to_top(widget)
+                expected.remove(widget)
+                expected.append(widget)
+            elif op < 0.5:
+                group.lower_to_bottom(widget)
+                expected.remove(widget)
+                expected.insert(0, widget)
+            elif op < 0.9:
+                z = rnd.randrange(-len(expected), len(expected))
+                group.set_z(widget, z)
+                expected.remove(widget)
+                if z < 0:
+                    z += len(expected) + 1
+                expected.insert(z, widget)
+            else:
+                group.remove(widget)
+                expected.remove(widget)
+            self.assertEqual(group.sprites(), expected)
+        self.assertEqual([group.get_z(w) for w in expected], list(range(len(expected))))
+
+    def test_child_widgets(self):
+        container = form(100, 100)
+        (a, b) = (block(50,50), block(50,50))
+        container.add_widgets(a, b)
+        a.raise_to_top()
+        self.assertEqual(container.children.sprites(), [b, a])
+
+    def test_click_raises_draggable_widgets(self):
+        (a, b) = (form(100, 100), form(100, 100))
+        b.move((50, 50))
+        a.draggable = b.draggable = True
+        group = GUIpygame.WidgetGroup(a, b)
+        show(group)
+        group.notify(event(MOUSEBUTTONDOWN, pos=(10,10), button=1))
+        group.notify(event(MOUSEBUTTONUP, pos=(10,10), button=1))
+        self.assertEqual(group.sprites(), [b, a])
+        saved = GUIpygame.raise_clicked_widgets
+        GUIpygame.raise_clicked_widgets = False
+        try:
+            group.notify(event(MOUSEBUTTONDOWN, pos=(140,140), button=1))
+            group.notify(event(MOUSEBUTTONUP, pos=(140,140), button=1))
+            self.assertEqual(group.sprites(), [b, a])
+        finally:
+            GUIpygame.raise_clicked_widgets = saved
+
+    def test_restacking_redraws_the_overlap(self):
+        a = GUIpygame.BasicForm(rect=(0,0,100,100), bgcolor=(255,0,0), draggable=True)
+        b = GUIpygame.BasicForm(rect=(50,50,100,100), bgcolor=(0,0,255), draggable=True)
+        far = GUIpygame.BasicForm(rect=(300,300,50,50), bgcolor=(0,255,0), draggable=True)
+        group = GUIpygame.WidgetGroup(a, b, far)
+        screen = pygame.display.get_surface()
+        GUIpygame.partial_redraw_mode()
+        try:
+            GUIpygame.screen_is_cleared()
+            show(group)
+            self.assertEqual(screen.get_at((75,75))[:3], (0,0,255))
+            GUIpygame.changed = False
+            group.notify(event(MOUSEBUTTONDOWN, pos=(10,10), button=1))
+            group.notify(event(MOUSEBUTTONUP, pos=(10,10), button=1))
+            self.assertEqual(group.sprites(), [b, far, a])
+            self.assertTrue(GUIpygame.changed)
+            group.update()
+            self.assertIn(pygame.Rect(50,50,50,50), group.draw(screen))
+            self.assertEqual(screen.get_at((75,75))[:3], (255,0,0))
+            GUIpygame.done_drawing()
+            self.assertTrue(a.top_collidepoint((75,75)))
+            self.assertFalse(b.top_collidepoint((75,75)))
+            a.lower_to_bottom()
+            self.assertIn(pygame.Rect(50,50,50,50), group.draw(screen))
+            self.assertEqual(screen.get_at((75,75))[:3], (0,0,255))
+            far.lower_to_bottom()  # it doesn't overlap anything
+            self.assertEqual(group.lostsprites, [])
+        finally:
+            GUIpygame.partial_redraw_mode(False)
+            GUIpygame.screen_is_cleared()
+
+
+@unittest.skipIf(GUIpygame.numpy is None, 'hit indexes need NumPy')
+class TestHitIndex(unittest.TestCase):
+    '''get_widget_at() etc. should give the same answers with a hit index
+    (see set_hit_index) as without one.
+    '''
+    def setUp(self):
+        rnd = random.Random(3)
+        self.form = GUIpygame.BasicForm(rect=(20,20,300,200), bgcolor=(255,255,255))
+        self.seats = []
+        for row in range(15):
+            for col in range(25):
+                pos = (col*11 + rnd.randrange(3), row*11 + rnd.randrange(3))
+                size = (9 + rnd.randrange(4), 9 + rnd.randrange(4))
+                self.seats.append(GUIpygame.SimpleButton('', size=size, pos=pos, border=0, bgcolor=(0,100,200)))
+        labels = [GUIpygame.Label('label ' + str(i), pos=(rnd.randrange(250), rnd.randrange(180)))
+                  for i in range(30)]
+        self.form.add_widgets(*(self.seats + labels))
+        self.top = [GUIpygame.Label('top ' + str(i), pos=(rnd.randrange(600), rnd.randrange(450)),
+                                    bgcolor=(200,200,200))
+                    for i in range(200)]
+        self.group = GUIpygame.WidgetGroup(self.form, *self.top)
+        show(self.group)
+        GUIpygame.done_drawing()
+        self.points = [(rnd.randrange(640), rnd.randrange(480)) for i in range(300)]
+
+    def set_hit_index(self, enabled):
+        self.form.children.set_hit_index(enabled)
+        self.group.set_hit_index(enabled)
+
+    def answers(self):
+        children = self.form.children
+        return ([children.get_widget_at(pos) for pos in self.points],
+                [self.group.get_widget_at(pos) for pos in self.points],
+                [self.form.top_collidepoint(pos, include_children=True) for pos in self.points],
+                [children.hit_index.sprites_in(Rect(pos, (15,15))) if children.hit_index else
+                 [w for w in children.sprites() if w.rect.colliderect(Rect(pos, (15,15)))]
+                 for pos in self.points])
+
+    def assertSameAnswers(self):
+        self.set_hit_index(False)
+        expected = self.answers()
+        self.assertTrue(any(expected[0]))
+        self.set_hit_index(True)
+        self.assertEqual(self.answers(), expected)
+
+    def test_same_answers(self):
+        self.assertSameAnswers()
+
+    def test_after_moves(self):
+        self.set_hit_index(True)
+        self.answers()  # build the indexes before things move
+        self.form.move((13,7))
+        self.assertSameAnswers()
+        self.seats[100].move((3,3))
+        self.seats[5].raise_to_top()
+        self.assertSameAnswers()
+        self.top[10].moveto(self.points[0])
+        self.assertSameAnswers()
+        show(self.group)
+        GUIpygame.done_drawing()
+        self.assertSameAnswers()
+
+    def test_ties(self):
+        # Of two equally centered widgets, the one drawn first is found.
+        (a, b) = (block(20,20), block(20,20))
+        group = GUIpygame.WidgetGroup(a, b)
+        for enabled in (False, True):
+            group.set_hit_index(enabled)
+            self.assertIs(group.get_widget_at((5,5)), a)
+            group.raise_to_top(a)
+            self.assertIs(group.get_widget_at((5,5)), b)
+            group.raise_to_top(b)
+
+    def test_drawing_order(self):
+        (a, b, c) = (block(20,20), block(20,20), block(20,20))
+        c.move((30,0))
+        group = GUIpygame.WidgetGroup(b, c, a)
+        index = group.set_hit_index()
+        self.assertEqual(index.sprites_at((5,5)), [b, a])
+        group.raise_to_top(b)
+        self.assertEqual(index.sprites_at((5,5)), [a, b])
+        self.assertEqual(index.sprites_in(Rect(10,10,30,5)), [c, a, b])
+        self.assertEqual(index.sprites_in(Rect(10,10,0,5)), [])
+        self.assertEqual(index.sprites_at((25,5)), [])
+
+    def test_frozen(self):
+        # While a widget is being dragged its children's rects aren't kept
+        # up to date, so their group's index mustn't be used.
+        index = self.form.children.set_hit_index()
+        self.assertTrue(index.usable())
+        self.form._freeze()
+        try:
+            self.assertFalse(index.usable())
+            self.assertEqual(index.sprites_at((0,0)), self.form.children.sprites())
+            self.assertTrue(self.group.set_hit_index().usable())
+        finally:
+            self.form._thaw()
+        self.assertTrue(index.usable())
+
+
+class TestMaskHitTesting(unittest.TestCase):
+    '''Hit testing of widgets with hit_mask=True by the pixels they draw.'''
+    def setUp(self):
+        self.under = GUIpygame.SimpleButton('underneath button', pos=(10,10), Id='under')
+        self.round = GUIpygame.Image(image=disc(40), pos=(10,10))
+        self.round.hit_mask = True
+        self.group = GUIpygame.WidgetGroup(self.under, self.round)
+        show(self.group)
+
+    def test_transparent_corner(self):
+        self.assertFalse(self.round.collidepoint((12,12)))
+        self.assertIs(self.group.get_widget_at((12,12)), self.under)
+        self.assertTrue(self.under.top_collidepoint((12,12)))
+
+    def test_opaque_center(self):
+        self.assertTrue(self.round.collidepoint((30,30)))
+        self.assertFalse(self.under.top_collidepoint((30,30)))
+        self.round.hit_mask = False
+        self.assertTrue(self.round.collidepoint((12,12)))
+
+    def test_label_gaps(self):
+        label = GUIpygame.Label('I  I', pos=(200,100))
+        show(GUIpygame.WidgetGroup(label))
+        y = label.rect.centery
+        points = [(x, y) for x in range(label.rect.left, label.rect.right)]
+        self.assertTrue(all([label.collidepoint(pos) for pos in points[:8]]))
+        label.hit_mask = True
+        hits = [label.collidepoint(pos) for pos in points]
+        self.assertTrue(any(hits))
+        self.assertFalse(all(hits))
+
+    def test_new_image(self):
+        self.assertFalse(self.round.collidepoint((12,12)))
+        square = pygame.Surface((40,40), SRCALPHA)
+        square.fill((0,0,255,255))
+        self.round.pic = square
+        self.round.invalidate()
+        show(self.group)
+        self.assertTrue(self.round.collidepoint((12,12)))
+
+    def test_threshold(self):
+        faint = GUIpygame.Image(image=disc(40, alpha=100), pos=(100,10))
+        faint.hit_mask = True
+        show(GUIpygame.WidgetGroup(faint))
+        self.assertFalse(faint.collidepoint((120,30)))
+        saved = GUIpygame.HIT_MASK_THRESHOLD
+        GUIpygame.HIT_MASK_THRESHOLD = 50
+        try:
+            faint = GUIpygame.Image(image=disc(40, alpha=100), pos=(100,10))
+            faint.hit_mask = True
+            show(GUIpygame.WidgetGroup(faint))
+            self.assertTrue(faint.collidepoint((120,30)))
+        finally:
+            GUIpygame.HIT_MASK_THRESHOLD = saved
+
+
+if __name__ == '__main__':
+    unittest.main()